@@ -9,6 +9,24 @@ import time
 import json
 from datetime import datetime
 
+# 在服务器上执行：按 app.py 的规则取 Web UI 端口和密码，请求本机 /api/dispatcher
+DISPATCHER_STATS_SCRIPT = """
+import json, os, urllib.parse, urllib.request
+cfg = {}
+try:
+    with open("/root/GalxeMonitor/config_files/config.json", encoding="utf-8") as f:
+        cfg = json.load(f)
+except Exception:
+    pass
+port = cfg.get("webui_port", 5001)
+pwd = cfg.get("webui_password") or os.getenv("WEBUI_PASSWORD", "")
+url = "http://127.0.0.1:%s/api/dispatcher?%s" % (port, urllib.parse.urlencode({"pwd": pwd}))
+try:
+    print(urllib.request.urlopen(url, timeout=10).read().decode())
+except Exception:
+    print("{}")
+"""
+
 class MonitorViewer:
     def __init__(self, host, username, password):
         self.host = host
@@ -28,15 +46,22 @@ class MonitorViewer:
         if self.ssh:
             self.ssh.close()
             
-    def get_queue_size(self):
-        """获取当前队列大小"""
-        stdin, stdout, stderr = self.ssh.exec_command(
-            'wc -l /root/GalxeMonitor/data/push_queue.json 2>/dev/null | awk "{print $1}" || echo "0"'
-        )
+    def get_queue_stats(self):
+        """从 /api/dispatcher 获取推送队列统计（待推送条数由服务端内存计数，无需扫描队列文件）"""
+        # 脚本经 stdin 交给远端 python3：端口和密码在服务器上从 config.json / WEBUI_PASSWORD 读取，
+        # 不出现在任何命令行参数里（ps 可见），也不在本地写死默认密码
+        stdin, stdout, stderr = self.ssh.exec_command('python3 -')
+        stdin.write(DISPATCHER_STATS_SCRIPT)
+        stdin.channel.shutdown_write()
         try:
-            return int(stdout.read().decode().strip())
+            return json.loads(stdout.read().decode())
         except:
-            return 0
+            return {}
+            
+    def get_queue_size(self):
+        """获取当前队列大小（持久化队列待推送 + 调度器内存队列）"""
+        stats = self.get_queue_stats()
+        return stats.get("push_queue", {}).get("pending", 0) + stats.get("queue_depth", 0)
             
     def get_process_info(self):
         """获取进程信息"""
@@ -59,13 +84,13 @@ class MonitorViewer:
         print(f"{'='*70}")
         
         # 进程状态
-        print(f"\n📊 进程状态:")
+        print("\n📊 进程状态:")
         print(f"  {self.get_process_info()}")
         
         # 队列大小
         queue_size = self.get_queue_size()
         trend = "📈" if queue_size > self.last_queue_size else ("📉" if queue_size < self.last_queue_size else "➡️")
-        print(f"\n📋 队列大小: {queue_size} 行 {trend}")
+        print(f"\n📋 队列大小: {queue_size} 条 {trend}")
         if self.last_queue_size > 0:
             change = queue_size - self.last_queue_size
             print(f"  变化: {change:+d} (相比上次)")
@@ -75,11 +100,11 @@ class MonitorViewer:
         stdin, stdout, stderr = self.ssh.exec_command(
             'free -h | grep Mem | awk "{printf \\"  内存: %s/%s (%.1f%%) \\\\n\\", $3, $2, ($3/$2)*100}"'
         )
-        print(f"\n💾 服务器资源:")
+        print("\n💾 服务器资源:")
         print(f"{stdout.read().decode().strip()}")
         
         # 最新日志
-        print(f"\n📝 最近日志 (最后10行):")
+        print("\n📝 最近日志 (最后10行):")
         logs = self.get_recent_logs(10)
         if logs:
             for line in logs.strip().split('\n')[-10:]:
@@ -114,10 +139,10 @@ class MonitorViewer:
         running = int(stdout.read().decode().strip())
         print(f"1. 进程运行中: {'✅ 是' if running > 0 else '❌ 否'}")
         
-        # 2. 队列文件
-        stdin, stdout, stderr = self.ssh.exec_command('test -f /root/GalxeMonitor/data/push_queue.json && echo "1" || echo "0"')
+        # 2. 队列目录
+        stdin, stdout, stderr = self.ssh.exec_command('test -d /root/GalxeMonitor/data/push_queue && echo "1" || echo "0"')
         exists = int(stdout.read().decode().strip())
-        print(f"2. 队列文件存在: {'✅ 是' if exists else '❌ 否'}")
+        print(f"2. 队列目录存在: {'✅ 是' if exists else '❌ 否'}")
         
         # 3. 日志文件
         stdin, stdout, stderr = self.ssh.exec_command('test -f /root/GalxeMonitor/logs/app.log && echo "1" || echo "0"')
@@ -131,7 +156,7 @@ class MonitorViewer:
         
         # 5. 当前队列大小
         queue_size = self.get_queue_size()
-        print(f"5. 当前队列大小: {queue_size} 行")
+        print(f"5. 当前队列大小: {queue_size} 条")
         
         print(f"{'='*70}\n")
         
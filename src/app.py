@@ -6,18 +6,36 @@ NTX Quest Radar V4.0 - 优化版
 基于 Galxe Open API 的项目任务监控工具
 """
 
+import argparse
+import codecs
+import fcntl
+import hashlib
+import heapq
+import hmac
 import json
+import mmap
 import os
+import queue
+import random
+import struct
+import sys
 import threading
 import time
 import logging
+import zlib
+from collections import OrderedDict, deque
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 import requests
-from flask import Flask, request, jsonify
+from requests.adapters import HTTPAdapter
+from flask import Flask, Response, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 
+from atomic_file import file_lock, write_json_atomic
+from galxe_crawler import resolve_aliases
+from merge_spaces_config import BULK_FILE, iter_spaces, merge_spaces, stream_spaces
+
 # =============== 初始化日志系统 ===============
 
 logging.basicConfig(
@@ -39,6 +57,16 @@ load_dotenv()
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_PATH = os.path.join(ROOT, "config_files", "config.json")
 STATE_PATH = os.path.join(ROOT, "data", "monitor_state.json")
+MONITOR_LOCK_PATH = os.path.join(ROOT, "data", "monitor.lock")
+SNAPSHOT_PATH = os.path.join(ROOT, "data", "monitor_snapshot.bin")
+DISPATCHER_STATS_PATH = os.path.join(ROOT, "data", "dispatcher_stats.json")
+PUSH_QUEUE_DIR = os.path.join(ROOT, "data", "push_queue")
+DEAD_LETTER_PATH = os.path.join(ROOT, "data", "dead_letters.jsonl")
+DEAD_LETTER_REPLAY_FLAG = os.path.join(ROOT, "data", "dead_letters.replay")
+MESSAGE_INDEX_PATH = os.path.join(ROOT, "data", "message_index.json")
+REMINDERS_PATH = os.path.join(ROOT, "data", "reminders.json")
+SENT_CAMPAIGNS_PATH = os.path.join(ROOT, "data", "sent_campaigns.jsonl")
+SPACE_META_PATH = os.path.join(ROOT, "data", "space_meta.json")
 LOGS_DIR = os.path.join(ROOT, "logs")
 OPENAPI_URL = "https://graphigo.prd.galaxy.eco/query"
 
@@ -50,7 +78,12 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # =============== 全局状态 ===============
 
 monitor_state = {"last_loop": "", "projects": []}
-last_notified = {}  # alias -> last campaign id
+last_notified = {}  # 轮询键（spaceId，未知时为小写 alias） -> last campaign id
+
+# 运行角色: all（开发模式，单进程）/ monitor（仅监控）/ web（仅 Web，读取快照）
+SERVE_ROLE = (os.getenv("NTX_ROLE") or "all").lower()
+monitor_owner = False  # 本进程是否持有监控锁并运行 monitor_loop
+_monitor_lock_file = None
 
 # =============== 配置管理 ===============
 
@@ -85,21 +118,57 @@ def ensure_config():
         logger.info(f"已创建默认配置文件: {CONFIG_PATH}")
 
 
+def read_config() -> dict:
+    """读取配置文件（失败时抛出异常）"""
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def load_config() -> dict:
     """加载配置文件"""
     try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_config()
     except Exception as e:
         logger.error(f"加载配置失败: {e}")
         return {}
 
 
+_config_cache = {"mtime": None, "cfg": {}}
+_config_cache_lock = threading.Lock()
+
+
+def load_config_cached() -> dict:
+    """
+    按文件修改时间缓存配置（推送线程高频读取用；返回的 dict 不要原地修改）
+    
+    解析失败时不缓存，继续返回上一份有效配置，下次调用重新读取
+    """
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return load_config()
+    with _config_cache_lock:
+        if _config_cache["mtime"] != mtime:
+            try:
+                _config_cache["cfg"] = read_config()
+                _config_cache["mtime"] = mtime
+            except Exception as e:
+                logger.error(f"加载配置失败，继续使用上一份配置: {e}")
+        return _config_cache["cfg"]
+
+
+def config_lock():
+    """
+    配置文件锁：修改配置时在锁内完成“读取 -> 修改 -> 写回”，
+    monitor 进程、Web 进程和 merge_spaces_config.py 之间互不覆盖对方的修改
+    """
+    return file_lock(CONFIG_PATH)
+
+
 def save_config(cfg: dict):
-    """保存配置文件"""
+    """保存配置文件（原子替换，读端不会读到写了一半的配置）"""
     try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=2, ensure_ascii=False)
+        write_json_atomic(CONFIG_PATH, cfg)
         logger.info("配置已保存")
     except Exception as e:
         logger.error(f"保存配置失败: {e}")
@@ -108,8 +177,7 @@ def save_config(cfg: dict):
 def write_state(state: dict):
     """写入监控状态"""
     try:
-        with open(STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        write_json_atomic(STATE_PATH, state)
     except Exception as e:
         logger.error(f"写入状态文件失败: {e}")
 
@@ -160,23 +228,51 @@ query LatestSafe($alias:String!){
 """
 
 
-def fetch_latest(alias: str) -> Optional[Dict]:
-    """从 Galxe Open API 获取最新活动"""
+QUERY_LATEST_BY_ID = """
+query LatestById($id:Int!){
+  space(id:$id){
+    id
+    name
+    alias
+    campaigns(input:{}){
+      list{
+        id
+        name
+        createdAt
+        startTime
+        endTime
+      }
+    }
+  }
+}
+"""
+
+
+def parse_space_id(value) -> Optional[int]:
+    """把配置 / 接口中的 spaceId 统一为 int，无效时返回 None"""
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def query_latest(query: str, variables: dict, label: str) -> Optional[Dict]:
+    """执行最新活动查询，返回 {"space", "latest"}"""
     try:
         r = requests.post(
             OPENAPI_URL,
-            json={"query": QUERY_LATEST_SAFE, "variables": {"alias": alias}},
+            json={"query": query, "variables": variables},
             timeout=15,
         )
         data = r.json()
         
         if "errors" in data:
-            logger.error(f"OpenAPI 错误 [{alias}]: {data['errors']}")
+            logger.error(f"OpenAPI 错误 [{label}]: {data['errors']}")
             return None
 
         space = data.get("data", {}).get("space")
         if not space:
-            logger.warning(f"Space 不存在: {alias}")
+            logger.warning(f"Space 不存在: {label}")
             return None
 
         lst = space.get("campaigns", {}).get("list", [])
@@ -184,10 +280,117 @@ def fetch_latest(alias: str) -> Optional[Dict]:
         return {"space": space, "latest": latest}
         
     except Exception as e:
-        logger.error(f"请求失败 [{alias}]: {e}")
+        logger.error(f"请求失败 [{label}]: {e}")
         return None
 
 
+def fetch_latest(alias: str, space_id: Optional[int] = None) -> Optional[Dict]:
+    """从 Galxe Open API 获取最新活动：已知 spaceId 时按 id 查询（alias 可能改名），失败再按 alias 查询"""
+    if space_id is not None:
+        info = query_latest(QUERY_LATEST_BY_ID, {"id": space_id}, f"{alias}#{space_id}")
+        if info:
+            return info
+    return query_latest(QUERY_LATEST_SAFE, {"alias": alias}, alias)
+
+
+# 热路径：每轮只查变更检测需要的活动字段
+CAMPAIGN_FIELDS = """
+    campaigns(input:{}){
+      list{
+        id
+        name
+        createdAt
+        startTime
+        endTime
+      }
+    }
+"""
+
+# 冷数据：Space 元信息很少变化，只在首次查询和缓存过期时一并查询
+META_FIELDS = """
+    id
+    name
+    alias"""
+
+
+def build_latest_batch_query(specs: List[Tuple[Optional[int], str, bool]]):
+    """
+    把多个 Space 合并成一次 GraphQL 请求：每个 Space 一个字段别名 s0、s1…，已知 spaceId 的按 id 查询
+    specs: (spaceId, alias, 是否同时查询 id/name/alias)
+    """
+    params, fields, variables = [], [], {}
+    for i, (sid, alias, with_meta) in enumerate(specs):
+        selection = (META_FIELDS if with_meta else "") + CAMPAIGN_FIELDS
+        if sid is not None:
+            params.append(f"$v{i}:Int!")
+            fields.append(f"  s{i}: space(id:$v{i}){{{selection}  }}")
+            variables[f"v{i}"] = sid
+        else:
+            params.append(f"$v{i}:String!")
+            fields.append(f"  s{i}: space(alias:$v{i}){{{selection}  }}")
+            variables[f"v{i}"] = alias
+    query = "query LatestBatch(" + ",".join(params) + "){\n" + "\n".join(fields) + "\n}"
+    return query, variables
+
+
+def fetch_latest_batch(specs: List[Tuple[Optional[int], str, bool]]) -> List[Optional[Dict]]:
+    """
+    一次请求查询多个 Space 的最新活动，返回与 specs 一一对应的 {"space", "latest"} 或 None
+    （未查询元信息的 Space，space 中只有 campaigns）
+
+    - 单个字段出错（Space 不存在 / id 失效）只影响该字段：按 id 查不到的再按 alias 单独查询
+    - 整个请求失败（网络异常 / 响应无法解析）或被拒绝（无 data）时逐个回退到 fetch_latest
+    """
+    if not specs:
+        return []
+    query, variables = build_latest_batch_query(specs)
+    try:
+        r = requests.post(
+            OPENAPI_URL,
+            json={"query": query, "variables": variables},
+            timeout=30,
+        )
+        data = r.json()
+    except Exception as e:
+        logger.error(f"批量请求失败 [{len(specs)} 个 Space]，逐个回退查询: {e}")
+        return [fetch_latest(alias, sid) for sid, alias, _ in specs]
+
+    body = data.get("data")
+    if data.get("errors"):
+        logger.warning(f"OpenAPI 批量查询出错 [{len(specs)} 个 Space]: {data['errors']}")
+    if not body:
+        return [fetch_latest(alias, sid) for sid, alias, _ in specs]
+
+    results = []
+    for i, (sid, alias, _) in enumerate(specs):
+        space = body.get(f"s{i}")
+        if space:
+            lst = (space.get("campaigns") or {}).get("list") or []
+            results.append({"space": space, "latest": lst[0] if lst else None})
+        elif sid is not None:
+            results.append(query_latest(QUERY_LATEST_SAFE, {"alias": alias}, alias))
+        else:
+            logger.warning(f"Space 不存在: {alias}")
+            results.append(None)
+    return results
+
+
+def save_space_ids(space_ids: Dict[str, int]):
+    """把首次按 alias 查询得到的 spaceId 写回配置（alias 不区分大小写）"""
+    with config_lock():
+        cfg = load_config()
+        updated = 0
+        for p in cfg.get("projects", []):
+            sid = space_ids.get((p.get("alias") or "").lower())
+            if sid is not None and parse_space_id(p.get("space_id")) is None:
+                p["space_id"] = sid
+                updated += 1
+        if updated:
+            save_config(cfg)
+    if updated:
+        logger.info(f"已补全 {updated} 个项目的 spaceId")
+
+
 def extract_campaign_id(latest: Optional[Dict]) -> Optional[str]:
     """提取活动 ID"""
     if not latest:
@@ -349,12 +552,14 @@ def sort_projects(projects: List[dict]) -> List[dict]:
     排序规则：
     1. 按状态分组（未开始 > 进行中 > 未知 > 已结束）
     2. trending 优先于 custom
-    3. startTime 倒序
-    4. 名称字母序
+    3. 热度分倒序
+    4. startTime 倒序
+    5. 名称字母序
     """
     def sort_key(p):
         group = get_status_group(p)
         trending_rank = 0 if p.get("category") == "trending" else 1
+        score = p.get("trending_score") or 0
         
         # 获取时间戳
         latest = p.get("latest") or {}
@@ -366,13 +571,174 @@ def sort_projects(projects: List[dict]) -> List[dict]:
         
         name = (p.get("name") or "").lower()
         
-        return (group, trending_rank, -ts, name)
+        return (group, trending_rank, -score, -ts, name)
     
     return sorted(projects, key=sort_key)
 
 
+# =============== 推送路由 ===============
+
+class NotifyRoutes:
+    """
+    由配置编译出的推送路由表
+    
+    - 相同 chat_id / 相同 webhook 的目标合并为一条路由，同一 chat 不会重复收到消息；
+      同一 chat 配置的多个 Bot 合并为 Bot 池，由调度器负载均衡
+    - 按 alias（不区分大小写）建立 alias -> 路由 的索引，未设置 projects 的路由对所有项目生效
+    - 匹配开销只与命中的路由数有关，与配置的目标总数无关
+    """
+    
+    CHANNELS = ("telegram", "discord", "webhook")
+    
+    def __init__(self):
+        self.all: Dict[str, List[dict]] = {c: [] for c in self.CHANNELS}
+        self.wildcard: Dict[str, List[dict]] = {c: [] for c in self.CHANNELS}
+        self.by_alias: Dict[str, Dict[str, List[dict]]] = {}
+    
+    def match(self, channel: str, alias: Optional[str]) -> List[dict]:
+        """返回某个项目在指定渠道下的推送路由；alias 为空（测试通知）时返回全部"""
+        if not alias:
+            return self.all[channel]
+        specific = self.by_alias.get(alias.lower())
+        if not specific or not specific.get(channel):
+            return self.wildcard[channel]
+        return self.wildcard[channel] + specific[channel]
+
+
+def target_bot_tokens(target: dict) -> List[str]:
+    """目标配置的 Bot Token 列表（bot_tokens 与 bot_token 合并去重，保持顺序）"""
+    tokens = list(target.get("bot_tokens") or [])
+    if target.get("bot_token"):
+        tokens.insert(0, target["bot_token"])
+    return list(dict.fromkeys(t for t in tokens if t))
+
+
+def parse_reminders(spec) -> List[tuple]:
+    """
+    解析提醒配置 {"start": [60], "end": [360]}（单位：分钟）
+    
+    返回去重排序后的 [("start", 3600), ("end", 21600)]（单位：秒）
+    """
+    out = set()
+    for kind in ("start", "end"):
+        for minutes in (spec or {}).get(kind) or []:
+            try:
+                seconds = int(float(minutes) * 60)
+            except (TypeError, ValueError):
+                logger.warning(f"忽略无效的提醒配置: {kind}={minutes}")
+                continue
+            if seconds > 0:
+                out.add((kind, seconds))
+    return sorted(out)
+
+
+def compile_notify_routes(cfg: dict) -> NotifyRoutes:
+    """把 notify_targets（及旧版单一配置）编译成路由表"""
+    merged: Dict[tuple, dict] = {}
+    default_reminders = cfg.get("reminders")
+    
+    def add(channel: str, key: tuple, route: dict, projects, reminders=None):
+        projects = {p.strip().lower() for p in (projects or []) if p and p.strip()}
+        reminders = parse_reminders(reminders if reminders is not None else default_reminders)
+        existing = merged.get(key)
+        if existing is None:
+            route["channel"] = channel
+            route["projects"] = projects or None  # None 表示全部项目
+            route["reminders"] = reminders
+            merged[key] = route
+            return
+        # 重复目标：项目过滤取并集，任一目标不过滤则全部推送
+        if existing["projects"] is not None:
+            existing["projects"] = None if not projects else existing["projects"] | projects
+        existing["reminders"] = sorted(set(existing["reminders"]) | set(reminders))
+        existing["digest_window"] = max(existing.get("digest_window", 0), route.get("digest_window", 0))
+        # 同一 chat 的多个 Bot 合并为 Bot 池
+        if "bot_tokens" in existing:
+            existing["bot_tokens"] += [t for t in route["bot_tokens"] if t not in existing["bot_tokens"]]
+    
+    notify_targets = cfg.get("notify_targets", [])
+    for target in notify_targets:
+        if not target.get("enabled", True):
+            continue
+        kind = (target.get("type") or "telegram").lower()
+        if kind == "webhook":
+            url = target.get("url")
+            if url:
+                add("webhook", ("webhook", url), {
+                    "name": target.get("name"),
+                    "url": url,
+                    "secret": target.get("secret") or "",
+                    "batch_size": max(1, int(target.get("batch_size") or 50)),
+                    "batch_linger": float(target.get("batch_linger") or 2),
+                }, target.get("projects"), {})
+            continue
+        if kind == "discord":
+            webhook = target.get("webhook_url")
+            if webhook:
+                add("discord", ("discord", webhook), {"name": target.get("name"), "webhook_url": webhook},
+                    target.get("projects"), target.get("reminders"))
+            continue
+        tokens = target_bot_tokens(target)
+        chat_id = target.get("chat_id")
+        if tokens and chat_id:
+            add("telegram", ("telegram", str(chat_id)), {
+                "name": target.get("name"),
+                "bot_tokens": tokens,
+                "chat_id": chat_id,
+                "digest_window": float(target.get("digest_window") or 0),
+            }, target.get("projects"), target.get("reminders"))
+    
+    # 如果没有配置notify_targets,使用旧的单一配置(向后兼容)
+    if not notify_targets:
+        token = cfg.get("telegram_bot_token") or ""
+        chat_id = cfg.get("telegram_chat_id") or ""
+        if token and chat_id:
+            add("telegram", ("telegram", str(chat_id)), {
+                "name": None, "bot_tokens": [token], "chat_id": chat_id, "digest_window": 0.0,
+            }, None)
+    webhook = cfg.get("discord_webhook_url") or ""
+    if webhook:
+        add("discord", ("discord", webhook), {"name": "discord", "webhook_url": webhook}, None)
+    
+    routes = NotifyRoutes()
+    for route in merged.values():
+        channel = route["channel"]
+        routes.all[channel].append(route)
+        if route["projects"] is None:
+            routes.wildcard[channel].append(route)
+            continue
+        for alias in route["projects"]:
+            routes.by_alias.setdefault(alias, {c: [] for c in NotifyRoutes.CHANNELS})[channel].append(route)
+    return routes
+
+
+_routes_cache = {"cfg": None, "routes": None}
+_routes_cache_lock = threading.Lock()
+
+
+def route_target_key(route: dict) -> str:
+    """推送目标的稳定标识（Discord webhook 含密钥，只保留摘要）"""
+    if route["channel"] == "telegram":
+        return f"telegram:{route['chat_id']}"
+    url = route["webhook_url"] if route["channel"] == "discord" else route["url"]
+    return f"{route['channel']}:" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def get_notify_routes(cfg: dict) -> NotifyRoutes:
+    """获取配置对应的路由表；同一个配置对象只编译一次，配置重新加载后自动重新编译"""
+    with _routes_cache_lock:
+        if _routes_cache["cfg"] is not cfg:
+            _routes_cache["routes"] = compile_notify_routes(cfg)
+            _routes_cache["cfg"] = cfg
+        return _routes_cache["routes"]
+
+
 # =============== 通知推送 ===============
 
+# Telegram 单条消息长度上限
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
 def build_notify_text(project_name: str, alias: str, latest: Dict, url: Optional[str]) -> str:
     """构建通知消息文本"""
     title = (latest or {}).get("name") or "(无标题活动)"
@@ -403,147 +769,2460 @@ def build_notify_text(project_name: str, alias: str, latest: Dict, url: Optional
     return message
 
 
-def send_telegram_to_target(token: str, chat_id: str, text: str) -> bool:
-    """发送消息到指定的Telegram目标"""
+def post_telegram(token: str, chat_id: str, text: str, message_id: Optional[int] = None) -> dict:
+    """
+    调用 Telegram sendMessage；传入 message_id 时改为 editMessageText 原地更新该消息
+    
+    返回 {"ok", "message_id", "retry_after", "retryable", "error"}；
+    HTTP 429 时 retry_after 为 Telegram 要求等待的秒数（parameters.retry_after），
+    网络异常和 5xx 标记为 retryable，其余 4xx（如 chat not found）重试也无意义
+    """
+    result = {"ok": False, "message_id": None, "retry_after": None, "retryable": False, "status": None, "error": None}
     try:
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        method = "editMessageText" if message_id else "sendMessage"
+        url = f"https://api.telegram.org/bot{token}/{method}"
         payload = {
             "chat_id": chat_id,
             "text": text,
             "parse_mode": "HTML",
             "disable_web_page_preview": False
         }
+        if message_id:
+            payload["message_id"] = message_id
         response = requests.post(url, json=payload, timeout=10)
+        result["status"] = response.status_code
         
         if response.status_code == 200:
-            logger.info(f"✅ Telegram 通知已发送到 {chat_id}")
-            return True
-        else:
-            error_msg = response.json().get("description", "未知错误")
-            logger.error(f"❌ Telegram 推送失败 [{response.status_code}]: {error_msg}")
-            logger.error(f"   Chat ID: {chat_id}")
-            return False
+            if message_id:
+                logger.info(f"✏️ Telegram 消息已更新 {chat_id}#{message_id}")
+                result["message_id"] = message_id
+            else:
+                logger.info(f"✅ Telegram 通知已发送到 {chat_id}")
+                result["message_id"] = (response.json().get("result") or {}).get("message_id")
+            result["ok"] = True
+            return result
+        
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        error_msg = data.get("description", "未知错误")
+        if message_id and "message is not modified" in error_msg:
+            # 内容与原消息一致，视为已更新
+            result["ok"] = True
+            result["message_id"] = message_id
+            return result
+        result["error"] = f"[{response.status_code}] {error_msg}"
+        result["retryable"] = response.status_code >= 500
+        
+        if response.status_code == 429:
+            retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+            result["retry_after"] = float(retry_after)
+            logger.warning(f"⏳ Telegram 限流 [{chat_id}]，{retry_after}s 后重试")
+            return result
+        
+        logger.error(f"❌ Telegram 推送失败 [{response.status_code}]: {error_msg}")
+        logger.error(f"   Chat ID: {chat_id}")
+        return result
     except Exception as e:
         logger.error(f"❌ Telegram 推送异常: {e}")
-        return False
+        result["error"] = str(e)
+        result["retryable"] = True
+        return result
 
 
-def send_telegram(cfg: dict, text: str, project_alias: str = None):
-    """发送 Telegram 通知(支持多Bot多群组)"""
-    # 获取通知目标列表
-    notify_targets = cfg.get("notify_targets", [])
+def build_digest_entry(event: dict) -> str:
+    """汇总消息中的单个活动条目"""
+    latest = event.get("latest") or {}
+    title = latest.get("name") or "(无标题活动)"
+    status = build_status(latest)
+    start = format_time(latest.get("startTime"))
+    end = format_time(latest.get("endTime"))
+    return (
+        f"📊 <b>{event.get('project_name')}</b> · {title}\n"
+        f"{status} | ⏰ {start} ~ {end}\n"
+        f"🔗 <a href=\"{event.get('url')}\">立即参与</a>"
+    )
+
+
+def build_digest_messages(events: List[dict], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[Tuple[str, List[int]]]:
+    """
+    把多个活动合并为汇总消息，仅在超过 Telegram 长度上限时拆分为多条
     
-    # 如果没有配置notify_targets,使用旧的单一配置(向后兼容)
-    if not notify_targets:
-        token = cfg.get("telegram_bot_token") or ""
-        chat_id = cfg.get("telegram_chat_id") or ""
-        if token and chat_id:
-            send_telegram_to_target(token, chat_id, text)
-        return
+    返回 [(消息文本, 该消息包含的活动在 events 中的下标)]，调用方按下标只结算本条消息中活动的推送去重
+    """
+    footer = "━━━━━━━━━━━━━━━\n<i>💡 由 NTX 社区提供</i>"
+    header_reserve = 64  # 预留给 "(1/3)" 等分页标题
+    
+    chunks: List[List[Tuple[int, str]]] = [[]]
+    size = header_reserve + len(footer)
+    for index, entry in enumerate(build_digest_entry(e) for e in events):
+        if chunks[-1] and size + len(entry) + 2 > limit:
+            chunks.append([])
+            size = header_reserve + len(footer)
+        chunks[-1].append((index, entry))
+        size += len(entry) + 2
+    
+    messages = []
+    for i, chunk in enumerate(chunks, start=1):
+        page = f" ({i}/{len(chunks)})" if len(chunks) > 1 else ""
+        header = f"<b>Galxe 空投任务汇总</b>{page}\n共 {len(events)} 个新活动"
+        text = "\n\n".join([header] + [entry for _, entry in chunk] + [footer])
+        messages.append((text, [index for index, _ in chunk]))
+    return messages
+
+
+def send_telegram_to_target(token: str, chat_id: str, text: str) -> bool:
+    """发送消息到指定的Telegram目标"""
+    return post_telegram(token, chat_id, text)["ok"]
+
+
+def send_telegram(cfg: dict, text: str, project_alias: str = None, event: Optional[dict] = None,
+                  ticket: Optional["DeliveryTicket"] = None):
+    """发送 Telegram 通知(支持多Bot多群组)
     
-    # 遍历所有通知目标
+    event 为活动事件（project_name/alias/latest/url）；目标配置了 digest_window 时
+    事件进入汇总缓冲区，窗口结束后合并成一条消息推送。
+    """
     sent_count = 0
-    for target in notify_targets:
-        # 检查是否启用
-        if not target.get("enabled", True):
+    cid = extract_campaign_id(event.get("latest")) if event else None
+    for route in get_notify_routes(cfg).match("telegram", project_alias):
+        dedup = sent_campaigns.reserve(route_target_key(route), cid) if cid else None
+        if cid and dedup is None:
+            logger.info(f"⏭️ [{project_alias}] 活动 {cid} 已推送到 {route['name'] or route['chat_id']}，跳过")
+            continue
+        if route["digest_window"] > 0 and event is not None and dispatcher.running:
+            digest_buffer.add(route["bot_tokens"], route["chat_id"], route["name"], route["digest_window"], event, dedup,
+                              ticket)
             continue
         
-        # 检查项目过滤(如果指定了projects列表)
-        target_projects = target.get("projects", [])
-        if target_projects and project_alias:
-            if project_alias not in target_projects:
-                continue
-        
-        token = target.get("bot_token")
-        chat_id = target.get("chat_id")
-        
-        if token and chat_id:
-            if send_telegram_to_target(token, chat_id, text):
-                sent_count += 1
+        if dispatch_telegram(route["bot_tokens"], route["chat_id"], text, route["name"], event, [dedup], [ticket]):
+            sent_count += 1
     
     if sent_count > 0:
-        logger.info(f"📤 共推送到 {sent_count} 个目标")
+        if dispatcher.running:
+            logger.info(f"📤 已加入推送队列，共 {sent_count} 个目标")
+        else:
+            logger.info(f"📤 共推送到 {sent_count} 个目标")
 
 
-def send_discord(cfg: dict, text: str):
-    """发送 Discord 通知"""
-    webhook = cfg.get("discord_webhook_url") or ""
+# Discord 单条消息最多 10 个 embed，所有 embed 合计不超过 6000 字符
+DISCORD_MAX_EMBEDS = 10
+DISCORD_EMBED_CHARS = 6000
+
+
+def build_discord_embed(event: dict) -> dict:
+    """把活动事件转换为 Discord embed"""
+    latest = event.get("latest") or {}
+    status = build_status(latest)
+    if "进行中" in status:
+        color = 0x22C55E
+    elif "未开始" in status:
+        color = 0x64748B
+    else:
+        color = 0xDC2626
     
-    if not webhook:
-        return
+    embed = {
+        "title": (latest.get("name") or "(无标题活动)")[:256],
+        "description": f"📊 **{event.get('project_name')}** · `{event.get('alias')}`",
+        "color": color,
+        "fields": [
+            {"name": "状态", "value": status, "inline": True},
+            {"name": "开始", "value": format_time(latest.get("startTime")), "inline": True},
+            {"name": "结束", "value": format_time(latest.get("endTime")), "inline": True},
+        ],
+        "footer": {"text": "由 NTX 社区提供"},
+    }
+    if event.get("url"):
+        embed["url"] = event["url"]
+    return embed
+
+
+def embed_size(embed: dict) -> int:
+    """按 Discord 的计算方式统计 embed 文本长度"""
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", ""))
+    for field in embed.get("fields", []):
+        size += len(field["name"]) + len(field["value"])
+    return size
+
+
+def post_discord(webhook: str, payload: dict) -> dict:
+    """
+    调用 Discord Webhook
     
+    返回 {"ok", "retry_after", "retryable", "error"}；根据 X-RateLimit-* 响应头更新该 webhook 的限速桶，
+    HTTP 429 时 retry_after 为需要等待的秒数，网络异常和 5xx 标记为 retryable
+    """
+    result = {"ok": False, "retry_after": None, "retryable": False, "error": None}
     try:
-        requests.post(webhook, json={"content": text}, timeout=10)
-        logger.info("Discord 通知已发送")
+        response = requests.post(webhook, json=payload, timeout=10)
+        discord_limiter.update(webhook, response.headers)
+        
+        if response.status_code in (200, 204):
+            logger.info(f"Discord 通知已发送（{len(payload.get('embeds', [])) or 1} 条）")
+            result["ok"] = True
+            return result
+        
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("retry_after", 1))
+            except ValueError:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            result["retry_after"] = retry_after
+            logger.warning(f"⏳ Discord 限流，{retry_after}s 后重试")
+            return result
+        
+        result["error"] = f"[{response.status_code}] {response.text[:200]}"
+        result["retryable"] = response.status_code >= 500
+        logger.error(f"Discord 推送失败 [{response.status_code}]: {response.text[:200]}")
+        return result
     except Exception as e:
         logger.error(f"Discord 推送失败: {e}")
+        result["error"] = str(e)
+        result["retryable"] = True
+        return result
+
+
+def send_discord_to_webhook(webhook: str, text: str) -> bool:
+    """发送消息到指定的 Discord Webhook"""
+    return post_discord(webhook, {"content": text})["ok"]
+
+
+def send_discord(cfg: dict, text: str, project_alias: str = None, event: Optional[dict] = None,
+                 ticket: Optional["DeliveryTicket"] = None):
+    """发送 Discord 通知（与 Telegram 共用推送路由）
+    
+    调度器运行时活动事件以 embed 形式进入批量缓冲区，每次 Webhook 调用最多携带 10 个活动。
+    """
+    cid = extract_campaign_id(event.get("latest")) if event else None
+    for route in get_notify_routes(cfg).match("discord", project_alias):
+        dedup = sent_campaigns.reserve(route_target_key(route), cid) if cid else None
+        if cid and dedup is None:
+            logger.info(f"⏭️ [{project_alias}] 活动 {cid} 已推送到 {route['name'] or 'discord'}，跳过")
+            continue
+        webhook = route["webhook_url"]
+        if event is not None and dispatcher.running:
+            discord_batcher.add(route, build_discord_embed(event), dedup, ticket)
+        elif dispatcher.running:
+            dispatcher.submit({
+                "channel": "discord",
+                "key": route_target_key(route),
+                "label": route["name"] or "discord",
+                "webhook": webhook,
+                "text": text,
+            })
+        else:
+            sent_campaigns.settle([dedup], send_discord_to_webhook(webhook, text))
+
+
+# 通用 Webhook 推送：连接池复用 TCP/TLS 连接
+webhook_session = requests.Session()
+webhook_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+webhook_session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+
+def campaign_status_code(latest: Optional[Dict]) -> str:
+    """机器可读的活动状态：upcoming / running / ended / unknown"""
+    status = build_status(latest)
+    if "未开始" in status:
+        return "upcoming"
+    if "进行中" in status:
+        return "running"
+    if "已结束" in status:
+        return "ended"
+    return "unknown"
+
+
+def build_webhook_event(event: dict) -> dict:
+    """把活动事件转换为通用 Webhook 的 JSON 事件"""
+    latest = event.get("latest") or {}
+    return {
+        "type": "campaign",
+        "project_name": event.get("project_name"),
+        "alias": event.get("alias"),
+        "campaign_id": extract_campaign_id(latest),
+        "name": latest.get("name"),
+        "status": campaign_status_code(latest),
+        "start_time": latest.get("startTime"),
+        "end_time": latest.get("endTime"),
+        "url": event.get("url"),
+    }
+
+
+def sign_webhook(secret: str, timestamp: str, body: bytes) -> str:
+    """HMAC-SHA256(secret, "<timestamp>." + body)，与 X-NTX-Timestamp 一起校验可防重放"""
+    return hmac.new(secret.encode("utf-8"), timestamp.encode("ascii") + b"." + body, hashlib.sha256).hexdigest()
+
+
+def post_webhook(url: str, secret: str, events: List[dict]) -> dict:
+    """
+    批量推送事件到通用 Webhook
+    
+    请求体为 {"events": [...], "sent_at"}；配置了 secret 时附带
+    X-NTX-Timestamp 与 X-NTX-Signature: sha256=<hex> 签名头。
+    返回 {"ok", "retry_after", "retryable", "error"}
+    """
+    result = {"ok": False, "retry_after": None, "retryable": False, "error": None}
+    body = json.dumps({"events": events, "sent_at": datetime.utcnow().isoformat() + "Z"},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        timestamp = str(int(time.time()))
+        headers["X-NTX-Timestamp"] = timestamp
+        headers["X-NTX-Signature"] = "sha256=" + sign_webhook(secret, timestamp, body)
+    try:
+        response = webhook_session.post(url, data=body, headers=headers, timeout=10)
+        if 200 <= response.status_code < 300:
+            logger.info(f"Webhook 推送成功（{len(events)} 条）")
+            result["ok"] = True
+            return result
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            result["retry_after"] = retry_after
+            logger.warning(f"⏳ Webhook 限流，{retry_after}s 后重试")
+            return result
+        result["error"] = f"[{response.status_code}] {response.text[:200]}"
+        result["retryable"] = response.status_code >= 500
+        logger.error(f"Webhook 推送失败 [{response.status_code}]: {response.text[:200]}")
+        return result
+    except Exception as e:
+        logger.error(f"Webhook 推送失败: {e}")
+        result["error"] = str(e)
+        result["retryable"] = True
+        return result
+
+
+def send_webhooks(cfg: dict, project_alias: str, event: dict, ticket: Optional["DeliveryTicket"] = None):
+    """推送活动事件到通用 Webhook 目标：调度器运行时进入批量缓冲区，否则同步发送"""
+    cid = extract_campaign_id(event.get("latest"))
+    payload = build_webhook_event(event)
+    for route in get_notify_routes(cfg).match("webhook", project_alias):
+        dedup = sent_campaigns.reserve(route_target_key(route), cid) if cid else None
+        if cid and dedup is None:
+            continue
+        if dispatcher.running:
+            webhook_batcher.add(route, payload, dedup, ticket)
+        else:
+            sent_campaigns.settle([dedup], post_webhook(route["url"], route["secret"], [payload])["ok"])
+
+
+def should_notify(latest: Dict) -> bool:
+    """判断是否应该推送通知
+    
+    推送条件:
+    1. 活动未开始 或 正在进行中
+    2. 活动结束时间在未来60天内
+    3. 活动未结束
+    """
+    if not latest:
+        return False
+    
+    now = datetime.now(timezone.utc)
+    
+    # 检查活动时间
+    start_ts = latest.get("startTime")
+    end_ts = latest.get("endTime")
+    
+    if not start_ts or not end_ts:
+        return False
+    
+    try:
+        start_time = datetime.fromtimestamp(int(start_ts) / 1000, timezone.utc)
+        end_time = datetime.fromtimestamp(int(end_ts) / 1000, timezone.utc)
+    except:
+        return False
+    
+    # 条件1: 活动不能已经结束
+    if now > end_time:
+        logger.debug(f"跳过推送 - 活动已结束")
+        return False
+    
+    # 条件2: 结束时间不能太遥远(60天后)
+    days_until_end = (end_time - now).days
+    if days_until_end > 60:
+        logger.debug(f"跳过推送 - 活动结束时间太远({days_until_end}天后)")
+        return False
+    
+    # 条件3: 开始时间不能太早(超过30天前开始的不推送)
+    if now > start_time:
+        days_since_start = (now - start_time).days
+        if days_since_start > 30:
+            logger.debug(f"跳过推送 - 活动开始时间太久({days_since_start}天前)")
+            return False
+    
+    return True
+
+
+def send_notifications(cfg: dict, project_name: str, alias: str, latest: Dict, url: Optional[str],
+                       ticket: Optional["DeliveryTicket"] = None):
+    """发送通知（支持 Telegram/Discord）；ticket 为持久化队列消息的投递凭据，随推送任务传递"""
+    method = (cfg.get("notify_method") or "none").lower()
+    
+    if method == "none":
+        return
+    
+    # 检查是否应该推送
+    if not should_notify(latest):
+        logger.info(f"⏭️  跳过推送 [{project_name}] - 不符合推送条件")
+        return
+    
+    text = build_notify_text(project_name, alias, latest, url)
+    event = {"project_name": project_name, "alias": alias, "latest": latest, "url": url}
+    
+    if method in ("telegram", "both"):
+        send_telegram(cfg, text, alias, event, ticket)
+    if method in ("discord", "both"):
+        send_discord(cfg, text, alias, event, ticket)
+    send_webhooks(cfg, alias, event, ticket)
+    
+    if reminder_scheduler.running:
+        routes = get_notify_routes(cfg)
+        channels = [c for c in NotifyRoutes.CHANNELS if method in (c, "both")]
+        reminder_scheduler.schedule([r for c in channels for r in routes.match(c, alias) if r["reminders"]], event)
+
+
+# =============== 异步推送调度 ===============
+
+class NotificationDispatcher:
+    """
+    异步推送调度器
+    
+    - 有界队列 + 工作线程池，监控循环只负责入队，不再等待网络请求
+    - 同一推送目标（chat / webhook）固定分配到同一个工作线程，保证消息顺序
+    - Telegram 消息先经过令牌桶限速；被限流（429）的消息留在该目标队首，
+      等待 retry_after 后重发，不会丢弃，也不会阻塞同线程的其他目标
+    - 其他可重试的失败按带抖动的指数退避重试，超过 max_attempts 次后进入死信存储
+      （编辑已推送消息的任务失败时不进死信，只从消息索引中移除）
+    - 队列已满无法入队的任务同样写入死信，每个任务最终要么送达、要么进入死信
+    - 统计队列深度与每个目标的推送耗时
+    """
+    
+    def __init__(self, workers: int = 4, queue_size: int = 1000):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.max_attempts = 5
+        self.retry_base_delay = 2.0
+        self.retry_max_delay = 300.0
+        self.running = False
+        self.dropped = 0
+        self.throttled = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._queues: List[queue.Queue] = []
+        self._held: List[int] = []
+        self._targets: Dict[str, dict] = {}
+        self._stats_lock = threading.Lock()
+    
+    def start(self):
+        """启动工作线程"""
+        if self.running:
+            return
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._held = [0] * self.workers
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, args=(i,), name=f"notify-worker-{i}", daemon=True).start()
+        self.running = True
+        logger.info(f"推送调度器已启动（{self.workers} 个工作线程，每个队列上限 {self.queue_size}）")
+    
+    def submit(self, job: dict, timeout: float = 5, spill: bool = True) -> bool:
+        """
+        提交推送任务；队列满时最多等待 timeout 秒
+        
+        仍然满时返回 False：spill=True 时任务写入死信并按最终失败结束（不会静默丢失），
+        spill=False 时任务原样交还调用方稍后重试（如 Webhook 批次放回缓冲区）
+        """
+        q = self._queues[zlib.crc32(job["key"].encode("utf-8")) % len(self._queues)]
+        try:
+            q.put(job, timeout=timeout)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            if not spill:
+                return False
+            if job.get("op") == "edit":
+                # 编辑任务不进死信；消息仍在索引中，下次状态变化时再更新
+                logger.warning(f"⏭️ 推送队列已满，跳过消息更新 -> {job.get('label') or job.get('channel')}")
+                return False
+            logger.error(f"❌ 推送队列已满 -> {job.get('label') or job.get('channel')}")
+            self._finish(job, {"ok": False, "error": "推送队列已满"}, job.get("attempts", 0))
+            return False
+    
+    def _worker(self, shard: int):
+        """
+        单个工作线程：按目标维护待发队列，用最小堆记录每个目标下次可发送的时间
+        
+        同一目标只有队首消息会被发送，因此限流重试不会打乱顺序。
+        """
+        q = self._queues[shard]
+        pending: Dict[str, deque] = {}
+        ready = []  # (可发送时间, 序号, 目标 key)
+        seq = 0
+        
+        while True:
+            # 取新任务：持有的任务未达上限时才从有界队列中取，保持反压
+            timeout = max(0.0, ready[0][0] - time.monotonic()) if ready else None
+            if self._held[shard] < self.queue_size:
+                try:
+                    job = q.get(timeout=timeout)
+                    q.task_done()
+                    key = job["key"]
+                    if key not in pending:
+                        pending[key] = deque()
+                        seq += 1
+                        heapq.heappush(ready, (0.0, seq, key))
+                    pending[key].append(job)
+                    self._held[shard] += 1
+                except queue.Empty:
+                    pass
+            elif timeout:
+                time.sleep(timeout)
+            
+            now = time.monotonic()
+            while ready and ready[0][0] <= now:
+                _, _, key = heapq.heappop(ready)
+                job = pending[key][0]
+                
+                wait = reserve_send(job)
+                if wait is None:
+                    # 所有 Bot 都不可用：直接进入死信
+                    pending[key].popleft()
+                    self._held[shard] -= 1
+                    self._record(job, False, 0.0)
+                    self._finish(job, {"ok": False, "error": "没有可用的 Bot"}, job.get("attempts", 0))
+                    if not pending[key]:
+                        del pending[key]
+                        continue
+                    wait = 0.0
+                elif wait <= 0:
+                    started = time.monotonic()
+                    try:
+                        result = deliver_job(job)
+                    except Exception as e:
+                        logger.error(f"推送任务异常: {e}")
+                        result = {"ok": False, "retry_after": None, "retryable": True, "error": str(e)}
+                    attempts = job.get("attempts", 0) + 1
+                    
+                    if result["retry_after"] is not None:
+                        # 被限流：消息留在队首，暂停该发送方；多 Bot 时会立即换其他 Bot 重发（不计入重试次数）
+                        penalize_send(job, result["retry_after"])
+                        with self._stats_lock:
+                            self.throttled += 1
+                        wait = 0.0
+                    elif job.get("channel") == "telegram" and result.get("status") in (401, 403) and len(job.get("tokens") or []) > 1:
+                        # Bot 被封禁 / 移出群组：停用该 Bot，换其他 Bot 重发
+                        telegram_limiter.disable(job["token"], job["chat_id"])
+                        logger.warning(f"🤖 Bot {job['token'].split(':')[0]} 在 {job['chat_id']} 不可用，切换其他 Bot")
+                        wait = 0.0
+                    elif not result["ok"] and result.get("retryable") and attempts < self.max_attempts:
+                        # 可重试的失败：留在队首，指数退避后重发，保证该目标的消息顺序
+                        job["attempts"] = attempts
+                        wait = self.backoff_delay(attempts)
+                        with self._stats_lock:
+                            self.retried += 1
+                        logger.warning(f"🔁 推送失败，{wait:.1f}s 后第 {attempts} 次重试 -> {job.get('label') or key}")
+                    else:
+                        pending[key].popleft()
+                        self._held[shard] -= 1
+                        self._record(job, result["ok"], time.monotonic() - started)
+                        self._finish(job, result, attempts)
+                        if not pending[key]:
+                            del pending[key]
+                            continue
+                        wait = 0.0
+                
+                seq += 1
+                heapq.heappush(ready, (time.monotonic() + wait, seq, key))
+                now = time.monotonic()
+    
+    def _finish(self, job: dict, result: dict, attempts: int):
+        """任务结束：最终失败的先写入死信，再执行完成回调（编辑任务失败不进死信）"""
+        if not result["ok"] and job.get("op") != "edit":
+            dead_letters.add(job, result.get("error"), attempts)
+            with self._stats_lock:
+                self.dead_lettered += 1
+        on_job_delivered(job, result)
+    
+    def backoff_delay(self, attempts: int) -> float:
+        """带抖动的指数退避：base * 2^(n-1)，不超过上限，再乘以 0.5~1 的随机系数"""
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+    
+    def _record(self, job: dict, ok: bool, elapsed: float):
+        """记录单个目标的推送结果与耗时"""
+        ms = elapsed * 1000
+        with self._stats_lock:
+            t = self._targets.setdefault(job["key"], {
+                "label": job.get("label") or job["key"],
+                "sent": 0,
+                "failed": 0,
+                "last_ms": 0.0,
+                "avg_ms": 0.0,
+                "max_ms": 0.0,
+            })
+            t["sent" if ok else "failed"] += 1
+            n = t["sent"] + t["failed"]
+            t["avg_ms"] += (ms - t["avg_ms"]) / n
+            t["last_ms"] = ms
+            t["max_ms"] = max(t["max_ms"], ms)
+    
+    def stats(self) -> dict:
+        """队列深度与各目标推送耗时"""
+        with self._stats_lock:
+            targets = {k: dict(v) for k, v in self._targets.items()}
+            dropped = self.dropped
+        depths = [q.qsize() + held for q, held in zip(self._queues, self._held)]
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_depth": sum(depths),
+            "queue_capacity": self.queue_size * len(self._queues) * 2,
+            "shard_depths": depths,
+            "dropped": dropped,
+            "throttled": self.throttled,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "targets": targets,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+
+dispatcher = NotificationDispatcher()
+
+
+def deliver_job(job: dict) -> dict:
+    """
+    在工作线程中执行单个推送任务
+    
+    返回 {"ok", "retry_after", "retryable", "error"}：retry_after 不为 None 表示被限流，
+    retryable 表示失败可以退避重试
+    """
+    channel = job.get("channel")
+    if channel == "telegram":
+        return post_telegram(job["token"], job["chat_id"], job["text"], job.get("message_id"))
+    if channel == "discord":
+        payload = {"embeds": job["embeds"]} if job.get("embeds") else {"content": job["text"]}
+        return post_discord(job["webhook"], payload)
+    if channel == "webhook":
+        # 签名密钥不写入任务（避免落入死信文件），发送时从当前配置读取
+        route = next((r for r in get_notify_routes(load_config_cached()).all["webhook"] if r["url"] == job["url"]), None)
+        if route is None:
+            return {"ok": False, "retry_after": None, "retryable": False, "error": "Webhook 目标已删除"}
+        return post_webhook(job["url"], route["secret"], job["events"])
+    logger.error(f"未知推送渠道: {channel}")
+    return {"ok": False, "retry_after": None, "retryable": False, "error": f"未知推送渠道: {channel}"}
+
+
+def dispatch_telegram(tokens, chat_id: str, text: str, label: Optional[str] = None,
+                      event: Optional[dict] = None, dedup: Optional[List[str]] = None,
+                      tickets: Optional[list] = None) -> bool:
+    """推送到 Telegram：调度器运行时入队，否则同步发送（脚本 / 测试场景）
+    
+    tokens 可以是单个 Bot Token 或多个 Token 的列表；多个时由调度器按剩余额度选择。
+    event 为单个活动事件时，发送成功后记录 message_id，状态变化时原地编辑该消息。
+    dedup 为消息包含的活动去重键（sent_campaigns.reserve 的返回值），推送结束后登记结果；
+    tickets 为消息来源的持久化队列投递凭据，推送结束后释放。
+    """
+    tokens = [tokens] if isinstance(tokens, str) else list(tokens)
+    dedup = [k for k in dedup or () if k]
+    if not dispatcher.running:
+        ok = any(send_telegram_to_target(token, chat_id, text) for token in tokens)
+        sent_campaigns.settle(dedup, ok)
+        return ok
+    job = {
+        "channel": "telegram",
+        "key": f"telegram:{chat_id}",
+        "label": label or str(chat_id),
+        "tokens": tokens,
+        "token": tokens[0],
+        "chat_id": chat_id,
+        "text": text,
+    }
+    if event is not None:
+        job["event"] = event
+    if dedup:
+        job["dedup"] = dedup
+    held = hold_tickets(tickets)
+    if held:
+        job["tickets"] = held
+    return dispatcher.submit(job)
+
+
+def on_job_delivered(job: dict, result: dict):
+    """
+    推送任务结束（成功或最终失败）后的回调：登记去重结果，维护已推送消息索引 / Webhook 在途批次，
+    最后释放持久化队列的投递凭据
+    """
+    try:
+        _on_job_delivered(job, result)
+    finally:
+        release_tickets(job.pop("tickets", None))
+
+
+def _on_job_delivered(job: dict, result: dict):
+    sent_campaigns.settle(job.get("dedup"), result["ok"])
+    if job.get("channel") == "webhook":
+        if job.get("inflight"):
+            webhook_batcher.done(job["url"])
+        return
+    if job.get("channel") != "telegram":
+        return
+    if job.get("op") == "edit":
+        if not result["ok"]:
+            # 原消息已被删除 / Bot 被移出群组：不再尝试编辑
+            message_index.forget(job["cid"], job["chat_id"])
+        return
+    if result["ok"] and result.get("message_id") and job.get("event"):
+        message_index.record(job, result["message_id"])
+
+
+def start_dispatcher(cfg: dict):
+    """按配置启动推送调度器"""
+    telegram_limiter.configure(cfg)
+    message_index.max_campaigns = int(cfg.get("message_index_max", message_index.max_campaigns))
+    message_index.load()
+    sent_campaigns.max_entries = int(cfg.get("dedup_max_entries", sent_campaigns.max_entries))
+    sent_campaigns.ttl = float(cfg.get("dedup_ttl_days", sent_campaigns.ttl / 86400)) * 86400
+    reminder_scheduler.load()
+    reminder_scheduler.start()
+    digest_buffer.start()
+    discord_batcher.linger = float(cfg.get("discord_batch_linger", discord_batcher.linger))
+    discord_batcher.start()
+    webhook_batcher.max_inflight = max(1, int(cfg.get("webhook_max_inflight", webhook_batcher.max_inflight)))
+    webhook_batcher.start()
+    dispatcher.workers = max(1, int(cfg.get("dispatcher_workers", dispatcher.workers)))
+    dispatcher.queue_size = int(cfg.get("dispatcher_queue_size", dispatcher.queue_size))
+    dispatcher.max_attempts = max(1, int(cfg.get("retry_max_attempts", dispatcher.max_attempts)))
+    dispatcher.retry_base_delay = float(cfg.get("retry_base_delay", dispatcher.retry_base_delay))
+    dispatcher.retry_max_delay = float(cfg.get("retry_max_delay", dispatcher.retry_max_delay))
+    dispatcher.start()
+
+
+def notifier_stats() -> dict:
+    """调度器 + 持久化队列的统计信息"""
+    stats = dispatcher.stats()
+    stats["digest"] = digest_buffer.stats()
+    stats["webhooks"] = webhook_batcher.stats()
+    stats["bots"] = telegram_limiter.stats()
+    stats["dead_letters"] = dead_letters.count()
+    stats["tracked_messages"] = message_index.count()
+    stats["sent_campaigns"] = sent_campaigns.count()
+    stats["reminders"] = reminder_scheduler.stats()
+    if push_queue is not None:
+        stats["push_queue"] = push_queue.stats()
+    return stats
+
+
+def write_dispatcher_stats():
+    """发布调度器统计，供 Web 工作进程的 /api/dispatcher 读取"""
+    try:
+        write_json_atomic(DISPATCHER_STATS_PATH, notifier_stats())
+    except Exception as e:
+        logger.error(f"写入调度器统计失败: {e}")
+
+
+# =============== 推送限速 ===============
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多累积 capacity 个"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def wait_time(self, now: float) -> float:
+        """距离可以取到一个令牌还需等待的秒数"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def block(self, now: float, seconds: float):
+        """服务端要求等待（429 retry_after）时暂停，到期后先放行一条，之后按正常速率补充"""
+        self.wait_time(now)
+        self.tokens = min(self.tokens, 1.0)
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class TelegramRateLimiter:
+    """
+    Telegram 发送限速
+    
+    - 每个 Bot 约 30 条/秒
+    - 每个 Bot 在每个群组/频道（chat_id 以 - 开头）约 20 条/分钟
+    - 每个 Bot 在每个私聊约 1 条/秒
+    
+    同一 chat 配置了多个 Bot 时，选择剩余额度最多的可用 Bot 发送；
+    被限流（429）或被封禁/移出群组（401/403）的 Bot 暂时跳过，由其他 Bot 接替。
+    """
+    
+    # Bot 在某个 chat 不可用（401/403）后的冷却时间
+    BOT_DISABLE_SECONDS = 600
+    
+    def __init__(self, per_bot: float = 30, per_group_per_min: float = 20, per_private: float = 1):
+        self.per_bot = per_bot
+        self.per_group_per_min = per_group_per_min
+        self.per_private = per_private
+        self._bots: Dict[str, TokenBucket] = {}
+        self._chats: Dict[tuple, TokenBucket] = {}
+        self._disabled: Dict[tuple, float] = {}  # (token, chat_id) -> 恢复时间
+        self._lock = threading.Lock()
+    
+    def configure(self, cfg: dict):
+        self.per_bot = float(cfg.get("telegram_rate_per_bot", self.per_bot))
+        self.per_group_per_min = float(cfg.get("telegram_rate_per_group_per_min", self.per_group_per_min))
+        self.per_private = float(cfg.get("telegram_rate_per_private", self.per_private))
+    
+    def _bot(self, token: str) -> TokenBucket:
+        b = self._bots.get(token)
+        if b is None:
+            b = self._bots[token] = TokenBucket(self.per_bot, self.per_bot)
+        return b
+    
+    def _chat(self, token: str, chat_id) -> TokenBucket:
+        key = (token, str(chat_id))
+        b = self._chats.get(key)
+        if b is None:
+            if key[1].startswith("-"):
+                b = TokenBucket(self.per_group_per_min / 60.0, self.per_group_per_min)
+            else:
+                b = TokenBucket(self.per_private, self.per_private)
+            self._chats[key] = b
+        return b
+    
+    def reserve(self, tokens: List[str], chat_id):
+        """
+        从候选 Bot 中选出一个立即可发送的（剩余额度最多者优先），并扣除令牌
+        
+        返回 (0, token)；都不可用时返回 (最短等待秒数, None)；
+        所有 Bot 都已被封禁时返回 (None, None)
+        """
+        with self._lock:
+            now = time.monotonic()
+            best = None
+            min_wait = None
+            for token in tokens:
+                if self._disabled.get((token, str(chat_id)), 0) > now:
+                    continue
+                bot, chat = self._bot(token), self._chat(token, chat_id)
+                wait = max(bot.wait_time(now), chat.wait_time(now))
+                if wait <= 0:
+                    budget = min(bot.tokens, chat.tokens)
+                    if best is None or budget > best[0]:
+                        best = (budget, token, bot, chat)
+                elif min_wait is None or wait < min_wait:
+                    min_wait = wait
+            
+            if best is not None:
+                _, token, bot, chat = best
+                bot.tokens -= 1
+                chat.tokens -= 1
+                return 0.0, token
+            return min_wait, None
+    
+    def penalize(self, token: str, chat_id, retry_after: float):
+        """收到 429 后按 retry_after 暂停该 Bot 在该 chat 的发送"""
+        with self._lock:
+            self._chat(token, chat_id).block(time.monotonic(), retry_after)
+    
+    def disable(self, token: str, chat_id, seconds: Optional[float] = None):
+        """Bot 被封禁 / 移出群组：一段时间内不再用它向该 chat 发送"""
+        with self._lock:
+            self._disabled[(token, str(chat_id))] = time.monotonic() + (seconds or self.BOT_DISABLE_SECONDS)
+    
+    def stats(self) -> dict:
+        """各 Bot 剩余额度（以 Bot ID 标识，不暴露完整 Token）"""
+        with self._lock:
+            now = time.monotonic()
+            out = {}
+            for token, bucket in self._bots.items():
+                bucket.wait_time(now)
+                out[token.split(":")[0]] = {
+                    "tokens": round(bucket.tokens, 2),
+                    "disabled_chats": sum(1 for (t, _), until in self._disabled.items() if t == token and until > now),
+                }
+            return out
+
+
+telegram_limiter = TelegramRateLimiter()
+
+
+class DiscordRateLimiter:
+    """
+    Discord Webhook 限速
+    
+    每个 webhook 一个桶，额度与重置时间来自响应头 X-RateLimit-Remaining / X-RateLimit-Reset-After，
+    额度用完后等到重置时间再发送
+    """
+    
+    def __init__(self):
+        self._buckets: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+    
+    def reserve(self, webhook: str) -> float:
+        """可以发送返回 0（并预扣一次额度），否则返回需等待的秒数"""
+        with self._lock:
+            b = self._buckets.get(webhook)
+            if b is None:
+                return 0.0
+            now = time.monotonic()
+            if now >= b["reset_at"]:
+                del self._buckets[webhook]
+                return 0.0
+            if b["remaining"] > 0:
+                b["remaining"] -= 1
+                return 0.0
+            return b["reset_at"] - now
+    
+    def update(self, webhook: str, headers):
+        """根据响应头刷新额度"""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is None or reset_after is None:
+            return
+        try:
+            bucket = {"remaining": int(remaining), "reset_at": time.monotonic() + float(reset_after)}
+        except ValueError:
+            return
+        with self._lock:
+            self._buckets[webhook] = bucket
+    
+    def penalize(self, webhook: str, retry_after: float):
+        """收到 429 后暂停该 webhook"""
+        with self._lock:
+            self._buckets[webhook] = {"remaining": 0, "reset_at": time.monotonic() + retry_after}
+
+
+discord_limiter = DiscordRateLimiter()
+
+
+webhook_blocked: Dict[str, float] = {}  # Webhook URL -> 限流解除时间（monotonic）
+
+
+def reserve_send(job: dict) -> Optional[float]:
+    """
+    按渠道限速；返回 0 表示可以立即发送，否则为需等待的秒数
+    
+    Telegram 任务会在这里选定本次使用的 Bot（写入 job["token"]）；
+    返回 None 表示该 chat 已没有可用的 Bot
+    """
+    channel = job.get("channel")
+    if channel == "telegram":
+        wait, token = telegram_limiter.reserve(job.get("tokens") or [job["token"]], job["chat_id"])
+        if token:
+            job["token"] = token
+        return wait
+    if channel == "discord":
+        return discord_limiter.reserve(job["webhook"])
+    if channel == "webhook":
+        return max(0.0, webhook_blocked.get(job["url"], 0.0) - time.monotonic())
+    return 0.0
+
+
+def penalize_send(job: dict, retry_after: float):
+    """被服务端限流（429）后暂停对应的目标"""
+    channel = job.get("channel")
+    if channel == "telegram":
+        telegram_limiter.penalize(job["token"], job["chat_id"], retry_after)
+    elif channel == "discord":
+        discord_limiter.penalize(job["webhook"], retry_after)
+    elif channel == "webhook":
+        webhook_blocked[job["url"]] = time.monotonic() + retry_after
+
+
+# =============== 推送缓冲（批量 / 汇总） ===============
+
+class DiscordBatcher:
+    """
+    Discord 批量推送缓冲区
+    
+    活动 embed 按 webhook 缓存，凑满 10 个（或达到字符上限）立即发送，
+    否则最多等待 linger 秒后把已缓存的 embed 合并为一次 Webhook 调用。
+    """
+    
+    def __init__(self, linger: float = 2.0):
+        self.linger = linger
+        self.running = False
+        self._buffers: Dict[str, dict] = {}
+        self._cond = threading.Condition()
+    
+    def add(self, route: dict, embed: dict, dedup: Optional[str] = None, ticket: Optional["DeliveryTicket"] = None):
+        webhook = route["webhook_url"]
+        ready = []
+        with self._cond:
+            buf = self._buffers.get(webhook)
+            if buf is not None and (
+                len(buf["embeds"]) >= DISCORD_MAX_EMBEDS
+                or buf["chars"] + embed_size(embed) > DISCORD_EMBED_CHARS
+            ):
+                ready.append(self._buffers.pop(webhook))
+                buf = None
+            if buf is None:
+                buf = self._buffers[webhook] = {
+                    "key": route_target_key(route),
+                    "label": route["name"],
+                    "webhook": webhook,
+                    "deadline": time.monotonic() + self.linger,
+                    "embeds": [],
+                    "chars": 0,
+                    "dedup": [],
+                    "tickets": [],
+                }
+                self._cond.notify()
+            buf["embeds"].append(embed)
+            buf["chars"] += embed_size(embed)
+            if dedup:
+                buf["dedup"].append(dedup)
+            buf["tickets"] += hold_tickets([ticket])
+            if len(buf["embeds"]) >= DISCORD_MAX_EMBEDS:
+                ready.append(self._buffers.pop(webhook))
+        # 在锁外提交：调度器队列满时 submit 最多阻塞 5 秒，不能占着缓冲区的锁
+        for buf in ready:
+            self._submit(buf)
+    
+    def _submit(self, buf: dict):
+        job = {
+            "channel": "discord",
+            "key": buf["key"],
+            "label": buf["label"] or "discord",
+            "webhook": buf["webhook"],
+            "embeds": buf["embeds"],
+        }
+        if buf["dedup"]:
+            job["dedup"] = buf["dedup"]
+        if buf["tickets"]:
+            job["tickets"] = buf["tickets"]  # 缓冲区持有的引用转交给任务
+        dispatcher.submit(job)
+    
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._loop, name="discord-batcher", daemon=True).start()
+    
+    def _loop(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [self._buffers.pop(w) for w in [w for w, b in self._buffers.items() if b["deadline"] <= now]]
+                if not due:
+                    next_deadline = min((b["deadline"] for b in self._buffers.values()), default=None)
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+            for buf in due:
+                self._submit(buf)
+
+
+discord_batcher = DiscordBatcher()
+
+
+class WebhookBatcher:
+    """
+    通用 Webhook 批量缓冲区
+    
+    - 事件按目标 URL 缓存，达到目标的 batch_size 立即发送，否则最多等待 batch_linger 秒
+    - 反压：每个目标最多 max_inflight 个批次在调度器中等待 / 发送，超过时批次留在缓冲区继续累积，
+      缓冲区也满（batch_size 的 max_inflight 倍）时 add() 阻塞调用方（推送队列线程），
+      未推送的事件留在持久化队列中，不会无限占用内存
+    - 批次在锁外提交给调度器；调度器队列已满拒收时归还在途名额，批次放回缓冲区队首，1 秒后重试
+    """
+    
+    RETRY_DELAY = 1.0
+    
+    def __init__(self, max_inflight: int = 4):
+        self.max_inflight = max_inflight
+        self.running = False
+        self.blocked = 0
+        self.requeued = 0
+        self._buffers: Dict[str, dict] = {}
+        self._targets: Dict[str, dict] = {}  # URL -> {"key", "label", "batch_size", "batch_linger"}
+        self._inflight: Dict[str, int] = {}
+        self._cond = threading.Condition()
+    
+    def _buffer(self, url: str, delay: float) -> dict:
+        """创建目标的缓冲区（调用方持有锁）"""
+        buf = self._buffers[url] = {"deadline": time.monotonic() + delay, "events": []}
+        self._cond.notify_all()
+        return buf
+    
+    def add(self, route: dict, event: dict, dedup: Optional[str] = None, ticket: Optional["DeliveryTicket"] = None):
+        url = route["url"]
+        with self._cond:
+            target = self._targets[url] = {
+                "key": route_target_key(route),
+                "label": route["name"],
+                "batch_size": route["batch_size"],
+                "batch_linger": route["batch_linger"],
+            }
+            while True:
+                buf = self._buffers.get(url)
+                if buf is None:
+                    buf = self._buffer(url, target["batch_linger"])
+                    break
+                if len(buf["events"]) < target["batch_size"] * self.max_inflight:
+                    break
+                self.blocked += 1
+                self._cond.wait(1)
+            buf["events"].append((event, dedup, ticket.hold() if ticket else None))
+            jobs = self._take(url, force=False)
+        self._submit(url, jobs)
+    
+    def _take(self, url: str, force: bool) -> List[dict]:
+        """
+        取出可以提交的批次（调用方持有锁）；force 表示 linger 到期，不足一批也发送
+        
+        每个批次先占用一个在途名额（保证不超过 max_inflight），提交失败时由 _submit 归还
+        """
+        buf = self._buffers.get(url)
+        target = self._targets.get(url)
+        jobs = []
+        while buf and buf["events"] and self._inflight.get(url, 0) < self.max_inflight:
+            size = target["batch_size"]
+            if len(buf["events"]) < size and not force:
+                break
+            batch, buf["events"] = buf["events"][:size], buf["events"][size:]
+            self._inflight[url] = self._inflight.get(url, 0) + 1
+            jobs.append({
+                "channel": "webhook",
+                "key": target["key"],
+                "label": target["label"] or "webhook",
+                "url": url,
+                "events": [e for e, _, _ in batch],
+                "dedup": [k for _, k, _ in batch],  # 与 events 一一对应
+                "tickets": [t for _, _, t in batch],
+                "inflight": True,  # 占用了在途名额，结束时调用 done() 归还
+            })
+        if buf and not buf["events"]:
+            del self._buffers[url]
+        return jobs
+    
+    def _submit(self, url: str, jobs: List[dict], timeout: float = 5):
+        """在锁外提交批次；被拒收的批次（及其后的批次）归还名额并按原顺序放回缓冲区队首"""
+        for i, job in enumerate(jobs):
+            if dispatcher.submit(job, timeout=timeout, spill=False):
+                continue
+            rest = jobs[i:]
+            with self._cond:
+                self._inflight[url] = max(0, self._inflight.get(url, 0) - len(rest))
+                buf = self._buffers.get(url) or self._buffer(url, self.RETRY_DELAY)
+                buf["events"][:0] = [entry for j in rest for entry in zip(j["events"], j["dedup"], j["tickets"])]
+                buf["deadline"] = min(buf["deadline"], time.monotonic() + self.RETRY_DELAY)
+                self.requeued += len(rest)
+                self._cond.notify_all()
+            logger.warning(f"⏳ 推送队列已满，{len(rest)} 个 Webhook 批次放回缓冲区稍后重试 -> {job['label']}")
+            return
+    
+    def done(self, url: str):
+        """调度器完成一个批次（成功或进入死信）；在工作线程中调用，提交时不等待"""
+        with self._cond:
+            self._inflight[url] = max(0, self._inflight.get(url, 0) - 1)
+            jobs = self._take(url, force=time.monotonic() >= self._buffers.get(url, {}).get("deadline", float("inf")))
+            self._cond.notify_all()
+        self._submit(url, jobs, timeout=0)
+    
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._loop, name="webhook-batcher", daemon=True).start()
+    
+    def _loop(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                ready = [(url, self._take(url, force=True)) for url, b in list(self._buffers.items()) if b["deadline"] <= now]
+                ready = [(url, jobs) for url, jobs in ready if jobs]
+                if not ready:
+                    # 在途批次已满的目标等 done() 唤醒，其余按 linger 到期时间等待
+                    next_deadline = min((b["deadline"] for b in self._buffers.values() if b["deadline"] > now), default=None)
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+            for url, jobs in ready:
+                self._submit(url, jobs)
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "buffered": sum(len(b["events"]) for b in self._buffers.values()),
+                "inflight": sum(self._inflight.values()),
+                "blocked": self.blocked,
+                "requeued": self.requeued,
+            }
+
+
+webhook_batcher = WebhookBatcher()
+
+
+class DigestBuffer:
+    """
+    汇总推送缓冲区
+    
+    目标配置 digest_window（秒）后，窗口内发现的新活动先缓存，
+    窗口结束时合并成一条消息（超过长度上限才拆分）交给调度器。
+    
+    缓存的活动持有持久化队列的投递凭据，汇总消息推送有结果后才 ack；
+    窗口内重启时这些活动会从持久化队列重新投递，重新进入汇总。
+    """
+    
+    def __init__(self):
+        self._buckets: Dict[str, dict] = {}
+        self._cond = threading.Condition()
+        self.running = False
+    
+    def add(self, tokens: List[str], chat_id: str, label: Optional[str], window: float, event: dict,
+            dedup: Optional[str] = None, ticket: Optional["DeliveryTicket"] = None):
+        key = str(chat_id)
+        with self._cond:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = {
+                    "tokens": tokens,
+                    "chat_id": chat_id,
+                    "label": label,
+                    "deadline": time.monotonic() + window,
+                    "events": [],
+                    "dedup": [],
+                    "tickets": [],
+                }
+                self._cond.notify()
+            bucket["events"].append(event)
+            bucket["dedup"].append(dedup)  # 与 events 一一对应
+            bucket["tickets"] += hold_tickets([ticket])
+        logger.info(f"🧺 [{event.get('project_name')}] 已加入汇总 -> {label or chat_id}（{len(bucket['events'])} 条待合并）")
+    
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._loop, name="notify-digest", daemon=True).start()
+    
+    def _loop(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [k for k, b in self._buckets.items() if b["deadline"] <= now]
+                flushed = [self._buckets.pop(k) for k in due]
+                if not flushed:
+                    next_deadline = min((b["deadline"] for b in self._buckets.values()), default=None)
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+            
+            for bucket in flushed:
+                messages = build_digest_messages(bucket["events"])
+                for text, indexes in messages:
+                    # 每条消息只结算自己包含的活动：拆分后某一页失败，其中的活动不会被记为已推送
+                    dedup = [bucket["dedup"][i] for i in indexes if bucket["dedup"][i]]
+                    dispatch_telegram(bucket["tokens"], bucket["chat_id"], text, bucket["label"],
+                                      dedup=dedup, tickets=bucket["tickets"])
+                # 每条汇总消息已各自持有引用，释放缓冲区自己的
+                release_tickets(bucket["tickets"])
+                logger.info(f"📦 汇总推送 {len(bucket['events'])} 个活动 -> {bucket['label'] or bucket['chat_id']}（{len(messages)} 条消息）")
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return {"buffers": len(self._buckets), "events": sum(len(b["events"]) for b in self._buckets.values())}
+
+
+digest_buffer = DigestBuffer()
+
+
+# =============== 死信存储 ===============
+
+# 推送任务中的凭据字段：Bot Token、Discord / 通用 Webhook 地址（地址本身即密钥）
+JOB_SECRET_FIELDS = ("token", "tokens", "webhook", "url")
+# 只在本进程内有意义的字段，不写入死信
+JOB_RUNTIME_FIELDS = ("inflight", "tickets")
+
+
+def attach_job_credentials(job: dict, cfg: dict) -> bool:
+    """
+    按任务的目标 key（route_target_key）从当前配置找回凭据，重放死信时使用；
+    目标已从配置中删除时返回 False
+    """
+    channel = job.get("channel")
+    key = job.get("key") or ""
+    if channel in ("discord", "webhook") and "://" in key:
+        # 旧版死信：key 中是完整的 Webhook 地址
+        url = key.split(":", 1)[1]
+        key = job["key"] = route_target_key({"channel": channel, "webhook_url": url, "url": url})
+    route = next((r for r in get_notify_routes(cfg).all.get(channel, []) if route_target_key(r) == key), None)
+    if route is None:
+        return False
+    if channel == "telegram":
+        job["tokens"] = list(route["bot_tokens"])
+        job["token"] = job["tokens"][0]
+    elif channel == "discord":
+        job["webhook"] = route["webhook_url"]
+    else:
+        job["url"] = route["url"]
+    return True
+
+
+class DeadLetterStore:
+    """
+    推送失败（重试耗尽或不可重试）的消息追加写入 JSON Lines 文件，
+    运维可通过 /admin/dead_letters 查看，并通过 /admin/dead_letters/replay 批量重放
+    
+    文件中只保存目标 key（Discord / Webhook 为地址摘要），不保存 Token 和 Webhook 地址，
+    重放时按 key 从当前配置找回凭据
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def add(self, job: dict, error: Optional[str], attempts: int):
+        record = {
+            "failed_at": datetime.utcnow().isoformat() + "Z",
+            "attempts": attempts,
+            "error": error,
+            "job": {k: v for k, v in job.items() if k not in JOB_SECRET_FIELDS + JOB_RUNTIME_FIELDS},
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except Exception as e:
+                logger.error(f"写入死信失败: {e}")
+                return
+        logger.error(f"☠️ 推送最终失败，已写入死信 -> {job.get('label') or job.get('channel')}: {error}")
+    
+    def _read(self, path: str) -> List[dict]:
+        records = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.error(f"死信记录损坏，已跳过: {line[:100]}")
+        except FileNotFoundError:
+            pass
+        return records
+    
+    def list(self, limit: int = 200) -> List[dict]:
+        """最近的死信（不包含 Bot Token、Webhook 地址等敏感字段）"""
+        with self._lock:
+            records = self._read(self.path)[-limit:]
+        out = []
+        for r in records:
+            job = r.get("job", {})
+            out.append({
+                "failed_at": r.get("failed_at"),
+                "attempts": r.get("attempts"),
+                "error": r.get("error"),
+                "channel": job.get("channel"),
+                "target": job.get("label") or job.get("chat_id") or job.get("channel"),
+            })
+        return out
+    
+    def count(self) -> int:
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    return sum(1 for _ in f)
+            except FileNotFoundError:
+                return 0
+    
+    def drain(self) -> List[dict]:
+        """取出全部死信并清空存储"""
+        with self._lock:
+            draining = self.path + ".draining"
+            try:
+                os.replace(self.path, draining)
+            except FileNotFoundError:
+                return []
+            records = self._read(draining)
+            os.remove(draining)
+            return records
+
+
+dead_letters = DeadLetterStore(DEAD_LETTER_PATH)
+
+
+def replay_dead_letters() -> int:
+    """把死信重新交给调度器（重试计数清零）；返回重放条数"""
+    records = dead_letters.drain()
+    cfg = load_config_cached()
+    replayed = 0
+    for r in records:
+        job = r.get("job") or {}
+        if not attach_job_credentials(job, cfg):
+            dead_letters.add(job, "推送目标已从配置中删除", r.get("attempts", 0))
+            continue
+        job["attempts"] = 0
+        if dispatcher.submit(job):
+            replayed += 1
+    if records:
+        logger.info(f"♻️ 已重放 {replayed}/{len(records)} 条死信")
+    return replayed
+
+
+_replay_thread: Optional[threading.Thread] = None
+
+
+def check_dead_letter_replay():
+    """
+    monitor 进程：检查 Web 进程提交的重放请求
+    
+    重放在单独的线程中进行：调度器队列已满时每条死信最多等待 5 秒，不能阻塞监控循环；
+    上一次重放还没结束时保留请求标记，下一轮再处理
+    """
+    global _replay_thread
+    if _replay_thread is not None and _replay_thread.is_alive():
+        return
+    if not os.path.exists(DEAD_LETTER_REPLAY_FLAG):
+        return
+    try:
+        os.remove(DEAD_LETTER_REPLAY_FLAG)
+    except FileNotFoundError:
+        return
+    _replay_thread = threading.Thread(target=replay_dead_letters, name="dead-letter-replay", daemon=True)
+    _replay_thread.start()
+
+
+# =============== 推送去重 ===============
+
+class SentCampaigns:
+    """
+    已推送活动去重表：(推送目标, campaign id) -> 最近一次命中时间
+    
+    - 发送前 O(1) 检查，同一活动对同一目标只推送一次；项目的最新活动来回切换
+      （排序变化、活动被删除）或进程重启都不会重复推送
+    - 两阶段登记：发送前 reserve() 只在内存中占位（防止同一活动并发重复入队），
+      推送任务有结果后 settle()：送达才记为已推送，失败 / 进入死信则释放占位，之后仍可重新推送
+    - LRU + TTL 淘汰：命中时刷新时间并移到末尾，超过 ttl 未再出现或总数超过
+      max_entries 时从最旧的一端淘汰，内存占用有上限
+    - 每次变更追加写入 JSON Lines 日志，启动时重放；日志行数超过条目数的两倍时重写压缩
+    """
+    
+    def __init__(self, path: str, max_entries: int = 50000, ttl: float = 90 * 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._log_lines = 0
+    
+    def _load(self):
+        """重放追加日志（调用方持有锁）"""
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        key, ts = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries.pop(key, None)
+                    self._entries[key] = ts
+        except FileNotFoundError:
+            return
+        self._evict(time.time())
+        logger.info(f"已恢复推送去重表，共 {len(self._entries)} 条")
+    
+    def _evict(self, now: float):
+        while self._entries:
+            key, ts = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - ts < self.ttl:
+                break
+            self._entries.popitem(last=False)
+    
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, ts in self._entries.items():
+                f.write(json.dumps([key, ts], ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._log_lines = len(self._entries)
+    
+    def _append(self, key: str, now: float):
+        """刷新条目并追加日志（调用方持有锁）"""
+        self._entries.pop(key, None)
+        self._entries[key] = now
+        self._evict(now)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps([key, now], ensure_ascii=False) + "\n")
+            self._log_lines += 1
+            if self._log_lines > 2 * max(len(self._entries), 1000):
+                self._compact()
+        except Exception as e:
+            logger.error(f"写入推送去重表失败: {e}")
+    
+    def reserve(self, target: str, cid: str) -> Optional[str]:
+        """
+        发送前登记；返回去重键（推送任务结束后交给 settle），
+        该目标已推送过此活动或正在推送时返回 None
+        """
+        key = f"{target}|{cid}"
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if key in self._pending:
+                return None
+            ts = self._entries.get(key)
+            if ts is not None and now - ts < self.ttl:
+                self._append(key, now)  # 命中即刷新，最近仍在出现的活动不会被淘汰
+                return None
+            self._pending.add(key)
+            return key
+    
+    def settle(self, keys, ok: bool):
+        """推送任务结束：送达的记为已推送，失败的释放占位"""
+        keys = [k for k in keys or () if k]
+        if not keys:
+            return
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._pending.discard(key)
+                if ok:
+                    self._append(key, now)
+    
+    def count(self) -> int:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return len(self._entries)
+
+
+sent_campaigns = SentCampaigns(SENT_CAMPAIGNS_PATH)
+
+
+# =============== 已推送消息索引（原地更新） ===============
+
+def campaign_signature(latest: Optional[Dict]) -> List[str]:
+    """消息内容依赖的字段：状态或时间变化时签名随之变化"""
+    latest = latest or {}
+    return [build_status(latest), str(latest.get("name")), str(latest.get("startTime")), str(latest.get("endTime"))]
+
+
+def bot_id(token: str) -> str:
+    """Telegram Bot Token 中冒号前的 Bot id（不含密钥部分）"""
+    return str(token).split(":", 1)[0]
+
+
+class MessageIndex:
+    """
+    已推送的 Telegram 消息索引：campaign id -> 各 chat 的 (Bot, message_id, 签名)
+    
+    活动状态（未开始 → 进行中 → 已结束）或时间变化时，由发送原消息的同一个 Bot
+    调用 editMessageText 原地更新，不再额外发送新消息。活动结束且所有消息已更新后
+    移出索引；超过 max_campaigns 时淘汰最早记录的活动。
+    
+    索引文件中只保存 Bot id（Token 冒号前的部分），编辑时按 id 从当前配置找回 Token。
+    """
+    
+    def __init__(self, path: str, max_campaigns: int = 2000):
+        self.path = path
+        self.max_campaigns = max_campaigns
+        self._campaigns: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+    
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"读取消息索引失败: {e}")
+            return
+        with self._lock:
+            self._campaigns = OrderedDict(data.get("campaigns", []))
+            for campaign in self._campaigns.values():
+                for msg in campaign["chats"].values():
+                    if "token" in msg:
+                        # 旧版索引：保存的是完整 Token，改为只保存 Bot id
+                        msg["bot"] = bot_id(msg.pop("token"))
+                        self._dirty = True
+        logger.info(f"已恢复消息索引，共 {len(self._campaigns)} 个活动")
+    
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"campaigns": list(self._campaigns.items())}
+            self._dirty = False
+        try:
+            write_json_atomic(self.path, data)
+        except Exception as e:
+            logger.error(f"写入消息索引失败: {e}")
+    
+    def record(self, job: dict, message_id: int):
+        """记录一条发送成功的活动消息"""
+        event = job["event"]
+        cid = extract_campaign_id(event.get("latest"))
+        if not cid:
+            return
+        with self._lock:
+            campaign = self._campaigns.get(cid)
+            if campaign is None:
+                campaign = self._campaigns[cid] = {
+                    "project_name": event.get("project_name"),
+                    "alias": event.get("alias"),
+                    "latest": event.get("latest"),
+                    "url": event.get("url"),
+                    "chats": {},
+                }
+            campaign["chats"][str(job["chat_id"])] = {
+                "bot": bot_id(job["token"]),
+                "message_id": message_id,
+                "label": job.get("label"),
+                "signature": campaign_signature(event.get("latest")),
+            }
+            self._campaigns.move_to_end(cid)
+            while len(self._campaigns) > self.max_campaigns:
+                self._campaigns.popitem(last=False)
+            self._dirty = True
+    
+    def forget(self, cid: str, chat_id: str):
+        with self._lock:
+            campaign = self._campaigns.get(cid)
+            if campaign and campaign["chats"].pop(str(chat_id), None) is not None:
+                if not campaign["chats"]:
+                    del self._campaigns[cid]
+                self._dirty = True
+    
+    def refresh(self, fresh: Dict[str, Dict]) -> List[dict]:
+        """
+        对比最新数据，返回需要原地编辑的任务
+        
+        fresh 为本轮拉取到的 campaign id -> latest；不在其中的活动（已不是项目的最新活动）
+        沿用记录时的数据，状态仍会随时间推进而更新。
+        """
+        jobs = []
+        with self._lock:
+            for cid in list(self._campaigns):
+                campaign = self._campaigns[cid]
+                latest = fresh.get(cid)
+                if latest and latest != campaign["latest"]:
+                    campaign["latest"] = latest
+                    self._dirty = True
+                signature = campaign_signature(campaign["latest"])
+                text = None
+                for chat_id, msg in campaign["chats"].items():
+                    if msg["signature"] == signature:
+                        continue
+                    if text is None:
+                        text = build_notify_text(campaign["project_name"], campaign["alias"],
+                                                 campaign["latest"], campaign["url"])
+                    jobs.append({
+                        "channel": "telegram",
+                        "op": "edit",
+                        "key": f"telegram:{chat_id}",
+                        "label": msg.get("label") or chat_id,
+                        "bot": msg["bot"],  # 提交前由 refresh_pushed_messages 按 Bot id 找回 Token
+                        "chat_id": chat_id,
+                        "message_id": msg["message_id"],
+                        "cid": cid,
+                        "text": text,
+                    })
+                    msg["signature"] = signature
+                    self._dirty = True
+                if "已结束" in signature[0]:
+                    # 已结束是最终状态：编辑任务已生成，不再跟踪
+                    del self._campaigns[cid]
+                    self._dirty = True
+        return jobs
+    
+    def count(self) -> int:
+        with self._lock:
+            return sum(len(c["chats"]) for c in self._campaigns.values())
+
+
+message_index = MessageIndex(MESSAGE_INDEX_PATH)
+
+
+def refresh_pushed_messages(projects: List[dict]):
+    """monitor 进程：活动状态或时间变化时原地编辑已推送的 Telegram 消息"""
+    fresh = {}
+    for p in projects:
+        cid = extract_campaign_id(p.get("latest"))
+        if cid:
+            fresh[cid] = p["latest"]
+    jobs = message_index.refresh(fresh)
+    tokens = {bot_id(t): t for r in get_notify_routes(load_config_cached()).all.get("telegram", [])
+              for t in r["bot_tokens"]}
+    for job in jobs:
+        token = tokens.get(job["bot"])
+        if token is None:
+            # 发送原消息的 Bot 已从配置中移除，只有它能编辑这条消息
+            message_index.forget(job["cid"], job["chat_id"])
+            continue
+        job["tokens"] = [token]
+        job["token"] = token
+        # 在监控循环线程中调用：队列满时不等待，直接跳过本次更新，不拖慢轮询
+        dispatcher.submit(job, timeout=0)
+    if jobs:
+        logger.info(f"✏️ {len(jobs)} 条已推送消息需要更新")
+    message_index.save()
+
+
+# =============== 活动提醒 ===============
+
+def format_offset(seconds: int) -> str:
+    """提醒提前量的中文描述"""
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}天"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}小时"
+    return f"{max(1, seconds // 60)}分钟"
+
+
+def reminder_deadline(latest: Optional[Dict], kind: str) -> Optional[float]:
+    """提醒对应的时间点（活动开始 / 结束）的 UNIX 时间戳"""
+    t = parse_timestamp((latest or {}).get("startTime" if kind == "start" else "endTime"))
+    return t.timestamp() if t else None
+
+
+def build_reminder_text(event: dict, kind: str, offset: int) -> str:
+    """Telegram 提醒消息：提醒标题 + 原通知内容"""
+    action = "开始" if kind == "start" else "结束"
+    head = f"⏰ <b>活动将在 {format_offset(offset)} 后{action}</b>"
+    return head + "\n\n" + build_notify_text(event["project_name"], event["alias"], event["latest"], event.get("url"))
+
+
+class ReminderScheduler:
+    """
+    活动开始前 / 结束前提醒
+    
+    - 新活动推送时，按目标配置的 reminders 计算每个提醒的到期时间，放入最小堆
+    - 堆持久化到 data/reminders.json，重启后恢复；文件中的目标只记录 route_target_key
+      （Discord 为 webhook 摘要），到期时再从当前配置找到对应的路由
+    - 调度线程只在堆顶提醒到期（或有新提醒加入）时醒来，不需要每轮遍历所有活动
+    - 到期时用最近一次监控数据校验活动时间：时间被修改则按新时间重新排期，
+      对应时间点已过（如进程停机期间错过）则跳过
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.running = False
+        self.fired = 0
+        self.skipped = 0
+        self._heap = []  # (到期时间, 序号, 提醒)
+        self._keys = set()
+        self._seq = 0
+        self._cond = threading.Condition()
+    
+    @staticmethod
+    def _key(entry: dict) -> str:
+        return f"{entry['channel']}:{entry['target']}:{entry['cid']}:{entry['kind']}:{entry['offset']}"
+    
+    def _push(self, entry: dict) -> bool:
+        """加入堆（调用方持有锁）；同一提醒已在堆中时忽略"""
+        key = self._key(entry)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._seq += 1
+        heapq.heappush(self._heap, (entry["due"], self._seq, entry))
+        return True
+    
+    def _save(self):
+        try:
+            write_json_atomic(self.path, [item[2] for item in self._heap])
+        except Exception as e:
+            logger.error(f"写入提醒队列失败: {e}")
+    
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"读取提醒队列失败: {e}")
+            return
+        legacy = False
+        with self._cond:
+            for entry in entries:
+                if not str(entry["target"]).startswith(entry["channel"] + ":"):
+                    # 旧版记录：target 为 chat_id / 完整 webhook 地址
+                    entry["target"] = route_target_key({"channel": entry["channel"], "chat_id": entry["target"],
+                                                        "webhook_url": entry["target"]})
+                    legacy = True
+                self._push(entry)
+            if legacy:
+                self._save()
+        logger.info(f"已恢复提醒队列，共 {len(self._heap)} 条")
+    
+    def schedule(self, routes: List[dict], event: dict) -> int:
+        """为一个新活动按各路由的提醒配置排期；返回新增的提醒数"""
+        cid = extract_campaign_id(event.get("latest"))
+        if not cid:
+            return 0
+        now = time.time()
+        added = 0
+        with self._cond:
+            for route in routes:
+                target = route_target_key(route)
+                for kind, offset in route["reminders"]:
+                    deadline = reminder_deadline(event.get("latest"), kind)
+                    if deadline is None or deadline - offset <= now:
+                        continue
+                    added += self._push({
+                        "due": deadline - offset,
+                        "kind": kind,
+                        "offset": offset,
+                        "channel": route["channel"],
+                        "target": target,
+                        "cid": cid,
+                        "event": event,
+                    })
+            if added:
+                self._save()
+                self._cond.notify()
+        return added
+    
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._run, name="reminders", daemon=True).start()
+        logger.info("活动提醒调度器已启动")
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    self._cond.wait(self._heap[0][0] - time.time() if self._heap else None)
+                due = []
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)[2]
+                    self._keys.discard(self._key(entry))
+                    due.append(entry)
+                self._save()
+            for entry in due:
+                try:
+                    self._fire(entry)
+                except Exception as e:
+                    logger.error(f"活动提醒发送失败: {e}")
+    
+    def _fire(self, entry: dict):
+        event = entry["event"]
+        kind, offset = entry["kind"], entry["offset"]
+        
+        # 用最近一次监控数据校验活动时间
+        for p in monitor_state.get("projects", []):
+            if p.get("alias") == event["alias"] and extract_campaign_id(p.get("latest")) == entry["cid"]:
+                event["latest"] = p["latest"]
+                break
+        deadline = reminder_deadline(event["latest"], kind)
+        now = time.time()
+        if deadline is None or deadline <= now:
+            self.skipped += 1
+            return
+        if deadline - offset > now + 1:
+            entry["due"] = deadline - offset
+            with self._cond:
+                self._push(entry)
+                self._save()
+            return
+        
+        cfg = load_config_cached()
+        route = next((r for r in get_notify_routes(cfg).all[entry["channel"]]
+                      if route_target_key(r) == entry["target"]), None)
+        if route is None or (kind, offset) not in route["reminders"]:
+            # 目标已删除或不再配置该提醒
+            self.skipped += 1
+            return
+        
+        if entry["channel"] == "telegram":
+            dispatch_telegram(route["bot_tokens"], route["chat_id"], build_reminder_text(event, kind, offset), route["name"])
+        else:
+            embed = build_discord_embed(event)
+            action = "开始" if kind == "start" else "结束"
+            embed["title"] = f"⏰ {format_offset(offset)}后{action} · {embed['title']}"[:256]
+            discord_batcher.add(route, embed)
+        self.fired += 1
+        logger.info(f"⏰ 活动提醒 [{event['project_name']}] {format_offset(offset)}后{'开始' if kind == 'start' else '结束'} -> {route['name'] or entry['target']}")
+    
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._heap)
+            next_due = self._heap[0][0] if self._heap else None
+        return {
+            "pending": pending,
+            "next_due": datetime.utcfromtimestamp(next_due).isoformat() + "Z" if next_due else None,
+            "fired": self.fired,
+            "skipped": self.skipped,
+        }
+
+
+reminder_scheduler = ReminderScheduler(REMINDERS_PATH)
+
+
+# =============== 持久化推送队列 ===============
+
+class DurableQueue:
+    """
+    持久化推送队列（追加写段日志 + 消费位点）
+    
+    - 入队：在当前段文件末尾追加一行 JSON，O(1)，不会重写已有积压
+    - 出队：从读取位置顺序读取下一行，O(1)，同时返回该消息的位置
+    - ack(pos)：消息的所有推送任务都有结果后调用，允许乱序；持久化的消费位点只推进到
+      最早一条未 ack 的消息之前
+    - 段文件超过 segment_bytes 后滚动，消费位点越过的旧段直接删除（压缩）
+    - 重启后从消费位点继续消费，未 ack 的消息（仍在缓冲区 / 调度器中）会重新投递一次
+    """
+    
+    OFFSET_FILE = "consumer.offset"
+    
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._cond = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+        
+        segments = self._segments()
+        self._oldest_seg = segments[0] if segments else 1
+        self._write_seg = segments[-1] if segments else 1
+        self._writer = open(self._seg_path(self._write_seg), "ab")
+        
+        self._read_seg, self._read_off = self._load_offset()
+        if self._read_seg < self._oldest_seg:
+            self._read_seg, self._read_off = self._oldest_seg, 0
+        self._reader = None
+        self._acked_seg = self._read_seg
+        self._unacked: "OrderedDict[tuple, bool]" = OrderedDict()  # 已取出消息的位置 -> 是否已 ack（按取出顺序）
+        
+        self.pending = self._count_pending()
+        self._compact()
+        if self.pending:
+            logger.info(f"已恢复推送队列，共 {self.pending} 条待推送")
+    
+    def _seg_path(self, seg: int) -> str:
+        return os.path.join(self.directory, f"{seg:012d}.log")
+    
+    def _segments(self) -> List[int]:
+        return sorted(int(n[:-4]) for n in os.listdir(self.directory) if n.endswith(".log") and n[:-4].isdigit())
+    
+    def _load_offset(self):
+        try:
+            with open(os.path.join(self.directory, self.OFFSET_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except Exception:
+            return self._oldest_seg, 0
+    
+    def _count_pending(self) -> int:
+        """启动时统计位点之后的消息数（仅启动时扫描一次）"""
+        count = 0
+        for seg in range(self._read_seg, self._write_seg + 1):
+            path = self._seg_path(seg)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                if seg == self._read_seg:
+                    f.seek(self._read_off)
+                for line in f:
+                    if line.endswith(b"\n"):
+                        count += 1
+        return count
+    
+    def _compact(self):
+        """删除已完全消费（ack）的段文件"""
+        while self._oldest_seg < self._acked_seg:
+            try:
+                os.remove(self._seg_path(self._oldest_seg))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"删除推送队列段文件失败: {e}")
+                return
+            self._oldest_seg += 1
+    
+    def put(self, item: dict):
+        """入队（追加写）"""
+        data = json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._cond:
+            if self._writer.tell() > 0 and self._writer.tell() + len(data) > self.segment_bytes:
+                self._writer.close()
+                self._write_seg += 1
+                self._writer = open(self._seg_path(self._write_seg), "ab")
+            self._writer.write(data)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            self.pending += 1
+            self._cond.notify()
+    
+    def _read_line(self) -> Optional[bytes]:
+        """从消费位点读取下一条完整记录，没有则返回 None"""
+        while True:
+            if self._reader is None:
+                path = self._seg_path(self._read_seg)
+                if not os.path.exists(path):
+                    if self._read_seg < self._write_seg:
+                        self._read_seg, self._read_off = self._read_seg + 1, 0
+                        continue
+                    return None
+                self._reader = open(path, "rb")
+            
+            self._reader.seek(self._read_off)
+            line = self._reader.readline()
+            if line.endswith(b"\n"):
+                self._read_off = self._reader.tell()
+                return line
+            
+            # 当前段已读完：切换到下一段；若已是写入段则等待新消息
+            if self._read_seg < self._write_seg:
+                self._reader.close()
+                self._reader = None
+                self._read_seg, self._read_off = self._read_seg + 1, 0
+                continue
+            return None
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[tuple, dict]]:
+        """出队，返回 (位置, 消息)；消息处理完成后用该位置调用 ack()"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                line = self._read_line()
+                if line is not None:
+                    self.pending -= 1
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        logger.error(f"推送队列记录损坏，已跳过: {line[:100]!r}")
+                        continue
+                    pos = (self._read_seg, self._read_off)
+                    self._unacked[pos] = False
+                    return pos, item
+                
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+    
+    def ack(self, pos: tuple):
+        """确认一条消息已处理完；位点推进到最早未确认的消息之前并持久化，清理已消费的段"""
+        with self._cond:
+            if pos in self._unacked:
+                self._unacked[pos] = True
+            commit = None
+            while self._unacked and next(iter(self._unacked.values())):
+                commit, _ = self._unacked.popitem(last=False)
+            if commit is None:
+                return
+            try:
+                write_json_atomic(
+                    os.path.join(self.directory, self.OFFSET_FILE),
+                    {"segment": commit[0], "offset": commit[1]},
+                )
+            except Exception as e:
+                logger.error(f"保存推送队列位点失败: {e}")
+                return
+            self._acked_seg = commit[0]
+            self._compact()
+    
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": self.pending,
+                "unacked": len(self._unacked),
+                "segments": self._write_seg - self._oldest_seg + 1,
+                "read_segment": self._read_seg,
+                "write_segment": self._write_seg,
+            }
+
+
+push_queue: Optional[DurableQueue] = None
+
+
+class DeliveryTicket:
+    """
+    持久化队列中一条消息的投递凭据（引用计数）
+    
+    消息交给调度器 / 批量缓冲区的每个去处各持有一个引用，对应的推送任务有了结果
+    （送达或写入死信）后释放；引用全部释放时才 ack。进程在此之前退出时，
+    消息会从持久化队列重新投递，已送达的目标由推送去重跳过。
+    """
+    
+    __slots__ = ("_refs", "_lock", "_on_done")
+    
+    def __init__(self, on_done):
+        self._refs = 1  # 推送线程自己的引用，交接完成后释放
+        self._lock = threading.Lock()
+        self._on_done = on_done
+    
+    def hold(self) -> "DeliveryTicket":
+        with self._lock:
+            self._refs += 1
+        return self
+    
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            done = self._refs == 0
+        if done:
+            self._on_done()
+
+
+def hold_tickets(tickets) -> list:
+    """为一个推送任务持有凭据引用"""
+    return [t.hold() for t in tickets or () if t is not None]
+
+
+def release_tickets(tickets):
+    for t in tickets or ():
+        if t is not None:
+            t.release()
+
+
+def enqueue_notification(cfg: dict, project_name: str, alias: str, latest: Dict, url: Optional[str]):
+    """新活动先写入持久化队列，再由推送线程交给调度器；队列未启用时直接推送"""
+    if push_queue is None:
+        send_notifications(cfg, project_name, alias, latest, url)
+        return
+    push_queue.put({
+        "project_name": project_name,
+        "alias": alias,
+        "latest": latest,
+        "url": url,
+        "queued_at": time.time(),
+    })
+    logger.info(f"📌 [{project_name}] 已加入推送队列，待推送 {push_queue.pending} 条")
+
+
+def process_push_queue():
+    """推送线程：按顺序从持久化队列取出事件并推送；事件的所有推送任务有结果后才 ack"""
+    logger.info("推送队列处理器已启动")
+    while True:
+        got = push_queue.get(timeout=5)
+        if got is None:
+            continue
+        pos, item = got
+        ticket = DeliveryTicket(lambda pos=pos: push_queue.ack(pos))
+        try:
+            send_notifications(load_config_cached(), item["project_name"], item["alias"], item["latest"], item.get("url"),
+                               ticket)
+        except Exception as e:
+            logger.error(f"队列推送失败 [{item.get('alias')}]: {e}")
+        finally:
+            ticket.release()
+
+
+def start_push_queue(cfg: dict):
+    """打开持久化推送队列并启动推送线程"""
+    global push_queue
+    if push_queue is not None:
+        return
+    push_queue = DurableQueue(
+        PUSH_QUEUE_DIR,
+        segment_bytes=int(cfg.get("push_queue_segment_bytes", 4 * 1024 * 1024)),
+        fsync=bool(cfg.get("push_queue_fsync", False)),
+    )
+    threading.Thread(target=process_push_queue, name="push-queue", daemon=True).start()
+
+
+# =============== 热度计算 ===============
+
+class TrendingTracker:
+    """
+    按 Space 的活动数据计算热度分，自动把热度 Top N 标记为 trending
+    
+    热度分 = 3 × 进行中的活动数 + 2 × 近 7 天新活动数 + 1 × 近 30 天新活动数
+             + 最近一次新活动的新鲜度（满分 5，每 3 天减半）
+    
+    - 每个 Space 维护 7 天 / 30 天两个按时间排序的滚动窗口：新活动追加到右侧，
+      过期活动从左侧淘汰，每轮只处理新增和过期的活动，不重算历史
+    - 活动列表自带 createdAt，重启后第一轮即可从列表恢复窗口，无需额外持久化
+    """
+    
+    WINDOWS = (7 * 86400, 30 * 86400)
+    WEIGHTS = (2.0, 1.0)
+    RUNNING_WEIGHT = 3.0
+    RECENCY_MAX = 5.0
+    RECENCY_HALF_LIFE = 3 * 86400
+    
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self._spaces: Dict = {}
+        self._lock = threading.Lock()
+    
+    def update(self, key, campaigns: List[dict], now: Optional[float] = None) -> float:
+        """用本轮拉取到的活动列表更新某个 Space 的热度分"""
+        now = now or time.time()
+        with self._lock:
+            st = self._spaces.get(key)
+            if st is None:
+                st = self._spaces[key] = {"seen": set(), "windows": [deque() for _ in self.WINDOWS], "last": 0.0, "score": 0.0}
+            
+            current = set()
+            fresh = []
+            running = 0
+            for c in campaigns or []:
+                cid = extract_campaign_id(c)
+                if not cid:
+                    continue
+                current.add(cid)
+                start = parse_timestamp(c.get("startTime"))
+                end = parse_timestamp(c.get("endTime"))
+                if start and start.timestamp() <= now and (not end or now <= end.timestamp()):
+                    running += 1
+                if cid in st["seen"]:
+                    continue
+                created = parse_timestamp(c.get("createdAt") or c.get("startTime"))
+                if created and now - created.timestamp() < self.WINDOWS[-1]:
+                    fresh.append(created.timestamp())
+            st["seen"] = current
+            
+            for ts in sorted(fresh):
+                st["last"] = max(st["last"], ts)
+                for window, dq in zip(self.WINDOWS, st["windows"]):
+                    if now - ts >= window:
+                        continue
+                    if dq and ts < dq[-1]:
+                        # 乱序到达（极少见）：重建该窗口保持有序
+                        items = sorted(list(dq) + [ts])
+                        dq.clear()
+                        dq.extend(items)
+                    else:
+                        dq.append(ts)
+            for window, dq in zip(self.WINDOWS, st["windows"]):
+                while dq and now - dq[0] >= window:
+                    dq.popleft()
+            
+            score = self.RUNNING_WEIGHT * running
+            score += sum(w * len(dq) for w, dq in zip(self.WEIGHTS, st["windows"]))
+            if st["last"]:
+                score += self.RECENCY_MAX * 0.5 ** ((now - st["last"]) / self.RECENCY_HALF_LIFE)
+            st["score"] = round(score, 3)
+            return st["score"]
+    
+    def score(self, key) -> float:
+        with self._lock:
+            st = self._spaces.get(key)
+            return st["score"] if st else 0.0
+    
+    def top(self) -> set:
+        """热度分最高的 top_n 个 Space（分数为 0 的不计入）"""
+        with self._lock:
+            ranked = heapq.nlargest(self.top_n, ((st["score"], str(k), k) for k, st in self._spaces.items() if st["score"] > 0))
+        return {k for _, _, k in ranked}
+    
+    def retain(self, keys: set):
+        """移除已从配置中删除的 Space"""
+        with self._lock:
+            for k in [k for k in self._spaces if k not in keys]:
+                del self._spaces[k]
+
+
+trending = TrendingTracker()
+
+
+# =============== 轮询计划 ===============
+
+POLL_BATCH_SIZE = 20
+POLL_IMMINENT_HOURS = 24
+SPACE_META_TTL_HOURS = 24
+
+
+def poll_key(space_id: Optional[int], alias: Optional[str]):
+    """轮询键：已知 spaceId 时用 spaceId，否则用小写 alias"""
+    return space_id if space_id is not None else (alias or "").strip().lower()
+
+
+class PollTask:
+    """轮询计划中的一项：一个 Space，以及配置中指向它的所有项目（共享同一次查询结果）"""
+
+    __slots__ = ("alias", "space_id", "projects", "priority")
+
+    def __init__(self, alias: str, space_id: Optional[int]):
+        self.alias = alias
+        self.space_id = space_id
+        self.projects: List[dict] = []
+        self.priority = ()
+
+    @property
+    def key(self):
+        return poll_key(self.space_id, self.alias)
+
+
+def compile_poll_plan(projects: List[dict], previous: Dict, hot: set,
+                      imminent_secs: float, now: Optional[float] = None,
+                      alias_ids: Optional[Dict[str, int]] = None) -> List[PollTask]:
+    """
+    把配置中的项目编译成本轮的轮询计划
+
+    - 按 spaceId 和小写 alias 去重：同一 Space 的多个项目（含大小写变体）只查询一次；
+      没有 alias 的项目无法查询，不进入计划（monitor_loop 仍会把它们列在状态里）
+    - 排序：上一轮看到的最新活动即将开始（imminent_secs 内）的优先，越早开始越靠前；
+      其次是热度Top（hot）/ 配置为 trending 的 Space；其余保持配置顺序
+    previous: 轮询键 -> 上一轮的最新活动
+    alias_ids: 小写 alias -> 已知 spaceId（来自 Space 元信息缓存），配置中没有 spaceId 的项目用它补全
+    """
+    now = now or time.time()
+    tasks: List[PollTask] = []
+    by_alias: Dict[str, PollTask] = {}
+    by_id: Dict[int, PollTask] = {}
+
+    for p in projects:
+        alias = (p.get("alias") or "").strip()
+        if not alias:
+            continue
+        sid = parse_space_id(p.get("space_id"))
+        if sid is None and alias_ids:
+            sid = alias_ids.get(alias.lower())
+        task = (by_id.get(sid) if sid is not None else None) or by_alias.get(alias.lower())
+        if task is None:
+            task = PollTask(alias, sid)
+            tasks.append(task)
+        elif task.space_id is None and sid is not None:
+            task.space_id = sid
+        task.projects.append(p)
+        by_alias.setdefault(alias.lower(), task)
+        if sid is not None:
+            by_id.setdefault(sid, task)
 
+    for index, task in enumerate(tasks):
+        latest = previous.get(task.key) or previous.get(task.alias.lower())
+        start = parse_timestamp((latest or {}).get("startTime"))
+        until = start.timestamp() - now if start else None
+        imminent = until is not None and 0 <= until <= imminent_secs
+        is_hot = task.key in hot or any(p.get("category") == "trending" for p in task.projects)
+        task.priority = (0 if imminent else 1, 0 if is_hot else 1, until if imminent else 0, index)
+    tasks.sort(key=lambda t: t.priority)
+    return tasks
 
-def should_notify(latest: Dict) -> bool:
-    """判断是否应该推送通知
-    
-    推送条件:
-    1. 活动未开始 或 正在进行中
-    2. 活动结束时间在未来60天内
-    3. 活动未结束
+
+class SpaceMetaCache:
     """
-    if not latest:
-        return False
-    
-    now = datetime.now(timezone.utc)
+    Space 元信息（id / name / alias）缓存：spaceId -> {"name", "alias", "expires"}
     
-    # 检查活动时间
-    start_ts = latest.get("startTime")
-    end_ts = latest.get("endTime")
+    元信息几乎不变，热路径只查询活动字段；未知 spaceId 或缓存过期（默认 24 小时，
+    ±10% 随机抖动避免同一轮集中刷新）的 Space 才在本轮查询中带上元信息字段。
+    已知 Space 的 id / name / alias 以缓存为准：活动链接使用缓存中的规范 alias，
+    配置里只有 alias 的项目按缓存直接补全 spaceId，上游改名时记录日志。
+    """
     
-    if not start_ts or not end_ts:
-        return False
+    def __init__(self, path: str, ttl: float = SPACE_META_TTL_HOURS * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._spaces: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
     
-    try:
-        start_time = datetime.fromtimestamp(int(start_ts) / 1000, timezone.utc)
-        end_time = datetime.fromtimestamp(int(end_ts) / 1000, timezone.utc)
-    except:
-        return False
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"读取 Space 元信息缓存失败: {e}")
+            return
+        with self._lock:
+            self._spaces = {int(k): v for k, v in data.get("spaces", {}).items()}
+        logger.info(f"已恢复 Space 元信息缓存，共 {len(self._spaces)} 个 Space")
     
-    # 条件1: 活动不能已经结束
-    if now > end_time:
-        logger.debug(f"跳过推送 - 活动已结束")
-        return False
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"spaces": {str(k): v for k, v in self._spaces.items()}}
+            self._dirty = False
+        try:
+            write_json_atomic(self.path, data)
+        except Exception as e:
+            logger.error(f"写入 Space 元信息缓存失败: {e}")
     
-    # 条件2: 结束时间不能太遥远(60天后)
-    days_until_end = (end_time - now).days
-    if days_until_end > 60:
-        logger.debug(f"跳过推送 - 活动结束时间太远({days_until_end}天后)")
-        return False
+    def due(self, space_id: int, now: Optional[float] = None) -> bool:
+        """是否需要在本轮查询中刷新元信息"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._spaces.get(space_id)
+            return entry is None or now >= entry.get("expires", 0)
     
-    # 条件3: 开始时间不能太早(超过30天前开始的不推送)
-    if now > start_time:
-        days_since_start = (now - start_time).days
-        if days_since_start > 30:
-            logger.debug(f"跳过推送 - 活动开始时间太久({days_since_start}天前)")
-            return False
+    def store(self, space: dict, now: Optional[float] = None):
+        """记录一次带元信息的查询结果（只有 campaigns 的结果忽略）"""
+        sid = parse_space_id(space.get("id"))
+        if sid is None or "alias" not in space:
+            return
+        now = now or time.time()
+        with self._lock:
+            old = self._spaces.get(sid)
+            self._spaces[sid] = {
+                "name": space.get("name"),
+                "alias": space.get("alias"),
+                "expires": now + self.ttl * random.uniform(0.9, 1.1),
+            }
+            self._dirty = True
+        if old and old.get("alias") and old["alias"] != space.get("alias"):
+            logger.info(f"🔁 Space #{sid} 已改名: {old['alias']} -> {space.get('alias')}")
     
-    return True
-
-
-def send_notifications(cfg: dict, project_name: str, alias: str, latest: Dict, url: Optional[str]):
-    """发送通知（支持 Telegram/Discord）"""
-    method = (cfg.get("notify_method") or "none").lower()
+    def get(self, space_id: int) -> Optional[dict]:
+        with self._lock:
+            return self._spaces.get(space_id)
     
-    if method == "none":
-        return
+    def alias(self, space_id: Optional[int], default: str) -> str:
+        """Space 当前的规范 alias（上游改名后与配置中的不同）；未缓存时返回 default"""
+        entry = self.get(space_id) if space_id is not None else None
+        return (entry or {}).get("alias") or default
     
-    # 检查是否应该推送
-    if not should_notify(latest):
-        logger.info(f"⏭️  跳过推送 [{project_name}] - 不符合推送条件")
-        return
+    def alias_ids(self) -> Dict[str, int]:
+        """小写规范 alias -> spaceId，用于给配置中只有 alias 的项目直接补全 spaceId"""
+        with self._lock:
+            return {v["alias"].lower(): k for k, v in self._spaces.items() if v.get("alias")}
     
-    text = build_notify_text(project_name, alias, latest, url)
+    def merge(self, space_id: int, space: dict) -> dict:
+        """把缓存的 id / name / alias 补进只查询了活动字段的结果（查询结果中已有的字段优先）"""
+        entry = self.get(space_id) or {}
+        return {"id": space_id, "name": entry.get("name"), "alias": entry.get("alias"), **space}
     
-    if method in ("telegram", "both"):
-        send_telegram(cfg, text, alias)
-    if method in ("discord", "both"):
-        send_discord(cfg, text)
+    def retain(self, space_ids: set):
+        """移除已从配置中删除的 Space"""
+        with self._lock:
+            stale = [k for k in self._spaces if k not in space_ids]
+            for k in stale:
+                del self._spaces[k]
+            if stale:
+                self._dirty = True
+
+
+space_meta = SpaceMetaCache(SPACE_META_PATH)
+
+
+def fetch_poll_plan(plan: List[PollTask], batch_size: int) -> List[Optional[Dict]]:
+    """按计划顺序分批查询，返回与 plan 一一对应的查询结果；元信息只对未知 / 过期的 Space 查询"""
+    batch_size = max(1, batch_size)
+    results: List[Optional[Dict]] = []
+    for i in range(0, len(plan), batch_size):
+        batch = plan[i:i + batch_size]
+        specs = [(t.space_id, t.alias, t.space_id is None or space_meta.due(t.space_id)) for t in batch]
+        infos = fetch_latest_batch(specs)
+        for task, info in zip(batch, infos):
+            if not info:
+                continue
+            space_meta.store(info["space"])
+            if task.space_id is not None:
+                # 已知 Space 的 id / name / alias 以缓存为准，热路径结果只带 campaigns
+                info["space"] = space_meta.merge(task.space_id, info["space"])
+        results.extend(infos)
+    return results
 
 
 # =============== 监控主循环 ===============
@@ -554,43 +3233,108 @@ def monitor_loop():
     first_loop = True
     
     logger.info("监控循环已启动")
+    space_meta.load()
+    renamed = set()  # 已提示过“配置 alias 与规范 alias 不一致”的 spaceId
     
     while True:
         try:
             cfg = load_config()
+            space_meta.ttl = float(cfg.get("space_meta_ttl_hours", SPACE_META_TTL_HOURS)) * 3600
+            previous = {poll_key(e.get("space_id"), e.get("alias")): e.get("latest")
+                        for e in monitor_state.get("projects", [])}
+            hot = trending.top() if cfg.get("trending_auto", True) else set()
+            plan = compile_poll_plan(
+                cfg.get("projects", []), previous, hot,
+                float(cfg.get("poll_imminent_hours", POLL_IMMINENT_HOURS)) * 3600,
+                alias_ids=space_meta.alias_ids(),
+            )
+            infos = fetch_poll_plan(plan, int(cfg.get("poll_batch_size", POLL_BATCH_SIZE)))
             out = []
+            backfill: Dict[str, int] = {}
+            keys = []  # 与 out 一一对应的轮询键
             
-            for p in cfg.get("projects", []):
-                alias = p.get("alias")
-                name = p.get("name", alias)
-                cat = p.get("category", "custom")
-                
-                info = fetch_latest(alias)
+            for task, info in zip(plan, infos):
+                if info and task.space_id is None:
+                    # 首次按 alias 查询成功：记下 spaceId，之后按 id 轮询
+                    task.space_id = parse_space_id(info["space"].get("id"))
+                if task.space_id is not None:
+                    # 配置中还没有 spaceId 的项目（本轮按 alias 查到，或由元信息缓存补全）写回配置
+                    for p in task.projects:
+                        if parse_space_id(p.get("space_id")) is None:
+                            backfill[p["alias"].strip().lower()] = task.space_id
+                # 活动链接用 Space 当前的规范 alias，配置中的 alias 过期（上游改名）时链接仍然有效
+                canonical = space_meta.alias(task.space_id, task.alias)
+                if canonical.lower() != task.alias.lower() and task.space_id not in renamed:
+                    renamed.add(task.space_id)
+                    logger.info(f"🔁 Space #{task.space_id} 当前 alias 为 {canonical}，配置中仍为 {task.alias}")
+                key = task.key
+                if info:
+                    trending.update(key, (info["space"].get("campaigns") or {}).get("list") or [])
                 latest = info["latest"] if info else None
-                url = build_campaign_url(alias, latest)
                 
-                out.append({
-                    "name": name,
-                    "alias": alias,
-                    "category": cat,
-                    "latest": latest,
-                    "url": url,
-                })
+                for p in task.projects:
+                    alias = p.get("alias")
+                    keys.append(key)
+                    out.append({
+                        "name": p.get("name", alias),
+                        "alias": alias,
+                        "category": p.get("category", "custom"),
+                        "space_id": task.space_id,
+                        "latest": latest,
+                        "url": build_campaign_url(canonical, latest),
+                    })
                 
-                # 检查是否有新活动需要通知
+                # 检查是否有新活动需要通知（同一 Space 只推送一次）；首轮只记录基线，不推送已有活动
                 cid = extract_campaign_id(latest)
-                if not first_loop and cid and latest:
-                    prev = last_notified.get(alias)
+                if cid and latest:
+                    prev = last_notified.get(key)
                     if prev != cid:
-                        send_notifications(cfg, name, alias, latest, url)
-                        last_notified[alias] = cid
+                        if not first_loop:
+                            lead = task.projects[0]
+                            alias = lead.get("alias")
+                            enqueue_notification(cfg, lead.get("name", alias), alias, latest,
+                                                 build_campaign_url(canonical, latest))
+                        last_notified[key] = cid
+            
+            # 没有 alias 的项目不在轮询计划里，照常列出（无最新活动），不从状态中消失
+            for p in cfg.get("projects", []):
+                if not (p.get("alias") or "").strip():
+                    logger.debug(f"项目缺少 alias，跳过查询: {p.get('name')}")
+                    keys.append(poll_key(parse_space_id(p.get("space_id")), ""))
+                    out.append({
+                        "name": p.get("name", p.get("alias")),
+                        "alias": p.get("alias"),
+                        "category": p.get("category", "custom"),
+                        "space_id": parse_space_id(p.get("space_id")),
+                        "latest": None,
+                        "url": None,
+                    })
+            
+            if backfill:
+                save_space_ids(backfill)
+            space_meta.retain({t.space_id for t in plan if t.space_id is not None})
+            space_meta.save()
             
+            # 热度 Top N 自动归入 trending（配置中手动设为 trending 的保持不变）
+            trending.top_n = int(cfg.get("trending_top_n", trending.top_n))
+            trending.retain(set(keys))
+            top = trending.top() if cfg.get("trending_auto", True) else set()
+            for entry, key in zip(out, keys):
+                entry["trending_score"] = trending.score(key)
+                if key in top:
+                    entry["category"] = "trending"
             monitor_state["last_loop"] = datetime.utcnow().isoformat() + "Z"
             monitor_state["projects"] = out
             write_state(monitor_state)
+            write_snapshot(SNAPSHOT_PATH, monitor_state)
+            if dispatcher.running:
+                if cfg.get("telegram_edit_on_change", True):
+                    refresh_pushed_messages(out)
+                check_dead_letter_replay()
+                write_dispatcher_stats()
             
             first_loop = False
-            logger.info(f"监控循环完成，共 {len(out)} 个项目")
+            logger.info(f"监控循环完成，共 {len(out)} 个项目 / {len(plan)} 个 Space")
             
         except Exception as e:
             logger.error(f"监控循环异常: {e}")
@@ -598,13 +3342,260 @@ def monitor_loop():
         time.sleep(30)  # 30秒一次
 
 
+def acquire_monitor_lock() -> bool:
+    """获取监控单实例锁，保证整机只有一个 monitor_loop 在轮询上游"""
+    global _monitor_lock_file, monitor_owner
+    if monitor_owner:
+        return True
+    
+    f = open(MONITOR_LOCK_PATH, "a+")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    
+    f.seek(0)
+    f.truncate()
+    f.write(str(os.getpid()))
+    f.flush()
+    _monitor_lock_file = f  # 保持文件句柄，进程退出时锁自动释放
+    monitor_owner = True
+    return True
+
+
 def start_monitor():
     """启动监控线程"""
+    if not acquire_monitor_lock():
+        logger.warning("监控锁已被其他进程持有，本进程只读取监控快照")
+        return
+    cfg = load_config()
+    start_dispatcher(cfg)
+    start_push_queue(cfg)
     t = threading.Thread(target=monitor_loop, daemon=True)
     t.start()
     logger.info("后台监控线程已启动")
 
 
+def run_monitor_process():
+    """monitor 角色：前台运行唯一的监控循环，不提供 Web 服务"""
+    if not acquire_monitor_lock():
+        logger.error(f"已有监控进程在运行（锁文件: {MONITOR_LOCK_PATH}），退出")
+        sys.exit(1)
+    logger.info(f"监控进程已启动 (pid={os.getpid()})")
+    cfg = load_config()
+    start_dispatcher(cfg)
+    start_push_queue(cfg)
+    monitor_loop()
+
+
+# =============== 监控快照（mmap 共享） ===============
+#
+# 文件布局（小端）:
+#   header: magic "NTXS" | version u16 | flags u16 | generation u64 | count u32
+#           | meta_off u64 | meta_len u32 | index_off u64
+#   meta:   JSON（last_loop 等）
+#   index:  count 个 (key_off u64, key_len u32, rec_off u64, rec_len u32)
+#   key:    "name\x1falias\x1fcategory"（name/alias 小写，用于搜索过滤）
+#   record: 单个项目的 JSON
+# 写入临时文件后 os.replace 原子替换，读端以只读方式 mmap，按需解码单条记录。
+
+SNAPSHOT_MAGIC = b"NTXS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHHQIQIQ")
+SNAPSHOT_INDEX_ENTRY = struct.Struct("<QIQI")
+SNAPSHOT_KEY_SEP = "\x1f"
+
+
+def _snapshot_key(p: dict) -> bytes:
+    """生成项目的过滤键"""
+    parts = (
+        (p.get("name") or "").lower(),
+        (p.get("alias") or "").lower(),
+        p.get("category") or "",
+    )
+    return SNAPSHOT_KEY_SEP.join(x.replace(SNAPSHOT_KEY_SEP, " ") for x in parts).encode("utf-8")
+
+
+def write_snapshot(path: str, state: dict):
+    """把监控状态发布为可 mmap 的快照文件（原子替换）"""
+    projects = state.get("projects", [])
+    meta = json.dumps({"last_loop": state.get("last_loop", "")}, ensure_ascii=False).encode("utf-8")
+    
+    blobs = []
+    entries = []
+    offset = SNAPSHOT_HEADER.size + len(meta) + SNAPSHOT_INDEX_ENTRY.size * len(projects)
+    for p in projects:
+        key = _snapshot_key(p)
+        rec = json.dumps(p, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entries.append(SNAPSHOT_INDEX_ENTRY.pack(offset, len(key), offset + len(key), len(rec)))
+        blobs.append(key)
+        blobs.append(rec)
+        offset += len(key) + len(rec)
+    
+    meta_off = SNAPSHOT_HEADER.size
+    index_off = meta_off + len(meta)
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, time.time_ns(),
+        len(projects), meta_off, len(meta), index_off,
+    )
+    
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(meta)
+            f.write(b"".join(entries))
+            f.write(b"".join(blobs))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"写入监控快照失败: {e}")
+
+
+class SnapshotReader:
+    """只读映射监控快照，文件被替换后自动重新映射"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stat_key = None
+        self._view = None  # (mmap, count, index_off, meta)
+    
+    def _load(self):
+        """检查快照是否被替换，必要时重新映射；返回当前视图"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        
+        stat_key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if stat_key == self._stat_key:
+                return self._view
+            try:
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.error(f"映射监控快照失败: {e}")
+                self._stat_key = stat_key  # 同一个文件不再重试，直到它被替换
+                return self._view
+            
+            try:
+                magic, version, _, _, count, meta_off, meta_len, index_off = SNAPSHOT_HEADER.unpack_from(mm, 0)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    raise ValueError(f"格式不支持: {magic!r} v{version}")
+                # 截断的文件：索引或最后一条记录越过文件末尾（记录按索引顺序写入，最后一条结束于文件末尾）
+                index_end = index_off + SNAPSHOT_INDEX_ENTRY.size * count
+                if meta_off + meta_len > len(mm) or index_end > len(mm):
+                    raise ValueError("文件不完整")
+                if count:
+                    _, _, rec_off, rec_len = SNAPSHOT_INDEX_ENTRY.unpack_from(mm, index_end - SNAPSHOT_INDEX_ENTRY.size)
+                    if rec_off + rec_len > len(mm):
+                        raise ValueError("文件不完整")
+                meta = json.loads(mm[meta_off:meta_off + meta_len].decode("utf-8"))
+            except (struct.error, ValueError) as e:
+                logger.error(f"监控快照无效，继续使用上一份: {e}")
+                mm.close()
+                self._stat_key = stat_key
+                return self._view
+            
+            # 旧映射不主动 close，仍在使用它的请求结束后由 GC 回收
+            self._view = (mm, count, index_off, meta)
+            self._stat_key = stat_key
+            return self._view
+    
+    def available(self) -> bool:
+        return self._load() is not None
+    
+    def last_loop(self) -> str:
+        view = self._load()
+        return view[3].get("last_loop", "") if view else ""
+    
+    def select(self, q: str = "", cat: str = "all") -> List[dict]:
+        """按搜索词/分类过滤，只解码命中的记录"""
+        view = self._load()
+        if not view:
+            return []
+        mm, count, index_off, _ = view
+        
+        out = []
+        for i in range(count):
+            key_off, key_len, rec_off, rec_len = SNAPSHOT_INDEX_ENTRY.unpack_from(
+                mm, index_off + i * SNAPSHOT_INDEX_ENTRY.size
+            )
+            if q or cat in ("custom", "trending"):
+                name, alias, category = mm[key_off:key_off + key_len].decode("utf-8").split(SNAPSHOT_KEY_SEP)
+                if q and q not in name and q not in alias:
+                    continue
+                if cat in ("custom", "trending") and category != cat:
+                    continue
+            out.append(json.loads(mm[rec_off:rec_off + rec_len]))
+        return out
+    
+    def to_state(self) -> dict:
+        """解码完整状态（/api/raw 使用）"""
+        return {"last_loop": self.last_loop(), "projects": self.select()}
+
+
+snapshot_reader = SnapshotReader(SNAPSHOT_PATH)
+
+
+# =============== 监控快照读取 ===============
+
+_published_state = {"mtime": None, "state": {"last_loop": "", "projects": []}}
+_published_state_lock = threading.Lock()
+
+
+def read_published_state() -> dict:
+    """读取监控进程发布的快照，文件未变化时直接复用已加载的结果"""
+    try:
+        mtime = os.stat(STATE_PATH).st_mtime_ns
+    except OSError:
+        return _published_state["state"]
+    
+    with _published_state_lock:
+        if _published_state["mtime"] != mtime:
+            _published_state["state"] = load_state()
+            _published_state["mtime"] = mtime
+        return _published_state["state"]
+
+
+def current_state() -> dict:
+    """获取当前监控状态：监控所在进程直接读内存，Web 工作进程读快照"""
+    if monitor_owner:
+        return monitor_state
+    if snapshot_reader.available():
+        return snapshot_reader.to_state()
+    return read_published_state()
+
+
+def select_projects(q: str = "", cat: str = "all") -> List[dict]:
+    """按搜索词/分类选出项目；Web 工作进程只解码命中的快照记录"""
+    if not monitor_owner and snapshot_reader.available():
+        return snapshot_reader.select(q, cat)
+    
+    projs = current_state().get("projects", [])
+    
+    # 搜索过滤
+    if q:
+        projs = [p for p in projs if q in p.get("name", "").lower() or q in p.get("alias", "").lower()]
+    
+    # 分类过滤
+    if cat in ("custom", "trending"):
+        projs = [p for p in projs if p.get("category") == cat]
+    
+    return projs
+
+
+def current_last_loop() -> str:
+    """获取最近一次监控循环时间"""
+    if not monitor_owner and snapshot_reader.available():
+        return snapshot_reader.last_loop()
+    return current_state().get("last_loop", "")
+
+
 # =============== Web UI ===============
 
 app = Flask(__name__)
@@ -673,6 +3664,19 @@ def card_html(p: dict) -> str:
         """
 
 
+# 首页流式渲染：项目数超过阈值（或 ?stream=1）时启用
+STREAM_RENDER_THRESHOLD = 2000
+STREAM_CHUNK_CARDS = 200
+
+INDEX_EMPTY_HTML = '<div style="color:#9ca3af;font-size:13px;padding:20px;">当前没有任何项目。</div>'
+INDEX_TAIL_HTML = """
+        </div>
+      </div>
+    </body>
+    </html>
+    """
+
+
 @app.route("/")
 def index():
     """主页 - 活动监控"""
@@ -682,27 +3686,18 @@ def index():
     q = (request.args.get("q") or "").lower()
     cat = (request.args.get("cat") or "all").lower()
     
-    projs = monitor_state.get("projects", [])
-    
-    # 搜索过滤
-    if q:
-        projs = [p for p in projs if q in p.get("name", "").lower() or q in p.get("alias", "").lower()]
-    
-    # 分类过滤
-    if cat in ("custom", "trending"):
-        projs = [p for p in projs if p.get("category") == cat]
+    projs = select_projects(q, cat)
     
     # 排序
     sorted_projs = sort_projects(projs)
-    cards = "".join(card_html(p) for p in sorted_projs)
-    last = monitor_state.get("last_loop", "")
+    last = current_last_loop()
     last_utc8 = format_time_utc8(last)
     
     active_all = "active" if cat == "all" else ""
     active_custom = "active" if cat == "custom" else ""
     active_trending = "active" if cat == "trending" else ""
     
-    html = f"""
+    head = f"""
     <!DOCTYPE html>
     <html lang="zh-CN">
     <head>
@@ -981,13 +3976,43 @@ def index():
         </header>
 
         <div class="grid">
-          {cards or '<div style="color:#9ca3af;font-size:13px;padding:20px;">当前没有任何项目。</div>'}
-        </div>
-      </div>
-    </body>
-    </html>
     """
-    return html
+    
+    # 项目很多时改为流式输出：先发页头，再分块输出卡片
+    stream = request.args.get("stream")
+    if stream is None:
+        threshold = int(cfg.get("stream_render_threshold", STREAM_RENDER_THRESHOLD))
+        use_stream = threshold > 0 and len(sorted_projs) > threshold
+    else:
+        use_stream = stream.lower() in ("1", "true", "yes")
+    
+    if use_stream:
+        return Response(
+            stream_with_context(render_index_stream(head, sorted_projs)),
+            mimetype="text/html",
+        )
+    
+    cards = "".join(card_html(p) for p in sorted_projs)
+    return head + (cards or INDEX_EMPTY_HTML) + INDEX_TAIL_HTML
+
+
+def render_index_stream(head: str, projects: List[dict]):
+    """流式生成首页 HTML：页头立即发送，卡片按块输出"""
+    yield head
+    
+    chunk = []
+    for p in projects:
+        chunk.append(card_html(p))
+        if len(chunk) >= STREAM_CHUNK_CARDS:
+            yield "".join(chunk)
+            chunk = []
+    
+    if chunk:
+        yield "".join(chunk)
+    elif not projects:
+        yield INDEX_EMPTY_HTML
+    
+    yield INDEX_TAIL_HTML
 
 
 @app.route("/manage")
@@ -1020,7 +4045,10 @@ def manage():
         targets_html = '<div style="display:grid;gap:12px;margin-top:12px;">'
         for i, target in enumerate(notify_targets):
             name = target.get("name", f"目标{i+1}")
-            bot_token = target.get("bot_token", "")[:15] + "..."
+            tokens = target_bot_tokens(target)
+            bot_token = (tokens[0][:15] + "...") if tokens else "-"
+            if len(tokens) > 1:
+                bot_token += f" (+{len(tokens) - 1} 个Bot)"
             chat_id = target.get("chat_id", "")
             enabled = target.get("enabled", True)
             projects = target.get("projects", [])
@@ -1300,7 +4328,7 @@ def manage():
                 <label>名称</label>
                 <input name="name" placeholder="例如: VIP群" required style="flex:0.5;">
                 <label>Bot Token</label>
-                <input name="bot_token" placeholder="123456:ABC-DEF..." required style="flex:1;">
+                <input name="bot_token" placeholder="123456:ABC-DEF...（多个Bot用逗号分隔）" required style="flex:1;">
               </div>
               <div class="form-row">
                 <label>Chat ID</label>
@@ -1341,7 +4369,6 @@ def manage():
 @app.route("/add")
 def add():
     """添加单个项目"""
-    cfg = load_config()
     pwd = ""  # 已移除密码验证
     
     name = (request.args.get("name") or "").strip()
@@ -1351,12 +4378,14 @@ def add():
     if not name or not alias:
         return "缺少 name 或 alias"
     
-    cfg.setdefault("projects", []).append({
-        "name": name,
-        "alias": alias,
-        "category": category
-    })
-    save_config(cfg)
+    with config_lock():
+        cfg = load_config()
+        cfg.setdefault("projects", []).append({
+            "name": name,
+            "alias": alias,
+            "category": category
+        })
+        save_config(cfg)
     logger.info(f"已添加项目: {name} (@{alias})")
     
     return f"添加成功：{name} ({alias}) [{category}] · <a href='/?pwd={pwd}'>返回首页</a>"
@@ -1376,9 +4405,8 @@ def add_bulk():
     added = 0
     skipped = 0
     skipped_list = []
-    
-    # 获取现有项目的所有 alias,用于去重检测
-    existing_aliases = {p.get("alias") for p in cfg.get("projects", [])}
+    missing_list = []
+    candidates = []
     
     for line in lines:
         line = line.strip()
@@ -1397,23 +4425,55 @@ def add_bulk():
         else:
             name, alias, category = parts[0], parts[1], parts[2] or "custom"
         
-        # 检查重复
-        if alias in existing_aliases:
-            skipped += 1
-            skipped_list.append(alias)
-            logger.info(f"跳过重复项目: {alias}")
-            continue
-        
-        # 添加新项目
-        cfg.setdefault("projects", []).append({
-            "name": name,
-            "alias": alias,
-            "category": category
-        })
-        existing_aliases.add(alias)  # 更新已存在列表,防止本次批量导入内部重复
-        added += 1
+        candidates.append((name, alias, category, len(parts) > 1))
+    
+    # 通过 GraphQL 批量校验 alias 并获取 spaceId（每 50 个 alias 一次请求）；
+    # 接口不可用时跳过校验，照常添加
+    resolved = {}
+    if cfg.get("resolve_on_add", True) and candidates:
+        try:
+            resolved = resolve_aliases(list(dict.fromkeys(c[1] for c in candidates)),
+                                       workers=4, html_fallback=False, show_progress=False)
+        except Exception as e:
+            logger.error(f"批量校验 Space 失败，跳过校验: {e}")
     
-    save_config(cfg)
+    # 校验完成后在配置锁内重新读取配置再合并，期间其他进程的修改不会被覆盖
+    with config_lock():
+        cfg = load_config()
+        # 获取现有项目的所有 alias,用于去重检测
+        existing_aliases = {p.get("alias") for p in cfg.get("projects", [])}
+        
+        for name, alias, category, named in candidates:
+            if alias in resolved and resolved[alias] is None:
+                missing_list.append(alias)
+                logger.info(f"跳过不存在的 Space: {alias}")
+                continue
+            info = resolved.get(alias)
+            if info:
+                alias = info["alias"]
+                if not named and info.get("name"):
+                    name = info["name"]
+        
+            # 检查重复
+            if alias in existing_aliases:
+                skipped += 1
+                skipped_list.append(alias)
+                logger.info(f"跳过重复项目: {alias}")
+                continue
+        
+            # 添加新项目
+            project = {
+                "name": name,
+                "alias": alias,
+                "category": category
+            }
+            if info:
+                project["space_id"] = info["space_id"]
+            cfg.setdefault("projects", []).append(project)
+            existing_aliases.add(alias)  # 更新已存在列表,防止本次批量导入内部重复
+            added += 1
+        
+        save_config(cfg)
     
     # 构建反馈消息
     msg_parts = []
@@ -1423,6 +4483,8 @@ def add_bulk():
         msg_parts.append(f"跳过 {skipped} 个重复项目")
         if skipped_list:
             msg_parts.append(f"(重复项: {', '.join(skipped_list[:5])}{'...' if len(skipped_list) > 5 else ''})")
+    if missing_list:
+        msg_parts.append(f"跳过 {len(missing_list)} 个不存在的 Space({', '.join(missing_list[:5])}{'...' if len(missing_list) > 5 else ''})")
     
     result_msg = "、".join(msg_parts) if msg_parts else "未添加任何项目"
     logger.info(f"批量添加完成: {result_msg}")
@@ -1433,7 +4495,6 @@ def add_bulk():
 @app.route("/delete")
 def delete():
     """删除项目"""
-    cfg = load_config()
     pwd = ""  # 已移除密码验证
     
     idx = request.args.get("idx") or ""
@@ -1442,28 +4503,30 @@ def delete():
     except Exception:
         return "idx 必须是整数"
     
-    lst = cfg.get("projects", [])
-    if 0 <= i < len(lst):
+    with config_lock():
+        cfg = load_config()
+        lst = cfg.get("projects", [])
+        if not 0 <= i < len(lst):
+            return "索引超出范围"
         removed = lst.pop(i)
         save_config(cfg)
-        logger.info(f"已删除项目: {removed.get('name')} (@{removed.get('alias')})")
-        return f"已删除：{removed.get('name')} ({removed.get('alias')}) · <a href='/?pwd={pwd}'>返回首页</a>"
-    else:
-        return "索引超出范围"
+    logger.info(f"已删除项目: {removed.get('name')} (@{removed.get('alias')})")
+    return f"已删除：{removed.get('name')} ({removed.get('alias')}) · <a href='/?pwd={pwd}'>返回首页</a>"
 
 
 @app.route("/save_notify", methods=["POST"])
 def save_notify():
     """保存通知配置"""
-    cfg = load_config()
     pwd = ""  # 已移除密码验证
     
     method = (request.form.get("notify_method") or "none").lower()
     discord = request.form.get("discord_webhook_url") or ""
     
-    cfg["notify_method"] = method
-    cfg["discord_webhook_url"] = discord
-    save_config(cfg)
+    with config_lock():
+        cfg = load_config()
+        cfg["notify_method"] = method
+        cfg["discord_webhook_url"] = discord
+        save_config(cfg)
     
     logger.info(f"通知配置已更新: {method}")
     return f"通知配置已保存（当前：{method}）。<a href='/manage?pwd={pwd}'>返回管理页面</a>"
@@ -1472,7 +4535,6 @@ def save_notify():
 @app.route("/add_notify_target", methods=["POST"])
 def add_notify_target():
     """添加Telegram推送目标"""
-    cfg = load_config()
     pwd = ""  # 已移除密码验证
     
     name = request.form.get("name", "").strip()
@@ -1487,19 +4549,24 @@ def add_notify_target():
     # 解析projects
     projects = [p.strip() for p in projects_str.split(",") if p.strip()] if projects_str else []
     
-    # 添加到notify_targets
-    if "notify_targets" not in cfg:
-        cfg["notify_targets"] = []
-    
-    cfg["notify_targets"].append({
+    target = {
         "name": name,
         "bot_token": bot_token,
         "chat_id": chat_id,
         "enabled": enabled,
         "projects": projects
-    })
+    }
+    # 多个 Bot Token 用逗号分隔：组成 Bot 池，按剩余额度负载均衡
+    tokens = [t.strip() for t in bot_token.split(",") if t.strip()]
+    if len(tokens) > 1:
+        target["bot_token"] = tokens[0]
+        target["bot_tokens"] = tokens
     
-    save_config(cfg)
+    # 添加到notify_targets
+    with config_lock():
+        cfg = load_config()
+        cfg.setdefault("notify_targets", []).append(target)
+        save_config(cfg)
     logger.info(f"已添加推送目标: {name} -> {chat_id}")
     
     return f"✅ 已添加推送目标: {name}。<a href='/manage?pwd={pwd}'>返回管理页面</a>"
@@ -1508,16 +4575,17 @@ def add_notify_target():
 @app.route("/delete_notify_target", methods=["POST"])
 def delete_notify_target():
     """删除Telegram推送目标"""
-    cfg = load_config()
     pwd = ""  # 已移除密码验证
     
     index = int(request.form.get("index", -1))
     
-    if "notify_targets" not in cfg or index < 0 or index >= len(cfg["notify_targets"]):
-        return "❌ 无效的索引。<a href='/manage?pwd={pwd}'>返回</a>"
-    
-    deleted = cfg["notify_targets"].pop(index)
-    save_config(cfg)
+    with config_lock():
+        cfg = load_config()
+        if "notify_targets" not in cfg or index < 0 or index >= len(cfg["notify_targets"]):
+            return "❌ 无效的索引。<a href='/manage?pwd={pwd}'>返回</a>"
+        
+        deleted = cfg["notify_targets"].pop(index)
+        save_config(cfg)
     
     logger.info(f"已删除推送目标: {deleted.get('name', '未命名')}")
     return f"✅ 已删除推送目标: {deleted.get('name', '未命名')}。<a href='/manage?pwd={pwd}'>返回管理页面</a>"
@@ -1554,12 +4622,115 @@ def api_raw():
     if pwd != cfg.get("webui_password"):
         return jsonify({"error": "unauthorized"}), 401
     
-    return jsonify(monitor_state)
+    return jsonify(current_state())
+
+
+@app.route("/api/dispatcher")
+def api_dispatcher():
+    """推送调度器状态：队列深度、各目标推送耗时"""
+    cfg = load_config()
+    pwd = request.args.get("pwd", "")
+    
+    if pwd != cfg.get("webui_password"):
+        return jsonify({"error": "unauthorized"}), 401
+    
+    if dispatcher.running:
+        return jsonify(notifier_stats())
+    try:
+        with open(DISPATCHER_STATS_PATH, "r", encoding="utf-8") as f:
+            return jsonify(json.load(f))
+    except Exception:
+        return jsonify({"running": False, "queue_depth": 0, "targets": {}})
+
+
+@app.route("/admin/dead_letters")
+def admin_dead_letters():
+    """查看死信（推送最终失败的消息）"""
+    cfg = load_config()
+    pwd = request.args.get("pwd", "")
+    
+    if pwd != cfg.get("webui_password"):
+        return jsonify({"error": "unauthorized"}), 401
+    
+    limit = request.args.get("limit", 200, type=int)
+    return jsonify({"count": dead_letters.count(), "items": dead_letters.list(limit)})
+
+
+@app.route("/admin/dead_letters/replay", methods=["POST"])
+def admin_replay_dead_letters():
+    """批量重放死信：调度器在本进程时立即重放，否则交给 monitor 进程在下一轮循环处理"""
+    cfg = load_config()
+    pwd = request.values.get("pwd", "")
+    
+    if pwd != cfg.get("webui_password"):
+        return jsonify({"error": "unauthorized"}), 401
+    
+    if dispatcher.running:
+        return jsonify({"replayed": replay_dead_letters()})
+    
+    with open(DEAD_LETTER_REPLAY_FLAG, "w", encoding="utf-8") as f:
+        f.write(datetime.utcnow().isoformat() + "Z")
+    return jsonify({"scheduled": dead_letters.count()})
+
+
+@app.route("/admin/merge_spaces", methods=["POST"])
+def admin_merge_spaces():
+    """
+    把 galxe_crawler.py 的结果合并进项目列表（按 spaceId / 小写 alias 去重，只写一次配置）
+    
+    数据来源：上传的 file > 请求体 JSON > 服务器上的 tools/spaces_bulk.json
+    """
+    cfg = load_config()
+    pwd = request.values.get("pwd", "")
+    
+    if pwd != cfg.get("webui_password"):
+        return jsonify({"error": "unauthorized"}), 401
+    
+    category = (request.values.get("category") or "custom").strip() or "custom"
+    include_unresolved = request.values.get("include_unresolved") == "1"
+    started = time.monotonic()
+    upload = request.files.get("file")
+    try:
+        # 上传文件和服务器文件都边读边解析，不整体载入内存
+        if upload is not None:
+            source = codecs.getreader("utf-8")(upload.stream)
+        elif request.is_json:
+            source = None
+        else:
+            source = open(BULK_FILE, "r", encoding="utf-8")
+    except Exception as e:
+        return jsonify({"error": f"读取 Space 列表失败: {e}"}), 400
+    
+    with config_lock():
+        cfg = load_config()
+        try:
+            spaces = iter_spaces(request.get_json()) if source is None else stream_spaces(source)
+            stats = merge_spaces(cfg, spaces, category, include_unresolved)
+        except Exception as e:
+            return jsonify({"error": f"读取 Space 列表失败: {e}"}), 400
+        finally:
+            if source is not None:
+                source.close()
+        if stats["added"] or stats["updated"]:
+            save_config(cfg)
+    stats["projects"] = len(cfg.get("projects", []))
+    stats["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    logger.info(f"📥 合并 Space 列表: 新增 {stats['added']}，更新 {stats['updated']}，重复 {stats['duplicate']}")
+    return jsonify(stats)
 
 
 # =============== 主函数 ===============
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NTX Quest Radar")
+    parser.add_argument(
+        "--role",
+        choices=("all", "monitor", "web"),
+        default=SERVE_ROLE if SERVE_ROLE in ("all", "monitor", "web") else "all",
+        help="all=单进程(开发) / monitor=仅监控进程 / web=仅 Web 服务(读取监控快照)",
+    )
+    args = parser.parse_args()
+    
     # 初始化
     ensure_config()
     cfg = load_config()
@@ -1567,12 +4738,18 @@ if __name__ == "__main__":
     # 加载历史状态
     monitor_state = load_initial_state()
     
-    logger.info("=== NTX Quest Radar V4.0（优化版） ===")
+    logger.info(f"=== NTX Quest Radar V4.0（优化版） role={args.role} ===")
+    
+    if args.role == "monitor":
+        run_monitor_process()
+        sys.exit(0)
+    
     logger.info(f"Web UI 密码: {cfg.get('webui_password')}")
     logger.info(f"访问: http://localhost:{cfg['webui_port']}/?pwd={cfg['webui_password']}")
     
-    # 启动后台监控
-    start_monitor()
+    # 启动后台监控（web 角色只读取 monitor 进程发布的快照）
+    if args.role == "all":
+        start_monitor()
     
     # 启动 Web 服务
     app.run(
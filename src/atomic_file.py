@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON 文件的原子写入与跨进程文件锁（app.py / galxe_crawler.py / merge_spaces_config.py 共用）
+
+- write_json_atomic：写唯一命名的临时文件 -> fsync -> os.replace，读端不会读到半个文件，
+  掉电后也不会留下空文件；并发写入各用各的临时文件，互不覆盖
+- file_lock：对 <path>.lock 加 flock 排他锁，串行化同一文件的“读取 -> 修改 -> 写回”，
+  同一台机器上的 Web 进程、monitor 进程和命令行工具之间都有效
+"""
+
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def write_json_atomic(path: str, data):
+    """写入 JSON 文件（先写临时文件并 fsync，再原子替换）"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str):
+    """持有 <path>.lock 的排他锁直到 with 块结束（阻塞等待）"""
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
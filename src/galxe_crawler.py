@@ -4,41 +4,155 @@
 """
 Galxe Space 批量解析工具（从本地种子列表读取，而不是全网爬虫）
 
+优先通过 Galxe GraphQL 接口 space(alias:) 批量查询 spaceId（一次请求查询多个 alias），
+查询不到的再回退为抓取 Space 页面 HTML。
+
 用法：
 1. 编辑 tools/space_seeds.txt，填入你要监控的 Space 链接或别名（每行一个）。
-2. 运行：python tools/galxe_crawler.py
-3. 生成 tools/spaces_bulk.json
-4. 再运行：python tools/merge_spaces_config.py 导入到 config.json
+2. 运行：python src/galxe_crawler.py [--workers 8] [--rate 2]
+3. 生成 tools/spaces_bulk.json（重复运行时只解析新增或缓存过期的种子，见 --ttl-days / --refresh）
+4. 再运行：python src/merge_spaces_config.py 导入到 config.json
+   （或 POST /admin/merge_spaces?pwd=密码）
+
+发现模式：python src/galxe_crawler.py --discover [--max-pages 5] [--max-spaces 300]
+并发翻页抓取 base_list_url 列表页，边抓边去重，结果合并进 tools/spaces_bulk.json。
+中断后重新运行会跳过已抓完的页，从未完成的页继续。
 """
 
+import argparse
+import codecs
 import os
 import re
+import threading
 import time
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from typing import List, Dict, Optional, Set
+from urllib.parse import urlsplit
 
 import requests
 
+from atomic_file import write_json_atomic
+
 # ========= 可配置参数区域 =========
 
-# 种子列表文件路径
-TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+# 种子列表与输出文件位于仓库根目录的 tools/ 下（本脚本在 src/ 中）
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(ROOT, "tools")
 SEED_FILE = os.path.join(TOOLS_DIR, "space_seeds.txt")
 
 # 输出文件路径
 OUTPUT_FILE = os.path.join(TOOLS_DIR, "spaces_bulk.json")
 
-# 请求 Space 详情页之间的间隔（秒）
-SPACE_PAGE_INTERVAL = 3
+# 并发解析的线程数
+RESOLVE_WORKERS = 8
+
+# Galxe GraphQL 接口（与 app.py 的 OPENAPI_URL 相同）
+OPENAPI_URL = "https://graphigo.prd.galaxy.eco/query"
+
+# 单个 GraphQL 请求查询的 alias 数
+GRAPHQL_BATCH_SIZE = 50
+
+# 回退抓取 HTML 时按块流式读取：块大小与单页最多读取的字节数
+HTML_CHUNK_SIZE = 16 * 1024
+HTML_MAX_BYTES = 2 * 1024 * 1024
+
+SPACE_ID_RE = re.compile(r'"spaceId"\s*:\s*(\d+)')
+
+# 发现模式：列表页地址、翻页参数与默认预算（输出文件中的 base_list_url / max_pages / max_spaces 优先）
+DISCOVER_LIST_URL = "https://galxe.com/discover"
+DISCOVER_PAGE_PARAM = "page"
+DISCOVER_MAX_PAGES = 5
+DISCOVER_MAX_SPACES = 300
+
+# 列表页中的 Space 链接 / 数据：(spaceId, alias) 或仅 alias
+LISTING_ID_ALIAS_RE = re.compile(r'"id"\s*:\s*"?(\d+)"?\s*,\s*"spaceUrl"\s*:\s*"([A-Za-z0-9_-]+)"')
+LISTING_ALIAS_RES = [
+    re.compile(r'"spaceUrl"\s*:\s*"([A-Za-z0-9_-]+)"'),
+    re.compile(r'href="(?:https?://(?:app\.)?galxe\.com)?/quest/([A-Za-z0-9_-]+)'),
+]
+
+# 对同一域名的请求速率上限（次/秒），取代原来每个种子固定 sleep 3 秒
+HOST_RATE_PER_SEC = 2.0
+
+# 进度输出间隔（秒）
+PROGRESS_INTERVAL = 5
+
+# 已解析结果的有效期（天）：输出文件中 verified_at 未过期的 alias 重复运行时不再请求
+CACHE_TTL_DAYS = 7
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 # HTTP 请求头
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; GalxeMonitorSeedResolver/1.0; +https://example.com)",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.5",
-    "Connection": "close",
 }
 
+# ========= 限速与连接复用 =========
+
+class HostRateLimiter:
+    """
+    按域名限速：同一域名两次请求的发起时间至少间隔 1/rate 秒，
+    不同域名互不影响；多个线程并发调用时按到达顺序排队领取时间槽。
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = HostRateLimiter(HOST_RATE_PER_SEC)
+
+_local = threading.local()
+
+
+def http_session() -> requests.Session:
+    """每个工作线程一个 Session，复用 keep-alive 连接"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+        session.headers.update(HEADERS)
+    return session
+
+
+class Progress:
+    """并发解析的进度统计，最多每 PROGRESS_INTERVAL 秒输出一次"""
+
+    def __init__(self, total: int, enabled: bool = True):
+        self.total = total
+        self.enabled = enabled
+        self.done = 0
+        self.resolved = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def update(self, ok: bool):
+        with self._lock:
+            self.done += 1
+            self.resolved += 1 if ok else 0
+            now = time.monotonic()
+            if not self.enabled or (self.done < self.total and now - self._last_report < PROGRESS_INTERVAL):
+                return
+            self._last_report = now
+            elapsed = now - self.started
+            speed = self.done / elapsed if elapsed > 0 else 0.0
+            eta = (self.total - self.done) / speed if speed > 0 else 0.0
+            print(f"[INFO] 进度 {self.done}/{self.total}：已解析 {self.resolved}，"
+                  f"失败 {self.done - self.resolved}，{speed:.1f} 个/秒，预计剩余 {eta:.0f} 秒")
+
 # ========= 工具函数 =========
 
 def load_seed_aliases(path: str) -> List[str]:
@@ -75,40 +189,73 @@ def load_seed_aliases(path: str) -> List[str]:
     return alias_list
 
 
+def scan_stream(chunks, patterns: List[re.Pattern], overlap: int) -> Optional[tuple]:
+    """
+    在分块到达的文本流中查找第一个匹配，找到后立即返回 (模式序号, 匹配的数字)
+
+    每块与上一块末尾 overlap 个字符拼接后再匹配，跨块边界的字段也能找到；
+    匹配紧贴缓冲区末尾时（数字可能被截断）等下一块到达再确认。
+    """
+    tail = ""
+    for chunk in chunks:
+        buf = tail + chunk
+        for idx, pattern in enumerate(patterns):
+            m = pattern.search(buf)
+            if m and m.end() < len(buf):
+                return idx, int(m.group(1))
+        tail = buf[-overlap:]
+    for idx, pattern in enumerate(patterns):
+        m = pattern.search(tail)
+        if m:
+            return idx, int(m.group(1))
+    return None
+
+
+def iter_text(resp, max_bytes: int = HTML_MAX_BYTES):
+    """按块读取并增量解码响应体，最多读取 max_bytes 字节"""
+    decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="ignore")
+    read = 0
+    for raw in resp.iter_content(chunk_size=HTML_CHUNK_SIZE):
+        read += len(raw)
+        yield decoder.decode(raw)
+        if read >= max_bytes:
+            return
+    yield decoder.decode(b"", final=True)
+
+
 def fetch_space_id_by_alias(alias: str) -> Optional[int]:
     """
     访问 Space 页面，尝试解析 spaceId。
     注意：这依赖对方前端结构，如果将来改版，可能需要调整正则。
+
+    页面按块流式读取，找到 spaceId 后立即断开连接，单页最多读取 HTML_MAX_BYTES 字节。
     """
     # 目前 Space 页面常见路径是 https://app.galxe.com/quest/{alias}
     url_candidates = [
         f"https://app.galxe.com/quest/{alias}",
         f"https://galxe.com/{alias}",  # 兼容老路径
     ]
+    # 优先匹配 "spaceId": 82200；兜底匹配 "id": 82200, "spaceUrl": "Alias"
+    patterns = [
+        SPACE_ID_RE,
+        re.compile(r'"id"\s*:\s*(\d+)\s*,\s*"spaceUrl"\s*:\s*"' + re.escape(alias) + r'"'),
+    ]
+    overlap = len(alias) + 128
 
     for url in url_candidates:
-        print(f"[INFO] 请求 Space 详情页: {url}")
+        rate_limiter.wait(url)
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=20)
-            if resp.status_code != 200:
-                print(f"[WARN] Space {alias} 页面状态码: {resp.status_code} ({url})")
-                continue
-
-            text = resp.text
+            with http_session().get(url, timeout=20, stream=True) as resp:
+                if resp.status_code != 200:
+                    print(f"[WARN] Space {alias} 页面状态码: {resp.status_code} ({url})")
+                    continue
 
-            # 尝试匹配 "spaceId": 82200
-            m = re.search(r'"spaceId"\s*:\s*(\d+)', text)
-            if m:
-                sid = int(m.group(1))
-                print(f"[INFO] alias={alias} 解析到 spaceId={sid}")
-                return sid
+                found = scan_stream(iter_text(resp), patterns, overlap)
 
-            # 兜底：匹配 "id": 82200, "spaceUrl": "Alias"
-            pattern = r'"id"\s*:\s*(\d+)\s*,\s*"spaceUrl"\s*:\s*"' + re.escape(alias) + r'"'
-            m2 = re.search(pattern, text)
-            if m2:
-                sid = int(m2.group(1))
-                print(f"[INFO] alias={alias} 通过兜底规则解析到 spaceId={sid}")
+            if found:
+                idx, sid = found
+                rule = "解析到" if idx == 0 else "通过兜底规则解析到"
+                print(f"[INFO] alias={alias} {rule} spaceId={sid}")
                 return sid
 
             print(f"[WARN] 未在 {url} 页面中找到 spaceId 字段。")
@@ -119,38 +266,369 @@ def fetch_space_id_by_alias(alias: str) -> Optional[int]:
     return None
 
 
-def main():
-    aliases = load_seed_aliases(SEED_FILE)
+def load_output(path: str) -> Dict:
+    """读取已有的输出文件（作为 alias -> spaceId 缓存）；不存在或损坏时返回空结构"""
+    if not os.path.exists(path):
+        return {"spaces": []}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[WARN] 读取已有结果失败，将全部重新解析: {e}")
+        return {"spaces": []}
+    data.setdefault("spaces", [])
+    return data
+
+
+def is_fresh(entry: Optional[Dict], ttl_seconds: float, now: float) -> bool:
+    """缓存条目已解析出 spaceId 且 verified_at 未过期"""
+    if not entry or entry.get("space_id") is None or not entry.get("verified_at"):
+        return False
+    try:
+        verified = time.mktime(time.strptime(entry["verified_at"], TIME_FORMAT))
+    except (TypeError, ValueError):
+        return False
+    return now - verified < ttl_seconds
+
+
+def build_space_batch_query(count: int) -> str:
+    """为 count 个 alias 构建一个带字段别名的 GraphQL 查询：s0: space(alias:$a0){...} ..."""
+    params = ", ".join(f"$a{i}:String!" for i in range(count))
+    fields = "\n".join(f"  s{i}: space(alias:$a{i}){{ id alias name }}" for i in range(count))
+    return f"query SpaceIds({params}){{\n{fields}\n}}"
+
+
+def fetch_space_ids_graphql(aliases: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    一次 GraphQL 请求批量查询 alias -> {"space_id", "alias", "name"}
+
+    Space 不存在时对应值为 None；请求失败或整个查询被拒绝（响应中没有 data，只有 errors）时
+    抛出异常，由调用方回退到 HTML 抓取（Web 端则不校验、照常添加），而不是把整批当作不存在。
+    """
+    rate_limiter.wait(OPENAPI_URL)
+    resp = http_session().post(
+        OPENAPI_URL,
+        json={
+            "query": build_space_batch_query(len(aliases)),
+            "variables": {f"a{i}": alias for i, alias in enumerate(aliases)},
+        },
+        timeout=20,
+    )
+    resp.raise_for_status()
+    body = resp.json()
+    data = body.get("data")
+    if not isinstance(data, dict) or not data:
+        raise RuntimeError(f"GraphQL 查询被拒绝: {body.get('errors') or '响应中没有 data'}")
+
+    results: Dict[str, Optional[Dict]] = {}
+    for i, alias in enumerate(aliases):
+        space = data.get(f"s{i}")
+        sid = str((space or {}).get("id") or "")
+        if not sid.isdigit():
+            results[alias] = None
+            continue
+        results[alias] = {"space_id": int(sid), "alias": space.get("alias") or alias, "name": space.get("name")}
+    return results
+
+
+def resolve_aliases(aliases: List[str], workers: int = RESOLVE_WORKERS,
+                    batch_size: int = GRAPHQL_BATCH_SIZE, html_fallback: bool = True,
+                    show_progress: bool = True) -> Dict[str, Optional[Dict]]:
+    """
+    并发解析 alias -> {"space_id", "alias", "name"}（解析失败为 None）
+
+    先按 batch_size 个一组并发调用 GraphQL，未查到的 alias 再逐个抓取页面 HTML；
+    同一域名的请求速率由 rate_limiter 控制。html_fallback=False 时（如 Web 端内联调用）
+    不抓取页面，GraphQL 请求失败的 alias 不出现在结果中，以区别于“Space 不存在”。
+    """
+    results: Dict[str, Optional[Dict]] = {}
+    progress = Progress(len(aliases), show_progress)
+    fallback: List[str] = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        batches = [aliases[i:i + batch_size] for i in range(0, len(aliases), max(1, batch_size))]
+        futures = {pool.submit(fetch_space_ids_graphql, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                print(f"[WARN] GraphQL 批量查询失败（{len(batch)} 个 alias）: {e}")
+                if not html_fallback:
+                    continue
+                found = {}
+            for alias in batch:
+                info = found.get(alias)
+                if info is None and html_fallback:
+                    fallback.append(alias)
+                    continue
+                results[alias] = info
+                progress.update(info is not None)
+
+        futures = {pool.submit(fetch_space_id_by_alias, alias): alias for alias in fallback}
+        for future in as_completed(futures):
+            alias = futures[future]
+            try:
+                space_id = future.result()
+            except Exception as e:
+                print(f"[ERROR] 解析 Space {alias} 异常: {e}")
+                space_id = None
+            results[alias] = {"space_id": space_id, "alias": alias, "name": None} if space_id is not None else None
+            progress.update(space_id is not None)
+
+    return results
+
+
+# ========= 发现模式 =========
+
+def fetch_listing_page(list_url: str, page: int) -> List[Dict]:
+    """抓取一页列表，按出现顺序返回页内去重后的 [{"alias", "space_id"}]"""
+    sep = "&" if "?" in list_url else "?"
+    url = f"{list_url}{sep}{DISCOVER_PAGE_PARAM}={page}"
+    rate_limiter.wait(url)
+    resp = http_session().get(url, timeout=20)
+    resp.raise_for_status()
+    text = resp.text
+
+    items: Dict[str, Dict] = {}
+    for m in LISTING_ID_ALIAS_RE.finditer(text):
+        items.setdefault(m.group(2).lower(), {"alias": m.group(2), "space_id": int(m.group(1))})
+    for pattern in LISTING_ALIAS_RES:
+        for m in pattern.finditer(text):
+            items.setdefault(m.group(1).lower(), {"alias": m.group(1), "space_id": None})
+    return list(items.values())
+
+
+class DiscoverySink:
+    """
+    发现结果的增量写入：每个新 Space 立即追加一行到 <输出文件>.partial.jsonl，
+    每处理完一页再追加一行 {"page": n}（空页带 "end": true）作为翻页游标。
+    中断后重新运行会从该文件恢复：已发现的 Space 不会重复写入，已处理完的页不会重复抓取
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict] = []
+        self.seen: Set[str] = set()
+        self.done_pages: Set[int] = set()
+        self.end_page: Optional[int] = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "page" in entry:
+                        self._mark(entry["page"], entry.get("end", False))
+                    elif entry["alias"].lower() not in self.seen:
+                        self.seen.add(entry["alias"].lower())
+                        self.entries.append(entry)
+            print(f"[INFO] 从 {path} 恢复 {len(self.entries)} 个已发现的 Space，已完成 {len(self.done_pages)} 页")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _mark(self, page: int, end: bool):
+        self.done_pages.add(page)
+        if end and (self.end_page is None or page < self.end_page):
+            self.end_page = page
+
+    def page_done(self, page: int, end: bool = False):
+        """记录一页已处理完（end=True 表示该页为空，列表到此结束）"""
+        self._mark(page, end)
+        record = {"page": page, "end": True} if end else {"page": page}
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def pending(self, page: int) -> bool:
+        """该页还需要抓取：未处理过，且不在已知的列表末尾之后"""
+        return page not in self.done_pages and (self.end_page is None or page < self.end_page)
+
+    def add(self, entry: Dict) -> bool:
+        key = entry["alias"].lower()
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        self.entries.append(entry)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+def discover_spaces(list_url: str, max_pages: int, max_spaces: int, workers: int, sink: DiscoverySink):
+    """
+    并发翻页：最多同时抓取 workers 页，按页完成顺序边去重边写入 sink；
+    达到 max_spaces、翻完 max_pages 或遇到空页（列表结束）后不再提交新页
+    """
+    pages = iter([p for p in range(1, max_pages + 1) if sink.pending(p)])
+    stop = len(sink.entries) >= max_spaces
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            while not stop and len(running) < max(1, workers):
+                page = next(pages, None)
+                if page is None:
+                    break
+                running[pool.submit(fetch_listing_page, list_url, page)] = page
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                page = running.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    print(f"[WARN] 列表第 {page} 页抓取失败: {e}")
+                    continue
+                if not items:
+                    print(f"[INFO] 列表第 {page} 页为空，停止翻页")
+                    sink.page_done(page, end=True)
+                    stop = True
+                    continue
+
+                added = 0
+                for item in items:
+                    if len(sink.entries) >= max_spaces:
+                        stop = True
+                        break
+                    added += sink.add({
+                        "space_id": item["space_id"],
+                        "alias": item["alias"],
+                        "name": item["alias"],
+                        "tags": ["discover"],
+                    })
+                else:
+                    # 整页处理完才记游标；因 max_spaces 中途停下的页下次仍会重抓（已写入的 Space 会被去重）
+                    sink.page_done(page)
+                print(f"[INFO] 列表第 {page} 页：{len(items)} 个 Space，新增 {added} 个，累计 {len(sink.entries)}/{max_spaces}")
+
+
+def run_discover(args):
+    """发现模式：翻页抓取列表 -> 批量补全 spaceId -> 合并进输出文件"""
+    data = load_output(args.output)
+    list_url = args.list_url or data.get("base_list_url") or DISCOVER_LIST_URL
+    max_pages = args.max_pages or int(data.get("max_pages") or DISCOVER_MAX_PAGES)
+    max_spaces = args.max_spaces or int(data.get("max_spaces") or DISCOVER_MAX_SPACES)
+    print(f"[INFO] 发现模式：{list_url}，最多 {max_pages} 页 / {max_spaces} 个 Space")
+
+    sink = DiscoverySink(args.output + ".partial.jsonl")
+    try:
+        discover_spaces(list_url, max_pages, max_spaces, args.workers, sink)
+    finally:
+        sink.close()
+
+    # 列表页里没有 spaceId 的，用 GraphQL 批量补全
+    missing = [e["alias"] for e in sink.entries if e.get("space_id") is None]
+    resolved = resolve_aliases(missing, args.workers, html_fallback=False) if missing else {}
+
+    entries: Dict[str, Dict] = {}
+    for entry in data["spaces"]:
+        if entry.get("alias"):
+            entries.setdefault(entry["alias"].lower(), entry)
+    known_ids = {e["space_id"] for e in entries.values() if e.get("space_id") is not None}
+
+    verified_at = time.strftime(TIME_FORMAT, time.localtime())
+    added = 0
+    for entry in sink.entries:
+        info = resolved.get(entry["alias"])
+        if info:
+            entry.update(space_id=info["space_id"], alias=info["alias"], name=info.get("name") or entry["alias"])
+        if entry.get("space_id") is not None:
+            entry["verified_at"] = verified_at
+        if entry["alias"].lower() in entries or (entry.get("space_id") is not None and entry["space_id"] in known_ids):
+            continue
+        entries[entry["alias"].lower()] = entry
+        if entry.get("space_id") is not None:
+            known_ids.add(entry["space_id"])
+        added += 1
+
+    data.update(generated_at=verified_at, base_list_url=list_url, max_pages=max_pages, max_spaces=max_spaces)
+    data["spaces"] = list(entries.values())
+    write_json_atomic(args.output, data)
+    os.remove(sink.path)
+
+    print(f"[INFO] 发现结束，本次发现 {len(sink.entries)} 个 Space，新增 {added} 个，共 {len(data['spaces'])} 条记录。")
+    print(f"[INFO] 已将结果写入: {args.output}")
+
+
+def run_seeds(args):
+    """种子模式：解析 space_seeds.txt 中新增或缓存过期的 alias"""
+    aliases = load_seed_aliases(args.seeds)
     if not aliases:
         print("[ERROR] 别名列表为空，请先编辑 tools/space_seeds.txt 填入 Space。")
         return
 
-    results: List[Dict] = []
-
-    total = len(aliases)
-    for idx, alias in enumerate(aliases, start=1):
-        print(f"[INFO] [{idx}/{total}] 解析 Space: {alias}")
-        space_id = fetch_space_id_by_alias(alias)
-        result = {
-            "space_id": space_id,
-            "alias": alias,
-            "name": alias,
-            "tags": ["seed_list"],
-        }
-        results.append(result)
-        time.sleep(SPACE_PAGE_INTERVAL)
-
-    data = {
-        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
-        "source": "space_seeds.txt",
-        "spaces": results,
-    }
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    print(f"[INFO] 解析结束，共生成 {len(results)} 条记录。")
-    print(f"[INFO] 已将结果写入: {OUTPUT_FILE}")
+    # 已有输出即缓存：按小写 alias 索引，保留原有顺序和 name/tags 等字段
+    data = load_output(args.output)
+    entries: Dict[str, Dict] = {}
+    for entry in data["spaces"]:
+        if entry.get("alias"):
+            entries.setdefault(entry["alias"].lower(), entry)
+
+    now = time.time()
+    ttl_seconds = args.ttl_days * 86400
+    pending = [a for a in aliases if args.refresh or not is_fresh(entries.get(a.lower()), ttl_seconds, now)]
+    print(f"[INFO] {len(aliases) - len(pending)} 个 Space 命中缓存，{len(pending)} 个需要解析")
+
+    if pending:
+        print(f"[INFO] 开始解析 {len(pending)} 个 Space（{args.workers} 个线程，每个域名 {args.rate} 次/秒）")
+        resolved = resolve_aliases(pending, args.workers)
+    else:
+        resolved = {}
+
+    verified_at = time.strftime(TIME_FORMAT, time.localtime())
+    for alias in pending:
+        entry = entries.get(alias.lower())
+        if entry is None:
+            entry = entries[alias.lower()] = {
+                "space_id": None,
+                "alias": alias,
+                "name": alias,
+                "tags": ["seed_list"],
+            }
+        info = resolved.get(alias)
+        if info is not None:
+            entry["space_id"] = info["space_id"]
+            entry["verified_at"] = verified_at
+            if info.get("name") and entry.get("name") in (None, "", alias):
+                entry["name"] = info["name"]
+        # 解析失败时保留旧的 spaceId（如有），verified_at 不更新，下次继续重试
+
+    data["generated_at"] = verified_at
+    data["source"] = "space_seeds.txt"
+    data["spaces"] = list(entries.values())
+    write_json_atomic(args.output, data)
+
+    print(f"[INFO] 解析结束，新解析 {sum(1 for a in pending if resolved.get(a))} 个，"
+          f"共 {len(data['spaces'])} 条记录。")
+    print(f"[INFO] 已将结果写入: {args.output}")
+
+
+def main():
+    global rate_limiter
+
+    parser = argparse.ArgumentParser(description="Galxe Space 批量解析工具")
+    parser.add_argument("--seeds", default=SEED_FILE, help="种子列表文件")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="输出文件")
+    parser.add_argument("--workers", type=int, default=RESOLVE_WORKERS, help="并发线程数")
+    parser.add_argument("--rate", type=float, default=HOST_RATE_PER_SEC, help="同一域名每秒最多请求数")
+    parser.add_argument("--ttl-days", type=float, default=CACHE_TTL_DAYS, help="已解析结果的有效期（天）")
+    parser.add_argument("--refresh", action="store_true", help="忽略缓存，重新解析全部种子")
+    parser.add_argument("--discover", action="store_true", help="发现模式：翻页抓取列表页")
+    parser.add_argument("--list-url", default=None, help="列表页地址（默认取输出文件的 base_list_url）")
+    parser.add_argument("--max-pages", type=int, default=None, help="最多抓取的列表页数")
+    parser.add_argument("--max-spaces", type=int, default=None, help="最多发现的 Space 数")
+    args = parser.parse_args()
+
+    rate_limiter = HostRateLimiter(args.rate)
+    if args.discover:
+        run_discover(args)
+    else:
+        run_seeds(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+把 galxe_crawler.py 生成的 tools/spaces_bulk.json 合并到 config_files/config.json
+
+用法：
+    python src/merge_spaces_config.py [--input tools/spaces_bulk.json] [--category custom]
+                                      [--include-unresolved] [--dry-run]
+
+- 按 spaceId 和小写 alias 去重（哈希集合，单次遍历），已存在的项目只合并 tags、补全 space_id
+- 新项目带上 spaces_bulk.json 中的 tags
+- 边读边解析输入文件，内存里只保留当前的一个 Space，几十 MB 的列表也不会整体载入
+- 全部合并完成后只写一次配置文件（先写临时文件再替换）；读取到写回期间持有配置锁，
+  不会与 app.py 中同样修改配置的操作互相覆盖
+
+Web 端对应接口：POST /admin/merge_spaces?pwd=密码（可上传 file 或直接提交 JSON）
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, Iterable, Iterator
+
+from atomic_file import file_lock, write_json_atomic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "config_files", "config.json")
+BULK_FILE = os.path.join(ROOT, "tools", "spaces_bulk.json")
+
+# 流式解析时每次读取的字符数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_spaces(data) -> Iterator[Dict]:
+    """从 spaces_bulk.json 的内容（dict 或 spaces 列表）中逐个取出 Space"""
+    spaces = data.get("spaces", []) if isinstance(data, dict) else data
+    for space in spaces or []:
+        if isinstance(space, dict):
+            yield space
+
+
+class _JsonStream:
+    """在文本流上按需读取的 JSON 词法游标：缓冲区只保留尚未解析的部分"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（流结束时返回空串）"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"JSON 格式错误：期望 {chars!r}，实际 {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        """解析下一个完整的 JSON 值；缓冲区里不够时继续读取（数字必须看到后续字符才算完整）"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def stream_spaces(f, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    边读边解析 spaces_bulk.json（文本流），逐个产出 Space；
+    支持 {"spaces": [...], ...} 或直接是 [...] 两种格式，顶层其他字段跳过
+    """
+    stream = _JsonStream(f, chunk_size)
+    if stream.peek() == "{":
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if key == "spaces" and stream.peek() == "[":
+                break
+            stream.value()
+            if stream.expect(",}") == "}":
+                return
+        else:
+            return
+    stream.expect("[")
+    if stream.peek() == "]":
+        return
+    while True:
+        space = stream.value()
+        if isinstance(space, dict):
+            yield space
+        if stream.expect(",]") == "]":
+            return
+
+
+def merge_spaces(cfg: dict, spaces: Iterable[Dict], category: str = "custom",
+                 include_unresolved: bool = False) -> Dict[str, int]:
+    """
+    把 spaces 合并进 cfg["projects"]（原地修改），返回统计
+    {"added", "updated", "duplicate", "unresolved", "invalid"}
+
+    未解析出 spaceId 的 Space 默认跳过（include_unresolved=True 时照常导入）。
+    """
+    projects = cfg.setdefault("projects", [])
+    by_alias: Dict[str, dict] = {}
+    by_id: Dict[str, dict] = {}
+    for p in projects:
+        if p.get("alias"):
+            by_alias.setdefault(p["alias"].lower(), p)
+        if p.get("space_id") is not None:
+            by_id.setdefault(str(p["space_id"]), p)
+
+    stats = {"added": 0, "updated": 0, "duplicate": 0, "unresolved": 0, "invalid": 0}
+    for space in spaces:
+        alias = str(space.get("alias") or "").strip()
+        if not alias:
+            stats["invalid"] += 1
+            continue
+        sid = space.get("space_id")
+        if sid is None and not include_unresolved:
+            stats["unresolved"] += 1
+            continue
+        tags = [t for t in space.get("tags") or [] if t]
+
+        existing = by_alias.get(alias.lower()) or (by_id.get(str(sid)) if sid is not None else None)
+        if existing is not None:
+            changed = False
+            if sid is not None and existing.get("space_id") is None:
+                existing["space_id"] = sid
+                by_id[str(sid)] = existing
+                changed = True
+            new_tags = [t for t in tags if t not in (existing.get("tags") or [])]
+            if new_tags:
+                existing["tags"] = (existing.get("tags") or []) + new_tags
+                changed = True
+            stats["updated" if changed else "duplicate"] += 1
+            continue
+
+        project = {
+            "name": space.get("name") or alias,
+            "alias": alias,
+            "category": category,
+        }
+        if sid is not None:
+            project["space_id"] = sid
+            by_id[str(sid)] = project
+        if tags:
+            project["tags"] = tags
+        projects.append(project)
+        by_alias[alias.lower()] = project
+        stats["added"] += 1
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并 spaces_bulk.json 到 config.json")
+    parser.add_argument("--input", default=BULK_FILE, help="galxe_crawler.py 的输出文件")
+    parser.add_argument("--config", default=CONFIG_PATH, help="配置文件")
+    parser.add_argument("--category", default="custom", help="新项目的分类（custom 或 trending）")
+    parser.add_argument("--include-unresolved", action="store_true", help="也导入未解析出 spaceId 的 Space")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写配置文件")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.config):
+        print(f"[ERROR] 未找到配置文件: {args.config}（请先启动一次 app.py 生成默认配置）")
+        return
+    with file_lock(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        with open(args.input, "r", encoding="utf-8") as f:
+            stats = merge_spaces(cfg, stream_spaces(f), args.category, args.include_unresolved)
+        print(f"[INFO] 新增 {stats['added']} 个，更新 {stats['updated']} 个，重复 {stats['duplicate']} 个，"
+              f"未解析 {stats['unresolved']} 个，无效 {stats['invalid']} 个")
+
+        if args.dry_run:
+            print("[INFO] --dry-run：未写入配置文件")
+            return
+        if stats["added"] or stats["updated"]:
+            write_json_atomic(args.config, cfg)
+            print(f"[INFO] 已写入: {args.config}（共 {len(cfg['projects'])} 个项目）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NTX Quest Radar 生产环境 WSGI 入口（web 角色）
+
+监控循环由单独的 monitor 进程运行（带单实例锁），
+Web 工作进程只读取 monitor 进程发布的状态快照，可以任意开多个：
+
+    python3 src/app.py --role monitor
+    gunicorn -w 4 -b 0.0.0.0:5001 --chdir src wsgi:app
+"""
+
+import os
+
+os.environ.setdefault("NTX_ROLE", "web")
+
+from app import app, ensure_config  # noqa: E402
+
+ensure_config()
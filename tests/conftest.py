@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""pytest 公共配置：把 src/ 加入导入路径，并准备 app.py 导入时需要的 logs/ 目录"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.makedirs(os.path.join(ROOT, "logs"), exist_ok=True)
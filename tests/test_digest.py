@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""汇总消息拆分"""
+
+from app import TELEGRAM_MESSAGE_LIMIT, build_digest_messages
+
+
+def _event(i: int, name_len: int = 10) -> dict:
+    return {
+        "project_name": f"P{i:03d}" + "x" * name_len,
+        "latest": {"id": str(i), "name": f"活动{i}"},
+        "url": f"https://app.galxe.com/quest/p/{i}",
+    }
+
+
+def test_small_digest_is_one_message():
+    messages = build_digest_messages([_event(i) for i in range(3)])
+
+    assert len(messages) == 1
+    text, indexes = messages[0]
+    assert indexes == [0, 1, 2]
+    assert "共 3 个新活动" in text
+    assert "(1/" not in text
+
+
+def test_large_digest_is_split_under_the_limit_in_order():
+    events = [_event(i, name_len=300) for i in range(60)]
+    messages = build_digest_messages(events)
+
+    assert len(messages) > 1
+    assert all(len(text) <= TELEGRAM_MESSAGE_LIMIT for text, _ in messages)
+    assert [i for _, indexes in messages for i in indexes] == list(range(60))
+    for page, (text, indexes) in enumerate(messages, start=1):
+        assert f"({page}/{len(messages)})" in text
+        assert "共 60 个新活动" in text
+        assert all(f"P{i:03d}" in text for i in indexes)
+
+
+def test_custom_limit_and_oversized_entry():
+    events = [_event(0, name_len=500), _event(1)]
+    messages = build_digest_messages(events, limit=400)
+
+    # 单条超长的活动仍独占一条消息，不会产生空消息
+    assert [indexes for _, indexes in messages] == [[0], [1]]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""推送调度器：限流（429）与退避重试时保持每个目标的消息顺序"""
+
+import threading
+import time
+
+import pytest
+
+import app
+from app import NotificationDispatcher, TelegramRateLimiter
+
+
+@pytest.fixture
+def harness(monkeypatch):
+    """启动单线程调度器；deliver_job 按 script 中每条消息预设的结果依次返回"""
+    # 私聊 chat，放宽限速，只保留 429 暂停的效果
+    monkeypatch.setattr(app, "telegram_limiter", TelegramRateLimiter(per_bot=1000, per_private=1000))
+    calls, finished, dead = [], [], []
+    script = {}
+    done = threading.Condition()
+
+    def deliver(job):
+        calls.append((job["text"], job["token"]))
+        results = script.get(job["text"]) or []
+        return results.pop(0) if results else {"ok": True, "retry_after": None}
+
+    def delivered(job, result):
+        with done:
+            finished.append((job["text"], result["ok"]))
+            done.notify_all()
+
+    monkeypatch.setattr(app, "deliver_job", deliver)
+    monkeypatch.setattr(app, "on_job_delivered", delivered)
+    monkeypatch.setattr(app.dead_letters, "add", lambda job, error, attempts: dead.append((job["text"], attempts)))
+
+    dispatcher = NotificationDispatcher(workers=1)
+    dispatcher.retry_base_delay = 0.05
+    dispatcher.start()
+
+    def submit(chat_id, *texts, tokens=("1:a",)):
+        for text in texts:
+            dispatcher.submit({"channel": "telegram", "key": f"telegram:{chat_id}", "tokens": list(tokens),
+                               "token": tokens[0], "chat_id": chat_id, "text": text})
+
+    def wait(n):
+        with done:
+            assert done.wait_for(lambda: len(finished) >= n, timeout=5)
+        return finished
+
+    h = type("Harness", (), {})()
+    h.dispatcher, h.script, h.calls, h.dead = dispatcher, script, calls, dead
+    h.submit, h.wait = submit, wait
+    return h
+
+
+def _throttled(retry_after):
+    return {"ok": False, "retry_after": retry_after, "retryable": True, "error": "429"}
+
+
+def _failed():
+    return {"ok": False, "retry_after": None, "retryable": True, "error": "timeout"}
+
+
+def test_throttled_and_retried_head_keeps_target_order(harness):
+    harness.script["a1"] = [_throttled(0.2), _failed()]
+    harness.script["a2"] = [_failed()]
+    harness.submit("1", "a1", "a2", "a3")
+
+    assert harness.wait(3) == [("a1", True), ("a2", True), ("a3", True)]
+    assert [text for text, _ in harness.calls] == ["a1", "a1", "a1", "a2", "a2", "a3"]
+    assert harness.dispatcher.throttled == 1 and harness.dispatcher.retried == 2
+
+
+def test_throttled_target_does_not_block_other_targets(harness):
+    harness.script["a1"] = [_throttled(0.5)]
+    harness.submit("1", "a1", "a2")
+    harness.submit("2", "b1")
+
+    finished = harness.wait(3)
+    assert finished[0] == ("b1", True)
+    assert [text for text, _ in finished[1:]] == ["a1", "a2"]
+
+
+def test_throttled_bot_is_replaced_from_pool_immediately(harness):
+    harness.script["a1"] = [_throttled(30)]
+    started = time.monotonic()
+    harness.submit("1", "a1", "a2", tokens=("1:a", "2:b"))
+
+    assert harness.wait(2) == [("a1", True), ("a2", True)]
+    assert time.monotonic() - started < 5
+    assert harness.calls[:2] == [("a1", "1:a"), ("a1", "2:b")]
+    assert harness.calls[2] == ("a2", "2:b")
+
+
+def test_exhausted_retries_dead_letter_and_release_next_job(harness):
+    harness.dispatcher.max_attempts = 2
+    harness.script["a1"] = [_failed(), _failed()]
+    harness.submit("1", "a1", "a2")
+
+    assert harness.wait(2) == [("a1", False), ("a2", True)]
+    assert harness.dead == [("a1", 2)]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Space 解析工具"""
+
+import re
+
+import pytest
+
+import galxe_crawler
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class _Session:
+    def __init__(self, body):
+        self.body = body
+
+    def post(self, url, json=None, timeout=None):
+        return _Response(self.body)
+
+
+@pytest.fixture
+def graphql(monkeypatch):
+    """把 GraphQL 响应替换为给定的 body"""
+    monkeypatch.setattr(galxe_crawler.rate_limiter, "wait", lambda url: None)
+
+    def respond(body):
+        monkeypatch.setattr(galxe_crawler, "http_session", lambda: _Session(body))
+    return respond
+
+
+def test_fetch_space_ids_graphql_maps_fields(graphql):
+    graphql({"data": {"s0": {"id": "12", "alias": "BNBChain", "name": "BNB"}, "s1": None}})
+
+    assert galxe_crawler.fetch_space_ids_graphql(["bnbchain", "missing"]) == {
+        "bnbchain": {"space_id": 12, "alias": "BNBChain", "name": "BNB"},
+        "missing": None,
+    }
+
+
+@pytest.mark.parametrize("body", [
+    {"errors": [{"message": "bad alias"}], "data": None},
+    {"errors": [{"message": "rejected"}]},
+    {},
+])
+def test_fetch_space_ids_graphql_raises_without_data(graphql, body):
+    graphql(body)
+
+    with pytest.raises(RuntimeError):
+        galxe_crawler.fetch_space_ids_graphql(["bnbchain", "Galxe"])
+
+
+def test_resolve_aliases_leaves_rejected_batch_unresolved(graphql):
+    graphql({"errors": [{"message": "rejected"}], "data": None})
+
+    # Web 端不回退 HTML：查询失败的 alias 不出现在结果中（不会被当作不存在而跳过）
+    assert galxe_crawler.resolve_aliases(["bnbchain", "Galxe"], workers=1, html_fallback=False,
+                                         show_progress=False) == {}
+
+
+def _split(text, *cuts):
+    bounds = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("cut", range(1, 24))
+def test_scan_stream_finds_field_split_across_chunks(cut):
+    text = 'xx "spaceId": 12345, yy'
+
+    assert galxe_crawler.scan_stream(_split(text, cut), [galxe_crawler.SPACE_ID_RE], 64) == (0, 12345)
+
+
+def test_scan_stream_waits_for_digits_cut_at_chunk_end():
+    # 第一块末尾的 "12" 可能被截断，要等下一块确认完整数字
+    chunks = _split('"spaceId": 123456}', 13, 16)
+
+    assert galxe_crawler.scan_stream(chunks, [galxe_crawler.SPACE_ID_RE], 64) == (0, 123456)
+    # 流结束时匹配紧贴末尾也算数
+    assert galxe_crawler.scan_stream(['"spaceId": 7'], [galxe_crawler.SPACE_ID_RE], 64) == (0, 7)
+
+
+def test_scan_stream_stops_at_first_match_and_prefers_pattern_order():
+    pages = iter(['"spaceId": 1, "spaceId": 2,', "never read"])
+    patterns = [re.compile(r'"id"\s*:\s*(\d+)'), galxe_crawler.SPACE_ID_RE]
+
+    assert galxe_crawler.scan_stream(pages, patterns, 64) == (1, 1)
+    assert next(pages) == "never read"
+    assert galxe_crawler.scan_stream(['"spaceId": 1, "id": 9,'], patterns, 64) == (0, 9)
+
+
+def test_scan_stream_returns_none_without_match():
+    assert galxe_crawler.scan_stream(["<html>", "</html>"], [galxe_crawler.SPACE_ID_RE], 64) is None
+    assert galxe_crawler.scan_stream([], [galxe_crawler.SPACE_ID_RE], 64) is None
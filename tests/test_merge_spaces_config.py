@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""spaces_bulk.json 流式解析与合并"""
+
+import io
+import json
+
+import pytest
+
+from merge_spaces_config import merge_spaces, stream_spaces
+
+SPACES = [{"alias": f"a{i}", "space_id": i, "tags": ["t"], "name": "名称" * 3} for i in range(50)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+def test_stream_spaces_across_chunk_boundaries(chunk_size):
+    text = json.dumps({"generated_at": "2024", "max_pages": 12345, "nested": {"spaces": [1]},
+                       "spaces": SPACES + [7, None], "tail": [1, 2]}, ensure_ascii=False, indent=2)
+
+    assert list(stream_spaces(io.StringIO(text), chunk_size)) == SPACES
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('[{"alias": "x"}]', [{"alias": "x"}]),
+    ('{"spaces": []}', []),
+    ('{"generated_at": "x"}', []),
+    ("[]", []),
+    ('{"spaces": null, "other": 1}', []),
+])
+def test_stream_spaces_formats(text, expected):
+    assert list(stream_spaces(io.StringIO(text), 3)) == expected
+
+
+@pytest.mark.parametrize("text", ['{"spaces": [{"alias": "x"},', '{"spaces": [{"alias"', '{"spaces" 1}'])
+def test_stream_spaces_rejects_truncated_input(text):
+    with pytest.raises(ValueError):
+        list(stream_spaces(io.StringIO(text), 4))
+
+
+def test_merge_spaces_dedups_and_merges_tags():
+    cfg = {"projects": [
+        {"name": "A", "alias": "Alpha", "category": "custom", "tags": ["old"]},
+        {"name": "B", "alias": "beta", "space_id": 2, "category": "trending"},
+    ]}
+    spaces = [
+        {"alias": "alpha", "space_id": 1, "tags": ["old", "new"]},  # 大小写不同：补全 id、合并 tags
+        {"alias": "beta-renamed", "space_id": 2},  # 同一 spaceId：重复
+        {"alias": "gamma", "space_id": 3, "tags": ["g"], "name": "Gamma"},
+        {"alias": "GAMMA", "space_id": 3},  # 本次输入内部重复
+        {"alias": "delta"},  # 未解析
+        {"alias": "  "},
+    ]
+    stats = merge_spaces(cfg, spaces, category="custom")
+
+    assert stats == {"added": 1, "updated": 1, "duplicate": 2, "unresolved": 1, "invalid": 1}
+    assert cfg["projects"][0] == {"name": "A", "alias": "Alpha", "category": "custom",
+                                  "tags": ["old", "new"], "space_id": 1}
+    assert cfg["projects"][2] == {"name": "Gamma", "alias": "gamma", "category": "custom",
+                                  "space_id": 3, "tags": ["g"]}
+
+
+def test_merge_spaces_include_unresolved():
+    cfg = {}
+    stats = merge_spaces(cfg, [{"alias": "delta"}], category="trending", include_unresolved=True)
+
+    assert stats["added"] == 1
+    assert cfg["projects"] == [{"name": "delta", "alias": "delta", "category": "trending"}]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""推送目标编译为路由表"""
+
+from app import compile_notify_routes, get_notify_routes
+
+
+def _tg(name, chat_id, token="1:a", projects=None, **extra):
+    return {"name": name, "bot_token": token, "chat_id": chat_id, "projects": projects or [], **extra}
+
+
+def test_routes_match_by_alias_case_insensitively():
+    routes = compile_notify_routes({"notify_targets": [
+        _tg("all", "-1"),
+        _tg("alpha", "-2", projects=["Alpha"]),
+        _tg("beta", "-3", projects=["beta"]),
+    ]})
+
+    assert [r["name"] for r in routes.match("telegram", "ALPHA")] == ["all", "alpha"]
+    assert [r["name"] for r in routes.match("telegram", "gamma")] == ["all"]
+    assert [r["name"] for r in routes.match("telegram", None)] == ["all", "alpha", "beta"]
+    assert routes.match("discord", "alpha") == []
+
+
+def test_same_chat_is_merged_with_project_union_and_bot_pool():
+    routes = compile_notify_routes({"notify_targets": [
+        _tg("a", "-1", token="1:a", projects=["alpha"], digest_window=0),
+        _tg("b", -1, token="2:b", projects=["Beta"], digest_window=60),
+        _tg("c", "-1", token="1:a", projects=["alpha"]),
+    ]})
+
+    assert len(routes.all["telegram"]) == 1
+    route = routes.all["telegram"][0]
+    assert route["projects"] == {"alpha", "beta"}
+    assert route["bot_tokens"] == ["1:a", "2:b"]
+    assert route["digest_window"] == 60
+    assert routes.match("telegram", "beta") == [route]
+    assert routes.match("telegram", "gamma") == []
+
+
+def test_unfiltered_duplicate_makes_route_wildcard():
+    routes = compile_notify_routes({"notify_targets": [
+        _tg("filtered", "-1", projects=["alpha"]),
+        _tg("everything", "-1"),
+        _tg("filtered again", "-1", projects=["beta"]),
+    ]})
+
+    route = routes.all["telegram"][0]
+    assert route["projects"] is None
+    assert routes.match("telegram", "anything") == [route]
+
+
+def test_disabled_targets_pools_and_reminders():
+    routes = compile_notify_routes({
+        "reminders": {"start": [60]},
+        "notify_targets": [
+            _tg("off", "-9", enabled=False),
+            {"name": "pool", "bot_tokens": ["2:b", "1:a"], "bot_token": "1:a", "chat_id": "-1",
+             "reminders": {"end": [30, "x"]}},
+            _tg("default reminders", "-2"),
+            {"type": "discord", "name": "d", "webhook_url": "https://discord/w"},
+            {"type": "webhook", "name": "w", "url": "https://hook", "batch_size": -3},
+        ],
+    })
+
+    telegram = {r["name"]: r for r in routes.all["telegram"]}
+    assert set(telegram) == {"pool", "default reminders"}
+    assert telegram["pool"]["bot_tokens"] == ["1:a", "2:b"]
+    assert telegram["pool"]["reminders"] == [("end", 1800)]
+    assert telegram["default reminders"]["reminders"] == [("start", 3600)]
+    assert routes.all["discord"][0]["reminders"] == [("start", 3600)]
+    assert routes.all["webhook"][0]["batch_size"] == 1
+    assert routes.all["webhook"][0]["reminders"] == []
+
+
+def test_legacy_single_target_config():
+    routes = compile_notify_routes({"telegram_bot_token": "1:a", "telegram_chat_id": "5",
+                                    "discord_webhook_url": "https://discord/w"})
+
+    assert [r["chat_id"] for r in routes.all["telegram"]] == ["5"]
+    assert [r["webhook_url"] for r in routes.all["discord"]] == ["https://discord/w"]
+
+
+def test_routes_are_compiled_once_per_config_object():
+    cfg = {"notify_targets": [_tg("a", "-1")]}
+
+    assert get_notify_routes(cfg) is get_notify_routes(cfg)
+    assert get_notify_routes(dict(cfg)) is not get_notify_routes(cfg)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""轮询计划编译与批量查询构建"""
+
+from datetime import datetime, timezone
+
+import app
+from app import build_latest_batch_query, compile_poll_plan, fetch_latest_batch
+
+NOW = 1_700_000_000.0
+DAY = 24 * 3600
+
+
+def _starts_in(seconds: float) -> dict:
+    start = datetime.fromtimestamp(NOW + seconds, tz=timezone.utc)
+    return {"id": "c", "startTime": start.isoformat()}
+
+
+def test_compile_poll_plan_dedups_by_space_id_and_alias():
+    projects = [
+        {"name": "A", "alias": "Alpha", "space_id": 1},
+        {"name": "A2", "alias": "alpha"},
+        {"name": "A3", "alias": "renamed", "space_id": "1"},
+        {"name": "B", "alias": "beta"},
+        {"name": "B2", "alias": "BETA", "space_id": 2},
+        {"name": "none", "alias": "  "},
+    ]
+    plan = compile_poll_plan(projects, {}, set(), DAY, now=NOW)
+
+    assert [(t.alias, t.space_id) for t in plan] == [("Alpha", 1), ("beta", 2)]
+    assert [p["name"] for p in plan[0].projects] == ["A", "A2", "A3"]
+    assert [p["name"] for p in plan[1].projects] == ["B", "B2"]
+
+
+def test_compile_poll_plan_orders_imminent_then_hot_then_config_order():
+    projects = [
+        {"alias": "plain1", "space_id": 1},
+        {"alias": "hot", "space_id": 2},
+        {"alias": "later", "space_id": 3},
+        {"alias": "soon", "space_id": 4},
+        {"alias": "trend", "space_id": 5, "category": "trending"},
+        {"alias": "far", "space_id": 6},
+        {"alias": "plain2"},
+    ]
+    previous = {
+        3: _starts_in(3600 * 5),
+        4: _starts_in(3600),
+        6: _starts_in(DAY * 3),
+    }
+    plan = compile_poll_plan(projects, previous, {2}, DAY, now=NOW)
+
+    assert [t.alias for t in plan] == ["soon", "later", "hot", "trend", "plain1", "far", "plain2"]
+
+
+def test_build_latest_batch_query_aliases_each_space():
+    query, variables = build_latest_batch_query([(7, "a", False), (None, "b", True)])
+
+    assert variables == {"v0": 7, "v1": "b"}
+    assert query.startswith("query LatestBatch($v0:Int!,$v1:String!){")
+    assert "s0: space(id:$v0){" in query
+    assert "s1: space(alias:$v1){" in query
+
+    # 只有 with_meta 的 Space 带上 id/name/alias 元信息字段
+    s0, s1 = query[query.index("s0:"):query.index("s1:")], query[query.index("s1:"):]
+    assert "campaigns" in s0 and "campaigns" in s1
+    assert "name" not in s0.split("campaigns")[0]
+    assert "name" in s1.split("campaigns")[0]
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def _fallback(monkeypatch):
+    calls = []
+
+    def fetch_latest(alias, space_id=None):
+        calls.append((alias, space_id))
+        return {"space": {"id": space_id, "alias": alias}, "latest": None}
+    monkeypatch.setattr(app, "fetch_latest", fetch_latest)
+    return calls
+
+
+def test_fetch_latest_batch_maps_fields_in_order(monkeypatch):
+    body = {"data": {"s0": {"campaigns": {"list": [{"id": "c1"}, {"id": "c0"}]}}, "s1": {"campaigns": {"list": []}}}}
+    monkeypatch.setattr(app.requests, "post", lambda *a, **k: _Response(body))
+
+    assert fetch_latest_batch([(1, "a", False), (None, "b", True)]) == [
+        {"space": body["data"]["s0"], "latest": {"id": "c1"}},
+        {"space": body["data"]["s1"], "latest": None},
+    ]
+
+
+def test_fetch_latest_batch_falls_back_per_space_when_request_fails(monkeypatch):
+    calls = _fallback(monkeypatch)
+
+    def post(*args, **kwargs):
+        raise ConnectionError("down")
+    monkeypatch.setattr(app.requests, "post", post)
+
+    results = fetch_latest_batch([(1, "a", False), (None, "b", True)])
+    assert calls == [("a", 1), ("b", None)]
+    assert [r["space"]["alias"] for r in results] == ["a", "b"]
+
+
+def test_fetch_latest_batch_falls_back_when_response_has_no_data(monkeypatch):
+    calls = _fallback(monkeypatch)
+    monkeypatch.setattr(app.requests, "post", lambda *a, **k: _Response({"errors": [{"message": "x"}], "data": None}))
+
+    fetch_latest_batch([(1, "a", False)])
+    assert calls == [("a", 1)]
+
+
+def test_fetch_latest_batch_retries_stale_id_by_alias(monkeypatch):
+    queried = []
+
+    def query_latest(query, variables, label):
+        queried.append(variables)
+        return {"space": {"alias": "a"}, "latest": None}
+    monkeypatch.setattr(app, "query_latest", query_latest)
+    monkeypatch.setattr(app.requests, "post", lambda *a, **k: _Response({"data": {"s0": None, "s1": None}}))
+
+    assert fetch_latest_batch([(1, "a", False), (None, "gone", True)])[1] is None
+    assert queried == [{"alias": "a"}]
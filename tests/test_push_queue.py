@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""持久化推送队列"""
+
+from app import DurableQueue
+
+
+def test_durable_queue_redelivers_unacked_after_reopen(tmp_path):
+    q = DurableQueue(str(tmp_path))
+    for i in range(3):
+        q.put({"n": i})
+
+    pos0, item0 = q.get(timeout=0)
+    pos1, item1 = q.get(timeout=0)
+    assert (item0, item1) == ({"n": 0}, {"n": 1})
+    q.ack(pos0)
+
+    # 第二条取出但未 ack：重启后从它开始重新投递
+    q = DurableQueue(str(tmp_path))
+    assert q.pending == 2
+    assert [q.get(timeout=0)[1] for _ in range(2)] == [{"n": 1}, {"n": 2}]
+    assert q.get(timeout=0) is None
+
+
+def test_durable_queue_out_of_order_ack_commits_prefix_only(tmp_path):
+    q = DurableQueue(str(tmp_path))
+    for i in range(3):
+        q.put({"n": i})
+    positions = [q.get(timeout=0)[0] for _ in range(3)]
+
+    q.ack(positions[1])
+    q.ack(positions[2])
+    assert q.stats()["unacked"] == 3
+    assert DurableQueue(str(tmp_path)).get(timeout=0)[1] == {"n": 0}
+
+    q.ack(positions[0])
+    assert q.stats()["unacked"] == 0
+    reopened = DurableQueue(str(tmp_path))
+    assert reopened.pending == 0
+    assert reopened.get(timeout=0) is None
+
+
+def test_durable_queue_compacts_acked_segments(tmp_path):
+    q = DurableQueue(str(tmp_path), segment_bytes=32)
+    for i in range(6):
+        q.put({"n": i, "pad": "x" * 16})
+    assert q.stats()["segments"] > 1
+
+    for _ in range(6):
+        pos, _ = q.get(timeout=0)
+        q.ack(pos)
+    assert q.stats()["segments"] == 1
+    assert DurableQueue(str(tmp_path), segment_bytes=32).pending == 0
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Telegram 发送限速"""
+
+import pytest
+
+import app
+from app import TelegramRateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=2, capacity=3)
+    bucket.updated = 0.0
+    bucket.tokens = 0
+
+    assert bucket.wait_time(0.0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.5) == 0.0
+    bucket.wait_time(100.0)
+    assert bucket.tokens == 3
+
+
+def test_token_bucket_block_honours_retry_after():
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.updated = 0.0
+
+    bucket.block(0.0, 5)
+    assert bucket.wait_time(1.0) == pytest.approx(4.0)
+    assert bucket.wait_time(5.0) == 0.0
+    assert bucket.tokens <= 10
+
+
+def test_group_chat_limit(clock):
+    limiter = TelegramRateLimiter(per_bot=30, per_group_per_min=2, per_private=1)
+
+    assert limiter.reserve(["1:a"], "-100") == (0.0, "1:a")
+    assert limiter.reserve(["1:a"], "-100") == (0.0, "1:a")
+    wait, token = limiter.reserve(["1:a"], "-100")
+    assert token is None
+    assert wait == pytest.approx(30.0)  # 2 条/分钟
+
+    clock[0] += 30
+    assert limiter.reserve(["1:a"], "-100") == (0.0, "1:a")
+
+
+def test_private_chat_limit_and_penalize(clock):
+    limiter = TelegramRateLimiter(per_private=1)
+
+    assert limiter.reserve(["1:a"], "42")[1] == "1:a"
+    assert limiter.reserve(["1:a"], "42")[1] is None
+
+    clock[0] += 1
+    limiter.penalize("1:a", "42", 10)
+    wait, token = limiter.reserve(["1:a"], "42")
+    assert token is None and wait == pytest.approx(10.0)
+    clock[0] += 10
+    assert limiter.reserve(["1:a"], "42")[1] == "1:a"
+
+
+def test_bot_pool_picks_bot_with_most_budget(clock):
+    limiter = TelegramRateLimiter(per_bot=30, per_group_per_min=3)
+    pool = ["1:a", "2:b"]
+
+    # 1:a 已向该群发送过一条，剩余额度少于 2:b
+    assert limiter.reserve(["1:a"], "-100")[1] == "1:a"
+    assert limiter.reserve(pool, "-100")[1] == "2:b"
+    picks = [limiter.reserve(pool, "-100")[1] for _ in range(4)]
+    assert sorted(picks) == ["1:a", "1:a", "2:b", "2:b"]
+
+    wait, token = limiter.reserve(pool, "-100")
+    assert token is None and wait > 0
+
+
+def test_bot_pool_skips_rate_limited_and_disabled_bots(clock):
+    limiter = TelegramRateLimiter()
+    pool = ["1:a", "2:b"]
+
+    limiter.penalize("1:a", "-100", 30)
+    assert [limiter.reserve(pool, "-100")[1] for _ in range(3)] == ["2:b"] * 3
+
+    limiter.disable("2:b", "-100")
+    wait, token = limiter.reserve(pool, "-100")
+    assert token is None and wait == pytest.approx(30.0)
+
+    # 全部 Bot 被封禁
+    limiter.disable("1:a", "-100")
+    assert limiter.reserve(pool, "-100") == (None, None)
+
+    clock[0] += TelegramRateLimiter.BOT_DISABLE_SECONDS + 1
+    assert limiter.reserve(pool, "-100")[1] is not None
+
+
+def test_stats_expose_bot_ids_only(clock):
+    limiter = TelegramRateLimiter()
+    limiter.reserve(["123:SECRET"], "-1")
+
+    stats = limiter.stats()
+    assert list(stats) == ["123"]
+    assert "SECRET" not in str(stats)
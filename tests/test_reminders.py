@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""活动提醒调度：排期、持久化恢复、到期时的重新排期 / 跳过"""
+
+import json
+
+import app
+from app import ReminderScheduler, compile_notify_routes
+
+
+NOW = 1_700_000_000
+
+
+def _cfg(reminders):
+    return {"notify_targets": [
+        {"name": "tg", "bot_token": "1:a", "chat_id": "-1", "reminders": reminders},
+    ]}
+
+
+def _event(start, end, cid="c1"):
+    return {
+        "project_name": "Alpha",
+        "alias": "alpha",
+        "url": None,
+        "latest": {"id": cid, "name": "Quest", "startTime": start, "endTime": end},
+    }
+
+
+def _setup(monkeypatch, tmp_path, reminders, projects=()):
+    cfg = _cfg(reminders)
+    monkeypatch.setattr(app.time, "time", lambda: NOW)
+    monkeypatch.setattr(app, "load_config_cached", lambda: cfg)
+    monkeypatch.setitem(app.monitor_state, "projects", list(projects))
+    sent = []
+    monkeypatch.setattr(app, "dispatch_telegram", lambda tokens, chat_id, text, name: sent.append((chat_id, text)))
+    scheduler = ReminderScheduler(str(tmp_path / "reminders.json"))
+    return scheduler, compile_notify_routes(cfg).all["telegram"], sent
+
+
+def test_schedule_skips_past_deadlines_and_duplicates(monkeypatch, tmp_path):
+    scheduler, routes, _ = _setup(monkeypatch, tmp_path, {"start": [60], "end": [60]})
+    # 开始前 60 分钟已过，只排期结束前提醒
+    event = _event(NOW + 1800, NOW + 7200)
+
+    assert scheduler.schedule(routes, event) == 1
+    assert scheduler.schedule(routes, event) == 0
+    assert [(due, e["kind"]) for due, _, e in scheduler._heap] == [(NOW + 3600, "end")]
+    assert scheduler.schedule(routes, _event(NOW + 7200, NOW + 9000, cid=None)) == 0
+
+
+def test_load_restores_queue_and_rekeys_legacy_targets(monkeypatch, tmp_path):
+    scheduler, routes, _ = _setup(monkeypatch, tmp_path, {"start": [30]})
+    scheduler.schedule(routes, _event(NOW + 7200, NOW + 9000))
+
+    restored = ReminderScheduler(scheduler.path)
+    restored.load()
+    assert restored.stats()["pending"] == 1
+    assert restored._heap[0][2]["target"] == "telegram:-1"
+
+    # 旧版文件记录的是原始 chat_id
+    with open(scheduler.path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    entries[0]["target"] = "-1"
+    with open(scheduler.path, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    legacy = ReminderScheduler(scheduler.path)
+    legacy.load()
+    assert legacy._heap[0][2]["target"] == "telegram:-1"
+    with open(scheduler.path, "r", encoding="utf-8") as f:
+        assert json.load(f)[0]["target"] == "telegram:-1"
+
+
+def test_fire_sends_when_due(monkeypatch, tmp_path):
+    scheduler, routes, sent = _setup(monkeypatch, tmp_path, {"start": [30]})
+    scheduler.schedule(routes, _event(NOW + 3600, NOW + 9000))
+    monkeypatch.setattr(app.time, "time", lambda: NOW + 1800)
+
+    scheduler._fire(scheduler._heap[0][2])
+    assert scheduler.fired == 1
+    assert len(sent) == 1 and sent[0][0] == "-1"
+    assert "活动将在" in sent[0][1] and "Quest" in sent[0][1]
+
+
+def test_fire_reschedules_when_campaign_moved(monkeypatch, tmp_path):
+    scheduler, routes, sent = _setup(monkeypatch, tmp_path, {"start": [30]})
+    scheduler.schedule(routes, _event(NOW + 3600, NOW + 9000))
+    entry = scheduler._heap.pop()[2]
+    scheduler._keys.clear()
+    monkeypatch.setattr(app.time, "time", lambda: NOW + 1800)
+
+    # 最新监控数据显示活动推迟了 1 小时
+    moved = _event(NOW + 7200, NOW + 9000)
+    monkeypatch.setitem(app.monitor_state, "projects", [{"alias": "alpha", "latest": moved["latest"]}])
+    scheduler._fire(entry)
+
+    assert sent == []
+    assert scheduler.fired == 0 and scheduler.skipped == 0
+    assert [due for due, _, _ in scheduler._heap] == [NOW + 5400]
+
+
+def test_fire_skips_missed_or_unconfigured_reminders(monkeypatch, tmp_path):
+    scheduler, routes, sent = _setup(monkeypatch, tmp_path, {"start": [30], "end": [30]})
+    scheduler.schedule(routes, _event(NOW + 3600, NOW + 3600))
+    entries = {e["kind"]: e for _, _, e in scheduler._heap}
+    monkeypatch.setattr(app.time, "time", lambda: NOW + 1800)
+
+    # 活动已提前开始（如停机期间错过）
+    started = _event(NOW - 60, NOW + 3600)
+    monkeypatch.setitem(app.monitor_state, "projects", [{"alias": "alpha", "latest": started["latest"]}])
+    scheduler._fire(entries["start"])
+    assert scheduler.skipped == 1
+
+    # 目标不再配置结束前提醒
+    monkeypatch.setattr(app, "load_config_cached", lambda: _cfg({"start": [30]}))
+    scheduler._fire(entries["end"])
+    assert scheduler.skipped == 2
+    assert sent == []
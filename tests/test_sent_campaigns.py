@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""推送去重表与汇总消息的去重结算"""
+
+import threading
+
+import app
+from app import DigestBuffer, SentCampaigns, build_digest_messages
+
+
+def test_reserve_blocks_duplicates_until_settled(tmp_path):
+    sent = SentCampaigns(str(tmp_path / "sent.jsonl"))
+
+    key = sent.reserve("telegram:1", "c1")
+    assert key == "telegram:1|c1"
+    assert sent.reserve("telegram:1", "c1") is None  # 正在推送
+    assert sent.reserve("telegram:2", "c1") is not None  # 其他目标不受影响
+
+    sent.settle([key], True)
+    assert sent.reserve("telegram:1", "c1") is None
+    assert sent.count() == 1
+
+
+def test_failed_settle_releases_reservation(tmp_path):
+    sent = SentCampaigns(str(tmp_path / "sent.jsonl"))
+
+    sent.settle([sent.reserve("telegram:1", "c1")], False)
+    assert sent.count() == 0
+    assert sent.reserve("telegram:1", "c1") == "telegram:1|c1"
+
+
+def test_sent_entries_survive_restart_but_pending_ones_do_not(tmp_path):
+    path = str(tmp_path / "sent.jsonl")
+    sent = SentCampaigns(path)
+    sent.settle([sent.reserve("t", "done")], True)
+    sent.reserve("t", "pending")
+
+    reopened = SentCampaigns(path)
+    assert reopened.reserve("t", "done") is None
+    assert reopened.reserve("t", "pending") == "t|pending"
+
+
+def test_eviction_by_size_and_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "time", lambda: now[0])
+    sent = SentCampaigns(str(tmp_path / "sent.jsonl"), max_entries=2, ttl=100)
+    for cid in ("a", "b", "c"):
+        sent.settle([sent.reserve("t", cid)], True)
+    assert sent.count() == 2
+    assert sent.reserve("t", "a") == "t|a"  # 最旧的被淘汰
+
+    now[0] += 150
+    assert sent.reserve("t", "c") == "t|c"  # 超过 ttl
+
+
+def test_log_is_compacted(tmp_path):
+    path = tmp_path / "sent.jsonl"
+    sent = SentCampaigns(str(path), max_entries=10)
+    for i in range(2100):
+        sent.settle([sent.reserve("t", f"c{i}")], True)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) < 2100
+    reopened = SentCampaigns(str(path), max_entries=10)
+    assert reopened.count() == 10
+    assert reopened.reserve("t", "c2099") is None
+
+
+def _event(i: int, name_len: int = 1500) -> dict:
+    return {"project_name": f"P{i}" + "x" * name_len, "latest": {"name": f"活动{i}"}, "url": f"https://x/{i}"}
+
+
+def test_build_digest_messages_reports_events_per_message():
+    events = [_event(i) for i in range(5)]
+    messages = build_digest_messages(events)
+
+    assert len(messages) > 1
+    assert [i for _, indexes in messages for i in indexes] == list(range(5))
+    for text, indexes in messages:
+        assert all(f"P{i}" in text for i in indexes)
+
+
+def test_digest_settles_each_page_with_its_own_dedup_keys(monkeypatch):
+    calls = []
+    done = threading.Event()
+
+    def dispatch(tokens, chat_id, text, label=None, event=None, dedup=None, tickets=None):
+        calls.append(dedup)
+        if len(calls) == len(build_digest_messages([_event(i) for i in range(5)])):
+            done.set()
+        return True
+
+    monkeypatch.setattr(app, "dispatch_telegram", dispatch)
+    digest = DigestBuffer()
+    for i in range(5):
+        digest.add(["token"], "chat", "群", 0, _event(i), dedup=f"k{i}" if i != 2 else None)
+    digest.start()
+
+    assert done.wait(5)
+    assert sorted(k for page in calls for k in page) == ["k0", "k1", "k3", "k4"]
+    assert all(len(page) < 4 for page in calls)
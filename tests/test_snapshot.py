@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""监控快照写入 / mmap 读取"""
+
+import os
+
+from app import SNAPSHOT_HEADER, SnapshotReader, write_snapshot
+
+STATE = {
+    "last_loop": "2024-01-01T00:00:00Z",
+    "projects": [
+        {"name": "Alpha", "alias": "alpha", "category": "custom", "latest": None},
+        {"name": "Beta", "alias": "beta", "category": "trending", "latest": {"id": "1", "name": "活动"}},
+    ],
+}
+
+
+def _replace(path: str, data: bytes):
+    """与 write_snapshot 一样原子替换，避免截断仍被映射的文件"""
+    with open(path + ".new", "wb") as f:
+        f.write(data)
+    os.replace(path + ".new", path)
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, STATE)
+    reader = SnapshotReader(path)
+
+    assert reader.to_state() == STATE
+    assert [p["name"] for p in reader.select(q="bet")] == ["Beta"]
+    assert [p["name"] for p in reader.select(cat="custom")] == ["Alpha"]
+
+
+def test_snapshot_reader_keeps_previous_view_for_truncated_file(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, STATE)
+    reader = SnapshotReader(path)
+    assert reader.to_state() == STATE
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for size in (0, 10, SNAPSHOT_HEADER.size, SNAPSHOT_HEADER.size + 5, len(data) - 1):
+        _replace(path, data[:size])
+        assert reader.to_state() == STATE, size
+
+
+def test_snapshot_reader_without_valid_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    assert not SnapshotReader(path).available()
+
+    _replace(path, b"NTXS")
+    reader = SnapshotReader(path)
+    assert not reader.available()
+    assert reader.select() == []
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Space 元信息缓存"""
+
+import app
+from app import SpaceMetaCache, compile_poll_plan, fetch_poll_plan
+
+DAY = 24 * 3600
+
+
+def test_due_store_and_expiry(tmp_path):
+    cache = SpaceMetaCache(str(tmp_path / "meta.json"), ttl=100)
+    assert cache.due(7, now=1000)
+
+    cache.store({"id": "7", "name": "Seven", "alias": "seven"}, now=1000)
+    assert not cache.due(7, now=1050)
+    assert cache.due(7, now=1200)  # ttl ±10% 抖动
+
+    cache.store({"campaigns": {}}, now=1000)  # 只有 campaigns 的结果不记录
+    assert cache.get(7) == {"name": "Seven", "alias": "seven", "expires": cache.get(7)["expires"]}
+
+
+def test_save_load_and_retain(tmp_path):
+    path = str(tmp_path / "meta.json")
+    cache = SpaceMetaCache(path)
+    cache.store({"id": 1, "name": "A", "alias": "a"})
+    cache.store({"id": 2, "name": "B", "alias": "b"})
+    cache.retain({1})
+    cache.save()
+
+    loaded = SpaceMetaCache(path)
+    loaded.load()
+    assert loaded.get(1)["alias"] == "a"
+    assert loaded.get(2) is None
+
+
+def test_canonical_alias_merge_and_alias_ids(tmp_path):
+    cache = SpaceMetaCache(str(tmp_path / "meta.json"))
+    cache.store({"id": 7, "name": "Seven", "alias": "SevenNew"})
+
+    assert cache.alias(7, "sevenold") == "SevenNew"
+    assert cache.alias(8, "eight") == "eight"
+    assert cache.alias(None, "x") == "x"
+    assert cache.alias_ids() == {"sevennew": 7}
+    assert cache.merge(7, {"campaigns": {"list": []}}) == {
+        "id": 7, "name": "Seven", "alias": "SevenNew", "campaigns": {"list": []},
+    }
+
+
+def test_rename_is_logged(tmp_path, monkeypatch):
+    logged = []
+    monkeypatch.setattr(app.logger, "info", lambda msg: logged.append(msg))
+    cache = SpaceMetaCache(str(tmp_path / "meta.json"))
+    cache.store({"id": 7, "name": "S", "alias": "old"})
+    cache.store({"id": 7, "name": "S", "alias": "new"})
+
+    assert any("old -> new" in msg for msg in logged)
+
+
+def test_compile_poll_plan_uses_cached_ids_for_alias_only_projects():
+    plan = compile_poll_plan([{"alias": "Gamma"}, {"alias": "gamma2", "space_id": 9}], {}, set(), DAY,
+                             now=0, alias_ids={"gamma": 9})
+
+    assert len(plan) == 1
+    assert plan[0].space_id == 9
+    assert len(plan[0].projects) == 2
+
+
+def test_fetch_poll_plan_queries_meta_only_when_due(tmp_path, monkeypatch):
+    cache = SpaceMetaCache(str(tmp_path / "meta.json"))
+    cache.store({"id": 1, "name": "One", "alias": "one"})
+    monkeypatch.setattr(app, "space_meta", cache)
+    specs = []
+
+    def fetch_latest_batch(batch):
+        specs.extend(batch)
+        return [{"space": {"campaigns": {"list": []}}, "latest": None},
+                {"space": {"id": "2", "name": "Two", "alias": "two", "campaigns": {"list": []}}, "latest": None}]
+    monkeypatch.setattr(app, "fetch_latest_batch", fetch_latest_batch)
+
+    plan = compile_poll_plan([{"alias": "one", "space_id": 1}, {"alias": "two"}], {}, set(), DAY, now=0)
+    infos = fetch_poll_plan(plan, batch_size=10)
+
+    assert specs == [(1, "one", False), (None, "two", True)]
+    assert infos[0]["space"]["alias"] == "one" and infos[0]["space"]["id"] == 1  # 已知 Space 由缓存补全
+    assert cache.get(2)["alias"] == "two"
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Space 热度分与 trending Top N"""
+
+import pytest
+
+from app import TrendingTracker
+
+
+NOW = 1_700_000_000
+DAY = 86400
+
+
+def _campaign(cid, created, start=None, end=None):
+    return {"id": cid, "createdAt": created, "startTime": start or created, "endTime": end}
+
+
+def _recency(age_days):
+    return TrendingTracker.RECENCY_MAX * 0.5 ** (age_days / 3)
+
+
+def test_score_combines_running_windows_and_recency():
+    tracker = TrendingTracker()
+    campaigns = [
+        _campaign("a", NOW - DAY, start=NOW - 3600, end=NOW + 3600),  # 进行中，7 天内
+        _campaign("b", NOW - 10 * DAY, end=NOW - DAY),                 # 已结束，30 天内
+        _campaign("c", NOW - 40 * DAY, end=NOW - 30 * DAY),            # 超出所有窗口
+        {"name": "无 ID 的活动", "createdAt": NOW},
+    ]
+
+    score = tracker.update("alpha", campaigns, now=NOW)
+
+    assert score == pytest.approx(3 + 2 * 1 + 1 * 2 + _recency(1), abs=1e-3)
+    assert tracker.score("alpha") == score
+    assert tracker.score("missing") == 0.0
+
+
+def test_windows_are_incremental_and_expire():
+    tracker = TrendingTracker()
+    campaigns = [
+        _campaign("a", NOW - DAY, end=NOW + 3600),
+        _campaign("b", NOW - 10 * DAY, end=NOW - DAY),
+    ]
+    first = tracker.update("alpha", campaigns, now=NOW)
+
+    # 同一批活动再次出现不会重复计数
+    assert tracker.update("alpha", campaigns, now=NOW) == first
+
+    # 8 天后：a 离开 7 天窗口且已结束
+    later = NOW + 7 * DAY
+    assert tracker.update("alpha", campaigns, now=later) == pytest.approx(2 + _recency(8), abs=1e-3)
+
+    # 再过 17 天：b 离开 30 天窗口；新活动 d 追加到窗口右侧
+    later = NOW + 24 * DAY
+    campaigns.append(_campaign("d", later - DAY, end=later - 3600))
+    assert tracker.update("alpha", campaigns, now=later) == pytest.approx(2 + 1 * 2 + _recency(1), abs=1e-3)
+
+
+def test_top_ranks_non_zero_scores_and_retain_drops_removed():
+    tracker = TrendingTracker(top_n=2)
+    tracker.update("cold", [], now=NOW)
+    tracker.update("warm", [_campaign("w", NOW - 20 * DAY)], now=NOW)
+    tracker.update("hot", [_campaign("h1", NOW - DAY), _campaign("h2", NOW - 2 * DAY)], now=NOW)
+    tracker.update(42, [_campaign("x", NOW - 5 * DAY)], now=NOW)
+
+    assert tracker.top() == {"hot", 42}
+
+    tracker.retain({"cold", "warm"})
+    assert tracker.top() == {"warm"}
+    assert tracker.score("hot") == 0.0
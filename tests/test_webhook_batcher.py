@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""通用 Webhook：批量缓冲区与签名"""
+
+import hashlib
+import hmac
+import json
+
+import app
+from app import WebhookBatcher, post_webhook, sign_webhook
+
+
+def _route(url="https://example.com/hook", batch_size=2):
+    return {"channel": "webhook", "url": url, "name": "hook", "batch_size": batch_size, "batch_linger": 60}
+
+
+def test_webhook_batcher_returns_inflight_slots_when_submit_is_rejected(monkeypatch):
+    submitted = []
+    accept = {"ok": False}
+
+    def submit(job, timeout=5, spill=True):
+        assert spill is False
+        if accept["ok"]:
+            submitted.append(job)
+            return True
+        return False
+
+    monkeypatch.setattr(app.dispatcher, "submit", submit)
+    batcher = WebhookBatcher(max_inflight=2)
+    route = _route()
+
+    for i in range(3):
+        batcher.add(route, {"n": i})
+    stats = batcher.stats()
+    assert stats["inflight"] == 0
+    assert stats["buffered"] == 3
+    assert stats["requeued"] == 2
+
+    # 调度器恢复后，放回的事件按原顺序发出，在途名额随 done() 归还
+    accept["ok"] = True
+    batcher.add(route, {"n": 3})
+    assert [[e["n"] for e in job["events"]] for job in submitted] == [[0, 1], [2, 3]]
+    assert batcher.stats() == {"buffered": 0, "inflight": 2, "blocked": 0, "requeued": 2}
+
+    for job in submitted:
+        batcher.done(job["url"])
+    assert batcher.stats()["inflight"] == 0
+
+
+def test_webhook_batcher_holds_batches_beyond_max_inflight(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.dispatcher, "submit", lambda job, timeout=5, spill=True: submitted.append(job) or True)
+    batcher = WebhookBatcher(max_inflight=1)
+    route = _route(batch_size=1)
+
+    batcher.add(route, {"n": 0})
+    assert batcher.stats()["inflight"] == 1
+    batcher.add(route, {"n": 1})
+    assert len(submitted) == 1
+    assert batcher.stats()["buffered"] == 1
+
+    # 第一个批次完成后，缓冲区中的下一批才提交
+    batcher.done(route["url"])
+    assert [job["events"] for job in submitted] == [[{"n": 0}], [{"n": 1}]]
+
+
+def test_webhook_batcher_jobs_carry_route_key_not_url(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.dispatcher, "submit", lambda job, timeout=5, spill=True: submitted.append(job) or True)
+    batcher = WebhookBatcher()
+    route = _route(url="https://example.com/hook?token=SECRET", batch_size=1)
+
+    batcher.add(route, {"n": 0}, dedup="k0")
+    assert submitted[0]["key"] == app.route_target_key(route)
+    assert "SECRET" not in submitted[0]["key"]
+    assert submitted[0]["dedup"] == ["k0"]
+
+
+def test_post_webhook_signs_the_exact_body(monkeypatch):
+    sent = {}
+
+    class Response:
+        status_code = 204
+
+    def post(url, data=None, headers=None, timeout=None):
+        sent.update(data=data, headers=headers)
+        return Response()
+
+    monkeypatch.setattr(app.webhook_session, "post", post)
+    assert post_webhook("https://example.com/hook", "s3cret", [{"n": 1}])["ok"]
+
+    headers = sent["headers"]
+    expected = hmac.new(b"s3cret", headers["X-NTX-Timestamp"].encode() + b"." + sent["data"], hashlib.sha256).hexdigest()
+    assert headers["X-NTX-Signature"] == "sha256=" + expected
+    assert json.loads(sent["data"])["events"] == [{"n": 1}]
+    assert sign_webhook("s3cret", headers["X-NTX-Timestamp"], sent["data"]) == expected